@@ -1,9 +1,11 @@
-from flask import jsonify, request,session
+from flask import jsonify, request,session,current_app
 from flask_cors import cross_origin
 from . import admin_bp
-from models import Learner, Statistic, Story,Admin
-from sqlalchemy import func
+from models import Learner, Story,Admin
 from app import db
+from story.story_index import index_stories
+from learner_statistics import lifetime_summary, statistic_records, statistic_history, parse_history_args
+from statistic_rollups import overall_averages, rollup_trends, parse_trend_args
 
 
 @admin_bp.route("/@me")
@@ -124,32 +126,100 @@ def get_all_learners():
 @admin_bp.route("/general_statistics", methods=["GET"])
 def general_statistics():
     """
-    This route calculates and returns the average pronunciation score, average words per minute (WPM),
+    This route returns the average pronunciation score, average words per minute (WPM),
     and average word error rate (WER) across all learner statistics in the database. These statistics 
-    provide a general overview of the performance of all learners.
+    provide a general overview of the performance of all learners. They are combined from the weekly
+    statistic rollups instead of scanning every statistic.
 
     Returns:
         Response (json):
             - 200: A JSON object with the aggregated average values for pronunciation score, WPM, and word error rate.
             - 404: A message indicating that no statistics are available if the query returns no results.
     """
-    result = db.session.query(
-        func.avg(Statistic.pronounciationScore).label('averagePronunciationScore'),
-        func.avg(Statistic.wordsPerMinute).label('averageWPM'),
-        func.avg(Statistic.wordErrorRate).label('averageWordErrorRate')
-    ).first()
+    result = overall_averages()
 
     if result:
-        return jsonify({
-            "averagePronunciationScore": round(result.averagePronunciationScore, 2),
-            "averageWPM": round(result.averageWPM, 2),
-            "averageWordErrorRate": round(result.averageWordErrorRate, 2)
-        })
+        return jsonify(result)
     else:
         return jsonify({"message": "No statistics available."}), 404
     
 
 
+@admin_bp.route("/difficulty_trends", methods=["GET"])
+def difficulty_trends():
+    """
+    Return the learners' statistics per story difficulty and day or week, from the statistic rollups.
+
+    Query parameters:
+        period (str): "day" or "week" (default), weeks start on Monday.
+        from, to (str): ISO 8601 dates, only buckets starting on or after from and before to.
+
+    Returns:
+        Response (json):
+            - 200: One entry per bucket and difficulty, oldest first, with the periodStart, the number of
+                   statistics and the average, minimum and maximum word error rate, WPM and pronunciation score.
+            - 400: If a parameter is malformed.
+    """
+    try:
+        period, start, end = parse_trend_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(rollup_trends(period, "difficulty", start, end)), 200
+
+
+
+@admin_bp.route("/story_trends", methods=["GET"])
+def story_trends():
+    """
+    Return the learners' statistics per story and day or week, from the statistic rollups.
+    The parameters are those of /admin/difficulty_trends.
+
+    Returns:
+        Response (json):
+            - 200: One entry per bucket and story, oldest first, with the periodStart, the story ID and title,
+                   the number of statistics and the average, minimum and maximum of every metric.
+            - 400: If a parameter is malformed.
+    """
+    try:
+        period, start, end = parse_trend_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(rollup_trends(period, "story", start, end)), 200
+
+
+
+@admin_bp.route("/audio_storage", methods=["GET"])
+def audio_storage():
+    """
+    Report the size of the stored audio files and what the retention sweeper has removed.
+
+    Returns:
+        Response (json):
+            - 200: The number and total bytes of the stored files, the retention limits, and the
+                   number of sweeps, files removed and bytes reclaimed since the server started.
+    """
+    return jsonify(current_app.extensions['audio_retention'].stats()), 200
+
+
+
+@admin_bp.route("/analysis_cache", methods=["GET"])
+def analysis_cache():
+    """
+    Report how often re-sent recordings were answered from the analysis cache.
+
+    Returns:
+        Response (json):
+            - 200: The number of cached analyses, the cache limits, and the hits, misses and
+                   hit rate since the server started.
+            - 404: If the analysis cache is disabled.
+    """
+    cache = current_app.extensions.get('analysis_cache')
+    if cache is None:
+        return jsonify({"message": "The analysis cache is disabled."}), 404
+    return jsonify(cache.stats()), 200
+
+
+
 @admin_bp.route("/statistics_get_all_learners", methods=["GET"])
 def statistics_get_all_learners():
     """
@@ -179,8 +249,8 @@ def learner_lifetime_statistics():
     if not learner_id:
         return jsonify({"error": "Unauthorized"}), 401
 
-    learner_statistics = Statistic.query.filter_by(learnerID=learner_id).all()
-    if not learner_statistics:
+    summary = lifetime_summary(learner_id)
+    if summary is None:
         return jsonify({
             "message": "No statistics exist",
             "total_stories_read": 0,
@@ -190,37 +260,37 @@ def learner_lifetime_statistics():
             "all_statistic_records": []
         }), 200
 
-    total_stories_read = len(set(stat.storyID for stat in learner_statistics))
-    total_word_error_rate = sum(stat.wordErrorRate for stat in learner_statistics)
-    total_words_per_minute = sum(stat.wordsPerMinute for stat in learner_statistics)
-    total_pronounciation_score = sum(stat.pronounciationScore for stat in learner_statistics)
-    total_statistics = len(learner_statistics)
-
-    average_word_error_rate = round(total_word_error_rate / total_statistics, 2)
-    average_words_per_minute = round(total_words_per_minute / total_statistics, 2)
-    average_pronounciation_score = round(total_pronounciation_score / total_statistics, 2)
-
-    statistics_data = []
-    for stat in learner_statistics:
-        story = Story.query.filter_by(id=stat.storyID).first()
-        statistics_data.append({
-            "storyTitle": story.title,
-            "storyDifficulty": story.difficulty,
-            "wordErrorRate": stat.wordErrorRate,
-            "wordsPerMinute": stat.wordsPerMinute,
-            "pronunciationScore": stat.pronounciationScore,
-            "dateTime": stat.recordedDate.strftime("%Y-%m-%d %H:%M")
-        })
-
     return jsonify({
-        "total_stories_read": total_stories_read,
-        "average_word_error_rate": average_word_error_rate,
-        "average_words_per_minute": average_words_per_minute,
-        "average_pronounciation_score": average_pronounciation_score,
-        "all_statistic_records": statistics_data,
+        **summary,
+        "all_statistic_records": statistic_records(learner_id),
     }), 200
     
 
+@admin_bp.route("/learner_statistics_history", methods=["GET"])
+def learner_statistics_history():
+    """
+    Retrieve one page of a learner's statistic records, oldest first, for the learner_id query parameter.
+    The limit, cursor, from and to parameters are those of /learner/statistics_history.
+
+    Returns:
+        Response (json):
+            - 200: The records and the next_cursor to pass for the following page (null on the last page).
+            - 400: If a parameter is malformed.
+            - 401: If no learner ID is provided in the request.
+    """
+    learner_id = request.args.get("learner_id")
+    if not learner_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        page = parse_history_args(request.args, current_app.config['STATISTICS_HISTORY_PAGE_SIZE'], current_app.config['STATISTICS_HISTORY_MAX_PAGE_SIZE'])
+        records, next_cursor = statistic_history(learner_id, **page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"records": records, "next_cursor": next_cursor}), 200
+
+
 @admin_bp.route("/add_story", methods=["POST"])
 def add_story():
     """
@@ -245,5 +315,15 @@ def add_story():
     new_story = Story(title=title, content=content, difficulty=difficulty)
     db.session.add(new_story)
     db.session.commit()
+    story_id = new_story.id
+
+    # Precompute the phonemes of every sentence so reading checks don't need to phonemize them.
+    # The story is kept if this fails (e.g. espeak-ng is missing), its sentences are then
+    # phonemized when they are read.
+    try:
+        index_stories([new_story])
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Could not index story {story_id}: {type(e).__name__}: {e}")
 
     return jsonify({"message": "Story added successfully"}), 201
\ No newline at end of file
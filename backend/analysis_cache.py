@@ -0,0 +1,87 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import numpy as np
+
+
+class AnalysisResultCache:
+    """
+    Memoized mispronunciation analyses, so a retried or re-sent recording of the same
+    sentence is answered without running the model or espeak-ng again.
+
+    Entries are keyed by a hash of the decoded samples and the sentence (see key()), expire
+    ttl_seconds after they were stored, and the least recently used entries are dropped
+    beyond max_entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=300):
+        """
+        Args:
+        max_entries (int): Number of analyses kept.
+        ttl_seconds (float): How long an analysis is reused.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(audio_data, sentence):
+        """
+        Cache key of a recording of a sentence.
+
+        Args:
+        audio_data (np.ndarray): The decoded samples.
+        sentence (str): The sentence that was read.
+
+        Returns:
+        str: A hex digest of the samples and the sentence.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(audio_data, dtype=np.float32).data)
+        digest.update(b'\0')
+        digest.update((sentence or '').encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key, validate=None):
+        """
+        Look up an analysis.
+
+        Args:
+        key (str): See key().
+        validate (callable): Optional check of a stored analysis, e.g. that the files it
+                             refers to still exist. Entries failing it are dropped.
+
+        Returns:
+        dict: The stored analysis, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= time.time() or (validate is not None and not validate(entry[1])):
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, analysis):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
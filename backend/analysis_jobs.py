@@ -0,0 +1,223 @@
+import json
+import queue
+import redis
+import threading
+import time
+import uuid
+
+
+class InProcessJobQueue:
+    """
+    Job queue kept in the memory of one process, for development, tests and single
+    process deployments. Finished jobs are forgotten ttl_seconds after they finish.
+    """
+
+    def __init__(self, ttl_seconds=600):
+        self.ttl_seconds = ttl_seconds
+        self._pending = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, metadata, audio):
+        """
+        Add a job.
+
+        Args:
+        metadata (dict): JSON-serializable job parameters.
+        audio (bytes): The recording, passed to the worker as is.
+
+        Returns:
+        str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._purgeExpired()
+            self._jobs[job_id] = {"status": "queued", "metadata": metadata, "audio": audio}
+        self._pending.put(job_id)
+        return job_id
+
+    def dequeue(self, timeout=1.0):
+        """
+        Take the oldest queued job and mark it as running.
+
+        Returns:
+        tuple: (job_id, metadata, audio), or None if no job arrived within timeout seconds.
+        """
+        try:
+            job_id = self._pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job["status"] = "running"
+            return job_id, job["metadata"], job.pop("audio")
+
+    def complete(self, job_id, result):
+        self._finish(job_id, {"status": "done", "result": result})
+
+    def fail(self, job_id, error):
+        self._finish(job_id, {"status": "failed", "error": error})
+
+    def status(self, job_id):
+        """
+        Returns:
+        dict: {"status": "queued" | "running"}, {"status": "done", "result": ...} or
+              {"status": "failed", "error": ...}, or None for unknown and expired jobs.
+        """
+        with self._lock:
+            self._purgeExpired()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: job[key] for key in ("status", "result", "error") if key in job}
+
+    def ping(self):
+        return True
+
+    def _finish(self, job_id, state):
+        with self._lock:
+            state["expires"] = time.time() + self.ttl_seconds
+            self._jobs[job_id] = state
+
+    def _purgeExpired(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.get("expires", now + 1) <= now]:
+            del self._jobs[job_id]
+
+
+class RedisJobQueue:
+    """
+    Job queue in Redis, shared by every web and worker process. Each job is a hash
+    (status, metadata, audio, result or error) that expires ttl_seconds after it was
+    queued or finished; the queue is a list of job IDs.
+    """
+
+    def __init__(self, redis_client, prefix="analysis", ttl_seconds=600):
+        """
+        Args:
+        redis_client (redis.Redis): The connection, e.g. the one used for sessions.
+        prefix (str): Namespace of the keys.
+        ttl_seconds (int): How long jobs and their results are kept.
+        """
+        self.redis = redis_client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def enqueue(self, metadata, audio):
+        job_id = uuid.uuid4().hex
+        pipeline = self.redis.pipeline()
+        pipeline.hset(self._key(job_id), mapping={"status": "queued", "metadata": json.dumps(metadata), "audio": audio})
+        pipeline.expire(self._key(job_id), self.ttl_seconds)
+        pipeline.lpush(self._queueKey(), job_id)
+        pipeline.execute()
+        return job_id
+
+    def dequeue(self, timeout=1.0):
+        item = self.redis.brpop(self._queueKey(), timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        job_id = item[1].decode()
+
+        metadata, audio = self.redis.hmget(self._key(job_id), "metadata", "audio")
+        if metadata is None:
+            # The job expired before a worker was free
+            return None
+        self.redis.hset(self._key(job_id), "status", "running")
+        return job_id, json.loads(metadata), audio
+
+    def complete(self, job_id, result):
+        self._finish(job_id, {"status": "done", "result": json.dumps(result)})
+
+    def fail(self, job_id, error):
+        self._finish(job_id, {"status": "failed", "error": error})
+
+    def status(self, job_id):
+        status, result, error = self.redis.hmget(self._key(job_id), "status", "result", "error")
+        if status is None:
+            return None
+        state = {"status": status.decode()}
+        if result is not None:
+            state["result"] = json.loads(result)
+        if error is not None:
+            state["error"] = error.decode()
+        return state
+
+    def ping(self):
+        """
+        Returns:
+        bool: Whether Redis answers, so jobs can be queued.
+        """
+        try:
+            return bool(self.redis.ping())
+        except redis.RedisError:
+            return False
+
+    def _finish(self, job_id, state):
+        pipeline = self.redis.pipeline()
+        pipeline.hdel(self._key(job_id), "audio")
+        pipeline.hset(self._key(job_id), mapping=state)
+        pipeline.expire(self._key(job_id), self.ttl_seconds)
+        pipeline.execute()
+
+    def _key(self, job_id):
+        return f"{self.prefix}:job:{job_id}"
+
+    def _queueKey(self):
+        return f"{self.prefix}:queue"
+
+
+class AnalysisWorkerPool:
+    """
+    Threads that take jobs from a job queue, run them and store their result or error.
+    """
+
+    def __init__(self, job_queue, run_job, workers=2):
+        """
+        Args:
+        job_queue (InProcessJobQueue or RedisJobQueue): Where the jobs come from.
+        run_job (callable): Takes (metadata, audio) and returns a JSON-serializable result.
+        workers (int): Number of jobs run at the same time.
+        """
+        self.job_queue = job_queue
+        self.run_job = run_job
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if not self._threads:
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"analysis-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stop the workers after the jobs in progress.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.job_queue.dequeue(timeout=1.0)
+            except Exception as e:
+                print(f"Analysis job queue error: {e}")
+                self._stop.wait(1.0)
+                continue
+            if job is None:
+                continue
+
+            job_id, metadata, audio = job
+            try:
+                result = self.run_job(metadata, audio)
+            except Exception as e:
+                self.job_queue.fail(job_id, f"{type(e).__name__}: {e}")
+            else:
+                self.job_queue.complete(job_id, result)
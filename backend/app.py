@@ -3,16 +3,27 @@ from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from flask_session import Session
 from config import ApplicationConfig
-from models import db, User,Learner,Admin,Story
+from models import db, User,Learner,Admin,Story,Statistic,StatisticRollup,LearnerAggregate,LearnerStory
+from audio_retention import AudioRetention
+from analysis_jobs import InProcessJobQueue, RedisJobQueue, AnalysisWorkerPool
+from analysis_cache import AnalysisResultCache
 import os
+import time
+import click
 
 # Import the blueprints
 from admin import admin_bp  
 from story import story_bp
 from learner import learner_bp
 from statistic import statistic_bp
+from story.story_index import index_stories
+from learner_statistics import rebuild_learner_aggregates, rebuild_learner_stories, verify_learner_aggregates
+from statistic_rollups import rebuild_statistic_rollups
+from sqlalchemy.exc import IntegrityError
+from learner import learner_routes
 
-from speech_checker import instantiateModels
+import speech_checker
+from speech_checker import instantiateModels, enableBatchedInference, enableChunkedInference, connectPhonemeServer, loadModelsInBackground, modelStatus, enablePronunciationCache
 
         
 app = Flask(__name__)
@@ -25,6 +36,28 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Bound the size and age of the audio files (the excess is removed in the background when serving)
+audio_retention = AudioRetention(UPLOAD_FOLDER, app.config['AUDIO_RETENTION_MAX_BYTES'], app.config['AUDIO_RETENTION_MAX_AGE'])
+app.extensions['audio_retention'] = audio_retention
+
+# Reference pronunciations are cached under the upload folder, one file per word
+app.config['PRONUNCIATION_CACHE_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'pronunciations')
+enablePronunciationCache(app.config['PRONUNCIATION_CACHE_FOLDER'], app.config['PRONUNCIATION_CACHE_MEMORY_ENTRIES'], audio_retention)
+
+# Recent analyses, reused when the same recording of the same sentence is sent again
+if app.config['ANALYSIS_CACHE_ENTRIES']:
+    app.extensions['analysis_cache'] = AnalysisResultCache(app.config['ANALYSIS_CACHE_ENTRIES'], app.config['ANALYSIS_CACHE_TTL'])
+
+# Queue of the mispronunciation analyses run in the background (see check_mispronunciation)
+if app.config['ANALYSIS_QUEUE'] == "redis":
+    app.extensions['analysis_jobs'] = RedisJobQueue(app.config['ANALYSIS_REDIS'], ttl_seconds=app.config['ANALYSIS_JOB_TTL'])
+elif app.config['ANALYSIS_QUEUE'] == "memory":
+    app.extensions['analysis_jobs'] = InProcessJobQueue(app.config['ANALYSIS_JOB_TTL'])
+
+# Web processes without analysis workers of their own only queue analyses for the analysis-worker
+# processes, they don't load the acoustic model
+app.config['ANALYSIS_QUEUE_ONLY'] = app.config['ANALYSIS_QUEUE'] == "redis" and not app.config['ANALYSIS_WORKERS']
+
 bcrypt = Bcrypt(app)
 CORS(app, supports_credentials=True, resources={r"/*": {"origins": "http://localhost:3000"}}, allow_headers=["Content-Type", "Authorization"])
 server_session = Session(app)
@@ -201,6 +234,9 @@ def add_initial_stories():
                            story21, story22, story23, story24, story25, story26, story27, story28, story29, story30])
        db.session.commit()
 
+       # Precompute the phonemes of every story sentence
+       index_stories(Story.query.all())
+
 
       
 def add_admin():
@@ -228,9 +264,168 @@ def add_admin():
 
 with app.app_context():
     db.create_all()
+
+    # create_all skips tables that already exist, so indexes added later are created separately
+    for index in Statistic.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+    # Statistics recorded before the rollups existed are rolled up once
+    if StatisticRollup.query.first() is None and Statistic.query.first() is not None:
+        rebuild_statistic_rollups()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process started at the same time and did it
+            db.session.rollback()
+
+    # Aggregates made before learner_stories existed get the stories they count
+    if LearnerStory.query.first() is None and LearnerAggregate.query.first() is not None:
+        rebuild_learner_stories()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
     
-# When the server is run the models need to be instantiated
-instantiateModels()  
+def load_models():
+    """
+    Load the speech models according to the configuration.
+    """
+    if app.config['PHONEME_SERVER_ADDRESS']:
+        # The phoneme server owns the model, only the lightweight resources are loaded here
+        instantiateModels(load_acoustic_model=False)
+        connectPhonemeServer(app.config['PHONEME_SERVER_ADDRESS'], app.config['PHONEME_SERVER_AUTHKEY'],
+                             app.config['PHONEME_SERVER_TIMEOUT'])
+    else:
+        instantiateModels(
+            quantize=app.config['MODEL_QUANTIZE'],
+            num_threads=app.config['TORCH_NUM_THREADS'],
+            num_interop_threads=app.config['TORCH_NUM_INTEROP_THREADS'],
+            backend=app.config['INFERENCE_BACKEND'],
+            onnx_path=app.config['ONNX_MODEL_PATH'],
+        )
+        if app.config['INFERENCE_CHUNK_SECONDS']:
+            enableChunkedInference(app.config['INFERENCE_CHUNK_SECONDS'], app.config['INFERENCE_CHUNK_CONTEXT_SECONDS'])
+        if app.config['INFERENCE_BATCHING']:
+            enableBatchedInference(app.config['INFERENCE_MAX_BATCH_SIZE'], app.config['INFERENCE_MAX_WAIT_MS'])
+
+
+def load_models_and_start_workers():
+    """
+    Load the speech models, then start the ANALYSIS_WORKERS threads that run the queued analyses.
+    """
+    load_models()
+    # Queued analyses can only run once the models are loaded
+    if 'analysis_jobs' in app.extensions and app.config['ANALYSIS_WORKERS']:
+        AnalysisWorkerPool(app.extensions['analysis_jobs'], run_analysis_job, app.config['ANALYSIS_WORKERS']).start()
+
+
+def serving_app():
+    """
+    Whether this process serves the app (under a WSGI server, with flask run or python app.py),
+    rather than running another flask command such as learner-aggregates.
+    """
+    # The flask command imports the app within the context of the command that needs it,
+    # flask run loads it itself and every other command through the flask group
+    context = click.get_current_context(silent=True)
+    return context is None or context.info_name == "run"
+
+
+def run_analysis_job(metadata, audio):
+    with app.app_context():
+        return learner_routes.run_analysis_job(metadata, audio)
+
+
+@app.cli.command("analysis-worker")
+def analysis_worker():
+    """
+    Run ANALYSIS_WORKERS analysis workers in the foreground, taking jobs from the Redis queue.
+    Web processes started with ANALYSIS_WORKERS=0 then only queue the analyses.
+    Run with: flask --app app analysis-worker
+    """
+    if app.config['ANALYSIS_QUEUE'] != "redis" or not app.config['ANALYSIS_WORKERS']:
+        raise SystemExit("Set ANALYSIS_QUEUE=redis and ANALYSIS_WORKERS to at least 1 to run analysis workers")
+
+    loadModelsInBackground(load_models_and_start_workers)
+    while modelStatus() == "loading":
+        time.sleep(1)
+    if modelStatus() == "failed":
+        raise SystemExit(f"Loading the speech models failed: {speech_checker.model_loading_error}")
+
+    print(f"{app.config['ANALYSIS_WORKERS']} analysis workers waiting for jobs")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+
+
+@app.cli.command("learner-aggregates")
+@click.option("--rebuild", is_flag=True, help="Recompute every learner's aggregates from the statistics.")
+def learner_aggregates(rebuild):
+    """
+    Check the learner_aggregates table against the statistics it summarizes, or rebuild it
+    (e.g. after statistics were changed outside the upload endpoint).
+    Run with: flask --app app learner-aggregates [--rebuild]
+    """
+    if rebuild:
+        learner_count = rebuild_learner_aggregates()
+        db.session.commit()
+        print(f"Rebuilt the aggregates of {learner_count} learners")
+        return
+
+    mismatches = verify_learner_aggregates()
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} learners have aggregates that do not match their statistics "
+                         f"(run with --rebuild): {', '.join(mismatches)}")
+    print("The learner aggregates match the statistics")
+
+
+@app.cli.command("statistic-rollups")
+def statistic_rollups():
+    """
+    Rebuild the daily and weekly statistic rollups from the statistics
+    (e.g. after statistics were changed outside the upload endpoint).
+    Run with: flask --app app statistic-rollups
+    """
+    bucket_count = rebuild_statistic_rollups()
+    db.session.commit()
+    print(f"Rebuilt {bucket_count} statistic rollups")
+
+
+# When the server is run the models need to be instantiated. This happens in the background
+# so that routes which don't use the models are available straight away (see /ready).
+# Other flask commands don't load them, nor start analysis workers that would take jobs off the queue
+# or the audio retention sweeper.
+# Queue-only processes just need espeak for phonemizing new stories.
+if serving_app():
+    if app.config['ANALYSIS_QUEUE_ONLY']:
+        instantiateModels(load_acoustic_model=False)
+    else:
+        loadModelsInBackground(load_models_and_start_workers)
+    audio_retention.startSweeper(app.config['AUDIO_RETENTION_SWEEP_INTERVAL'])
+
+
+# Liveness check, answers as soon as the server is up
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({"status": "ok"}), 200
+
+
+# Readiness check, answers 200 once the speech models have loaded
+# (or, in processes that only queue analyses, while the job queue can be reached)
+@app.route("/ready", methods=["GET"])
+def ready():
+    if app.config['ANALYSIS_QUEUE_ONLY']:
+        if app.extensions['analysis_jobs'].ping():
+            return jsonify({"status": "ready"}), 200
+        return jsonify({"status": "failed", "error": "The analysis job queue cannot be reached"}), 503
+
+    status = modelStatus()
+    if status == "ready":
+        return jsonify({"status": status}), 200
+    if status == "failed":
+        return jsonify({"status": status, "error": speech_checker.model_loading_error}), 503
+    return jsonify({"status": status}), 503, {"Retry-After": str(app.config['MODEL_LOADING_RETRY_AFTER'])}
 
 
 # Adding new user to the database
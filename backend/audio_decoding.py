@@ -0,0 +1,127 @@
+import io
+import struct
+import numpy as np
+
+
+TARGET_SAMPLE_RATE = 16000
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_PCM_DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+
+
+def decodeAudio(data, mimetype=None, sample_rate=TARGET_SAMPLE_RATE):
+    """
+    Decode an uploaded recording into a mono float32 waveform in [-1, 1], like
+    librosa.load(file, sr=sample_rate) but without librosa for the formats the browser sends.
+
+    PCM and float WAV files, and raw 16-bit PCM (mimetype "audio/L16" or "audio/pcm", with an
+    optional ";rate=" parameter, 16 kHz by default), are read straight into a NumPy array.
+    16 kHz mono float32 WAV needs no copy at all, 16-bit PCM needs one conversion. Other
+    sample rates are resampled with a cheap filter (see resample). Any other format is
+    decoded by librosa, which is only imported when needed.
+
+    Args:
+    data (bytes): The uploaded file content.
+    mimetype (str): The upload's content type, used to recognize raw PCM.
+    sample_rate (int): Sample rate of the returned waveform.
+
+    Returns:
+    tuple: (waveform, sample_rate), like librosa.load.
+    """
+    media_type, _, parameters = (mimetype or '').partition(';')
+    if media_type.strip().lower() in ('audio/l16', 'audio/pcm'):
+        rate = TARGET_SAMPLE_RATE
+        for parameter in parameters.split(';'):
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'rate' and value.strip().isdigit():
+                rate = int(value)
+        return resample(pcm16ToFloat(data), rate, sample_rate), sample_rate
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        waveform = _decodeWav(data, sample_rate)
+        if waveform is not None:
+            return waveform, sample_rate
+
+    import librosa
+    return librosa.load(io.BytesIO(data), sr=sample_rate)
+
+
+def pcm16ToFloat(data):
+    """
+    Convert little-endian 16-bit PCM bytes to float32 samples in [-1, 1].
+    """
+    return np.frombuffer(data, dtype='<i2', count=len(data) // 2).astype(np.float32) / 32768.0
+
+
+def resample(waveform, source_rate, target_rate=TARGET_SAMPLE_RATE):
+    """
+    Cheap resampling for recordings that are not at the model's rate. Integer downsampling
+    ratios (48 kHz, 32 kHz) average each group of samples, which also filters out most of
+    the aliasing; other ratios are linearly interpolated.
+
+    Args:
+    waveform (np.ndarray): Float32 samples.
+    source_rate (int): Sample rate of the waveform.
+    target_rate (int): Sample rate to convert to.
+
+    Returns:
+    np.ndarray: The resampled float32 waveform.
+    """
+    if source_rate == target_rate or len(waveform) == 0:
+        return waveform
+
+    if source_rate % target_rate == 0:
+        factor = source_rate // target_rate
+        length = len(waveform) // factor
+        return waveform[:length * factor].reshape(length, factor).mean(axis=1, dtype=np.float32)
+
+    length = int(round(len(waveform) * target_rate / source_rate))
+    positions = np.arange(length, dtype=np.float64) * (source_rate / target_rate)
+    left = np.minimum(positions.astype(np.int64), len(waveform) - 1)
+    right = np.minimum(left + 1, len(waveform) - 1)
+    weights = (positions - left).astype(np.float32)
+    return waveform[left] + (waveform[right] - waveform[left]) * weights
+
+
+def _decodeWav(data, sample_rate):
+    """
+    Read a PCM or float WAV file, or return None for encodings left to librosa.
+    """
+    audio_format = channels = source_rate = bits_per_sample = None
+    samples = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', data, offset)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, source_rate, _, _, bits_per_sample = struct.unpack_from('<HHIIHH', data, body)
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The real format is the first two bytes of the sub-format GUID
+                audio_format = struct.unpack_from('<H', data, body + 24)[0]
+        elif chunk_id == b'data':
+            # Browsers streaming a recording may leave the size unset, read to the end then
+            samples = memoryview(data)[body:min(body + chunk_size, len(data))]
+            break
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if samples is None or audio_format is None or not channels:
+        return None
+
+    sample_width = bits_per_sample // 8
+    if audio_format == _WAVE_FORMAT_IEEE_FLOAT and sample_width == 4:
+        waveform = np.frombuffer(samples, dtype='<f4', count=len(samples) // 4)
+    elif audio_format == _WAVE_FORMAT_PCM and sample_width in _PCM_DTYPES:
+        waveform = np.frombuffer(samples, dtype=_PCM_DTYPES[sample_width], count=len(samples) // sample_width)
+        if sample_width == 1:
+            waveform = (waveform.astype(np.float32) - 128.0) / 128.0
+        else:
+            waveform = waveform.astype(np.float32) / float(2 ** (bits_per_sample - 1))
+    else:
+        return None
+
+    if channels > 1:
+        waveform = waveform[:len(waveform) // channels * channels].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return resample(waveform, source_rate, sample_rate)
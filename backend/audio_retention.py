@@ -0,0 +1,193 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
+
+class AudioRetention:
+    """
+    Size and age bounded retention for the audio files served from a folder.
+
+    An in-memory index of every file (size and when it was last served, least recently
+    served first) is built by walking the folder once at startup. After that, writers
+    report new files with add() and readers report served files with touch(), so a sweep
+    never has to list the folder. A sweep removes the files that were not served for
+    max_age_seconds and then the least recently served files until the folder fits in
+    max_bytes. add() enforces max_bytes straight away, so the folder cannot outgrow the
+    limit between two sweeps.
+
+    Every process keeps its own index, so with several server processes max_bytes bounds
+    the files each of them knows about rather than the whole folder: size it for the number
+    of processes. A process learns about files written by another one when it serves them
+    (touch) or restarts. Before removing a file its modification time is checked, so a file
+    another process served since is kept instead.
+    """
+
+    def __init__(self, directory, max_bytes=None, max_age_seconds=None):
+        """
+        Args:
+        directory (str): The folder to manage, created if missing.
+        max_bytes (int): Total size of the files kept (None = unbounded).
+        max_age_seconds (float): Files not served for this long are removed (None = kept).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.sweeps = 0
+        self._files = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._loadIndex()
+
+    def add(self, name, size):
+        """
+        Record a file that was just written.
+
+        Args:
+        name (str): Path of the file relative to the folder.
+        size (int): Its size in bytes.
+        """
+        with self._lock:
+            self._forget(name)
+            self._files[name] = (size, time.time())
+            self._total_bytes += size
+            if self.max_bytes is not None:
+                self._removeLeastRecentlyServed(self.max_bytes)
+
+    def touch(self, name):
+        """
+        Record that a file was served. The modification time is updated too, so the order
+        survives a restart and other processes see that the file is in use.
+
+        Returns:
+        bool: False if the file is not (or no longer) in the folder.
+        """
+        with self._lock:
+            path = os.path.join(self.directory, name)
+            try:
+                os.utime(path)
+                # A file missing from the index was written by another process
+                size = self._files[name][0] if name in self._files else os.stat(path).st_size
+            except FileNotFoundError:
+                self._forget(name)
+                return False
+            if name not in self._files:
+                self._total_bytes += size
+            self._files[name] = (size, time.time())
+            # Assigning keeps an indexed file in place, it moves to the most recently served end
+            self._files.move_to_end(name)
+            return True
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._files
+
+    def sweep(self):
+        """
+        Remove expired files, then the least recently served ones until max_bytes is met.
+
+        Returns:
+        tuple: (files removed, bytes reclaimed) by this sweep.
+        """
+        with self._lock:
+            files_removed, bytes_reclaimed = self.files_removed, self.bytes_reclaimed
+
+            if self.max_age_seconds is not None:
+                expiry = time.time() - self.max_age_seconds
+                # The index is ordered by last served time, so expired files come first
+                while self._files:
+                    name, (size, last_served) = next(iter(self._files.items()))
+                    if last_served > expiry:
+                        break
+                    self._remove(name)
+
+            if self.max_bytes is not None:
+                self._removeLeastRecentlyServed(self.max_bytes)
+
+            self.sweeps += 1
+            return self.files_removed - files_removed, self.bytes_reclaimed - bytes_reclaimed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                "sweeps": self.sweeps,
+                "files_removed": self.files_removed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+            }
+
+    def startSweeper(self, interval_seconds):
+        """
+        Sweep in a background thread every interval_seconds.
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval_seconds,), name="audio-retention", daemon=True)
+            self._thread.start()
+
+    def stopSweeper(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval_seconds):
+        while not self._stop.wait(interval_seconds):
+            try:
+                files_removed, bytes_reclaimed = self.sweep()
+            except Exception as e:
+                print(f"Audio retention sweep failed: {e}")
+                continue
+            if files_removed:
+                print(f"Audio retention removed {files_removed} files ({bytes_reclaimed} bytes)")
+
+    def _loadIndex(self):
+        entries = []
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, os.path.relpath(path, self.directory), stat.st_size))
+
+        for last_served, name, size in sorted(entries):
+            self._files[name] = (size, last_served)
+            self._total_bytes += size
+
+    def _forget(self, name):
+        entry = self._files.pop(name, None)
+        if entry is not None:
+            self._total_bytes -= entry[0]
+
+    def _remove(self, name):
+        size, last_served = self._files.pop(name)
+        self._total_bytes -= size
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > last_served:
+                # Another process served or rewrote the file since, it is kept as the most recently served
+                self._files[name] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+                return
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.files_removed += 1
+        self.bytes_reclaimed += size
+
+    def _removeLeastRecentlyServed(self, max_bytes):
+        # The most recent file is kept even when it alone exceeds max_bytes, it is about to be served
+        while self._total_bytes > max_bytes and len(self._files) > 1:
+            self._remove(next(iter(self._files)))
@@ -0,0 +1,61 @@
+"""
+Benchmark of findMispronouncedWords latency against sentence length for the greedy
+(word by word) and global (whole sentence) alignment modes.
+
+Usage:
+    python benchmarks/alignment_mode_benchmark.py [--repeat 5] [--error-rate 0.1]
+"""
+import argparse
+import random
+import sys
+import os
+import timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from speech_checker import findMispronouncedWords
+
+
+ESPEAK_WORDS = ['ðə', 'kwɪk', 'bɹaʊn', 'fɒks', 'dʒʌmps', 'əʊvə', 'ðə', 'leɪzi', 'dɒɡ']
+SENTENCE_WORDS = ['The', 'quick', 'brown', 'fox', 'jumps', 'over', 'the', 'lazy', 'dog']
+PHONEME_ALPHABET = 'ðəkwɪbɹaʊnfɒsdʒʌmpvleɪziɡ'
+
+
+def makeUtterance(rng, num_words, error_rate):
+    """
+    Build an espeak word list, the matching sentence and a noisy wav2vec string of num_words words.
+    """
+    espeak_words = [ESPEAK_WORDS[i % len(ESPEAK_WORDS)] for i in range(num_words)]
+    sentence_arr = [SENTENCE_WORDS[i % len(SENTENCE_WORDS)] for i in range(num_words)]
+    wav2vec_string = ''.join(
+        rng.choice(PHONEME_ALPHABET) if rng.random() < error_rate else phoneme
+        for phoneme in ''.join(espeak_words)
+    )
+    return espeak_words, wav2vec_string, sentence_arr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per sentence length')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='Fraction of wav2vec phonemes replaced at random')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'words':>6} {'phonemes':>9} {'greedy (ms)':>12} {'global (ms)':>12} {'agreement':>10}")
+    for num_words in [5, 10, 20, 40, 80]:
+        espeak_words, wav2vec_string, sentence_arr = makeUtterance(rng, num_words, args.error_rate)
+
+        timings = {}
+        results = {}
+        for mode in ['greedy', 'global']:
+            results[mode] = findMispronouncedWords(espeak_words, wav2vec_string, sentence_arr, alignment_mode=mode)
+            timings[mode] = timeit.timeit(
+                lambda: findMispronouncedWords(espeak_words, wav2vec_string, sentence_arr, alignment_mode=mode),
+                number=args.repeat,
+            ) / args.repeat
+
+        agreement = 'same' if results['greedy'] == results['global'] else 'differs'
+        print(f"{num_words:>6} {len(wav2vec_string):>9} {timings['greedy'] * 1000:>12.2f} "
+              f"{timings['global'] * 1000:>12.2f} {agreement:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Peak memory and latency of single-pass and chunked phoneme recognition on long clips,
+such as a learner reading a whole story in one take.
+
+Every (mode, length) pair runs in a fresh process, because the peak RSS of a process
+never goes down. For each clip the script also reports whether the chunked phonemes
+match the single-pass ones (character similarity).
+
+Usage:
+    python benchmarks/chunked_inference_benchmark.py [--seconds 30 60 120]
+        [--chunk-seconds 20] [--context-seconds 2] [--skip-single-above 120]
+"""
+import argparse
+import difflib
+import json
+import resource
+import subprocess
+import sys
+import os
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def measure(seconds, chunk_seconds, context_seconds):
+    """
+    Recognize one synthetic clip in this process and print the result as JSON.
+    """
+    import speech_checker
+    speech_checker.instantiateModels()
+    if chunk_seconds:
+        speech_checker.enableChunkedInference(chunk_seconds, context_seconds)
+
+    audio = 0.1 * np.random.default_rng(0).standard_normal(16000 * seconds).astype(np.float32)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    phonemes = speech_checker.audioToPhonemes(audio)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_mb": (peak - baseline) / 1024, "phonemes": phonemes}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=int, nargs='*', default=[30, 60, 120], help='Clip lengths')
+    parser.add_argument('--chunk-seconds', type=float, default=20)
+    parser.add_argument('--context-seconds', type=float, default=2)
+    parser.add_argument('--skip-single-above', type=int, default=120, help='Longest clip run in a single pass')
+    parser.add_argument('--measure', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        measure(args.measure, args.chunk_seconds, args.context_seconds)
+        return
+
+    def run(seconds, chunk_seconds):
+        output = subprocess.run(
+            [sys.executable, __file__, '--measure', str(seconds), '--chunk-seconds', str(chunk_seconds),
+             '--context-seconds', str(args.context_seconds)],
+            stdout=subprocess.PIPE, check=True, text=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'clip':>6} {'single (s)':>11} {'single +MB':>11} {'chunked (s)':>12} {'chunked +MB':>12} {'similarity':>11}")
+    for seconds in args.seconds:
+        chunked = run(seconds, args.chunk_seconds)
+        if seconds <= args.skip_single_above:
+            single = run(seconds, 0)
+            similarity = difflib.SequenceMatcher(None, single['phonemes'], chunked['phonemes']).ratio()
+            single_columns = f"{single['seconds']:>11.2f} {single['peak_mb']:>11.0f}"
+        else:
+            similarity = float('nan')
+            single_columns = f"{'-':>11} {'-':>11}"
+        print(f"{seconds:>5}s {single_columns} {chunked['seconds']:>12.2f} {chunked['peak_mb']:>12.0f} {similarity:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Decode time per clip of librosa.load(file, sr=16000) and decodeAudio for the WAV files
+a browser uploads, plus the one-off cost of librosa's first load (librosa imports its
+decoders and resampler lazily).
+
+Synthetic 16-bit WAVs are generated for every --rates and --seconds combination. The
+script prints the median decode time of both decoders and the largest sample difference.
+
+Usage:
+    python benchmarks/decode_benchmark.py [--rates 16000 44100 48000] [--seconds 3 10] [--repeat 20]
+"""
+import argparse
+import io
+import statistics
+import sys
+import os
+import time
+import wave
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_decoding import decodeAudio
+
+
+def wavBytes(seconds, sample_rate):
+    samples = (0.1 * np.random.default_rng(0).standard_normal(seconds * sample_rate) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def medianTime(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=int, nargs='*', default=[16000, 44100, 48000])
+    parser.add_argument('--seconds', type=int, nargs='*', default=[3, 10])
+    parser.add_argument('--repeat', type=int, default=20, help='Timed decodes per clip')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    import librosa
+    librosa.load(io.BytesIO(wavBytes(1, 44100)), sr=16000)
+    print(f"first librosa.load (imports): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'clip':>14} {'librosa (ms)':>13} {'decodeAudio (ms)':>17} {'speedup':>8} {'max diff':>9}")
+    for sample_rate in args.rates:
+        for seconds in args.seconds:
+            data = wavBytes(seconds, sample_rate)
+            librosa_time, (expected, _) = medianTime(lambda: librosa.load(io.BytesIO(data), sr=16000), args.repeat)
+            decode_time, (waveform, _) = medianTime(lambda: decodeAudio(data, 'audio/wav'), args.repeat)
+
+            length = min(len(expected), len(waveform))
+            difference = float(np.max(np.abs(expected[:length] - waveform[:length])))
+            print(f"{f'{sample_rate} Hz {seconds} s':>14} {librosa_time * 1000:>13.2f} {decode_time * 1000:>17.2f} "
+                  f"{librosa_time / decode_time:>7.0f}x {difference:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
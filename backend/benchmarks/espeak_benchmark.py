@@ -0,0 +1,60 @@
+"""
+Throughput of sentenceToPhonemes with the espeak-ng command line (one process per
+sentence) and with the in-process libespeak-ng binding.
+
+The sentences are taken from the built-in stories. Both paths must produce the same
+phonemes; the script reports sentences/second for each.
+
+Usage:
+    python benchmarks/espeak_benchmark.py [--rounds 5]
+"""
+import argparse
+import re
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+
+
+def storySentences():
+    """
+    Split the story contents in app.py into sentences the way the reading board does.
+    """
+    app_source = open(os.path.join(os.path.dirname(__file__), '..', 'app.py'), encoding='utf-8').read()
+    contents = re.findall(r'content="([^"]+)"', app_source)
+    return [sentence.strip() for content in contents for sentence in content.split('.') if sentence.strip()]
+
+
+def measure(sentences, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results = [speech_checker.sentenceToPhonemes(sentence) for sentence in sentences]
+    elapsed = time.perf_counter() - start
+    return len(sentences) * rounds / elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help='Passes over all story sentences')
+    args = parser.parse_args()
+
+    sentences = storySentences()
+
+    speech_checker.espeak = None
+    subprocess_rate, subprocess_results = measure(sentences, args.rounds)
+    print(f"espeak-ng subprocess: {subprocess_rate:>9.1f} sentences/s")
+
+    speech_checker.instantiateEspeak()
+    if speech_checker.espeak is None:
+        print("libespeak-ng could not be loaded, set PHONEMIZER_ESPEAK_LIBRARY to its path")
+        return
+    library_rate, library_results = measure(sentences, args.rounds)
+    print(f"libespeak-ng binding: {library_rate:>9.1f} sentences/s ({library_rate / subprocess_rate:.1f}x)")
+
+    mismatches = sum(a != b for a, b in zip(subprocess_results, library_results))
+    print(f"sentences with different phonemes: {mismatches}/{len(sentences)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Load test for phoneme recognition under concurrent requests, with and without the
+batched inference worker.
+
+Each simulated learner thread sends its clips to audioToPhonemes back to back. The script
+reports throughput and p50/p99 latency for every configuration.
+
+Usage:
+    python benchmarks/inference_load_test.py --clients 16 --requests 4 [--clips a.wav b.wav]
+        [--batch-sizes 1 4 8 16] [--max-wait-ms 10]
+"""
+import argparse
+import threading
+import time
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+
+
+def loadClips(paths, seconds):
+    """
+    Load the given clips at 16 kHz, or synthesise noise clips of varying length if none are given.
+    """
+    if paths:
+        import librosa
+        return [librosa.load(path, sr=16000)[0] for path in paths]
+    rng = np.random.default_rng(0)
+    return [0.1 * rng.standard_normal(int(16000 * seconds * scale)).astype(np.float32) for scale in (0.6, 0.8, 1.0, 1.2)]
+
+
+def runLoad(clips, clients, requests_per_client):
+    """
+    Run clients threads that each send requests_per_client clips and return per-request latencies.
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(client_index):
+        for request_index in range(requests_per_client):
+            clip = clips[(client_index + request_index) % len(clips)]
+            start = time.perf_counter()
+            speech_checker.audioToPhonemes(clip)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent simulated learners')
+    parser.add_argument('--requests', type=int, default=4, help='Requests sent by each learner')
+    parser.add_argument('--clips', nargs='*', default=[], help='WAV files to send (default: synthetic clips)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Length of the synthetic clips')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16], help='Batch sizes to compare (1 = no batching)')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='Batching window of the worker')
+    args = parser.parse_args()
+
+    speech_checker.instantiateModels()
+    clips = loadClips(args.clips, args.seconds)
+
+    print(f"{'batch size':>10} {'req/s':>8} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for batch_size in args.batch_sizes:
+        if batch_size == 1:
+            speech_checker.inference_batcher = None
+        else:
+            speech_checker.enableBatchedInference(batch_size, args.max_wait_ms)
+
+        latencies, wall_time = runLoad(clips, args.clients, args.requests)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{batch_size:>10} {len(latencies) / wall_time:>8.2f} {p50:>10.1f} {p99:>10.1f}")
+
+        if speech_checker.inference_batcher is not None:
+            speech_checker.inference_batcher.stop()
+            speech_checker.inference_batcher = None
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark comparing the vectorised Needleman-Wunsch engine in speech_checker
+against the original cell-by-cell implementation.
+
+Usage:
+    python benchmarks/needleman_wunsch_benchmark.py [--repeat 20] [--band 4]
+"""
+import argparse
+import random
+import sys
+import os
+import timeit
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from speech_checker import needlemanWunsch
+
+
+PHONEME_ALPHABET = 'ðəkwɪbɹaʊnfɒsdʒʌmpvleɪziɡtuhæ'
+
+
+def needlemanWunschLoop(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=-1):
+    """
+    The original pure Python implementation, kept here as the baseline.
+    """
+    n, m = len(seq1), len(seq2)
+    score = np.zeros((n + 1, m + 1))
+
+    for i in range(1, n + 1):
+        score[i][0] = i * gap_penalty
+    for j in range(1, m + 1):
+        score[0][j] = j * gap_penalty
+
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if seq1[i - 1] == seq2[j - 1]:
+                diag_score = score[i - 1][j - 1] + match_score
+            else:
+                diag_score = score[i - 1][j - 1] + mismatch_penalty
+            score[i][j] = max(score[i - 1][j] + gap_penalty, score[i][j - 1] + gap_penalty, diag_score)
+
+    return score[n][m]
+
+
+def randomPhonemes(rng, length):
+    return ''.join(rng.choice(PHONEME_ALPHABET) for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Timed calls per case')
+    parser.add_argument('--band', type=int, default=None, help='Optional band limit for the vectorised engine')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # (word length, segment length): typical word-vs-segment and sentence-sized alignments
+    cases = [(4, 4), (6, 12), (8, 40), (8, 120), (60, 60), (150, 160)]
+    scoring = dict(match_score=2, mismatch_penalty=-1, gap_penalty=-2)
+
+    print(f"{'n x m':>12} {'loop (ms)':>12} {'vectorised (ms)':>16} {'speedup':>9}")
+    for n, m in cases:
+        seq1, seq2 = randomPhonemes(rng, n), randomPhonemes(rng, m)
+        if args.band is None:
+            assert needlemanWunsch(seq1, seq2, **scoring) == needlemanWunschLoop(seq1, seq2, **scoring)
+
+        loop_time = timeit.timeit(lambda: needlemanWunschLoop(seq1, seq2, **scoring), number=args.repeat) / args.repeat
+        vector_time = timeit.timeit(lambda: needlemanWunsch(seq1, seq2, band=args.band, **scoring), number=args.repeat) / args.repeat
+        print(f"{f'{n} x {m}':>12} {loop_time * 1000:>12.3f} {vector_time * 1000:>16.3f} {loop_time / vector_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
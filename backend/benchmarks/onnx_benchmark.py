@@ -0,0 +1,67 @@
+"""
+Latency comparison of the torch and ONNX Runtime phoneme recognition backends.
+
+Exports the model first if the ONNX file does not exist yet, then times audioToPhonemes
+on both backends and checks that they produce the same phoneme strings.
+
+Usage:
+    python benchmarks/onnx_benchmark.py [--onnx-path models/wav2vec2-xlsr-53-espeak-cv-ft.onnx]
+        [--clips a.wav b.wav] [--threads 4] [--repeat 5]
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from config import ApplicationConfig
+
+
+def timeRecognition(audio, repeat):
+    speech_checker.audioToPhonemes(audio)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        speech_checker.audioToPhonemes(audio)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--onnx-path', default=ApplicationConfig.ONNX_MODEL_PATH)
+    parser.add_argument('--clips', nargs='*', default=[], help='WAV files (default: synthetic 2, 5 and 10 s clips)')
+    parser.add_argument('--threads', type=int, default=None, help='Intra-op threads for both backends')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per clip')
+    args = parser.parse_args()
+
+    if args.clips:
+        import librosa
+        clips = [librosa.load(path, sr=16000)[0] for path in args.clips]
+        names = [os.path.basename(path) for path in args.clips]
+    else:
+        rng = np.random.default_rng(0)
+        clips = [0.1 * rng.standard_normal(16000 * seconds).astype(np.float32) for seconds in (2, 5, 10)]
+        names = [f"synthetic-{seconds}s" for seconds in (2, 5, 10)]
+
+    speech_checker.instantiateModels(num_threads=args.threads)
+    if not os.path.exists(args.onnx_path):
+        if os.path.dirname(args.onnx_path):
+            os.makedirs(os.path.dirname(args.onnx_path), exist_ok=True)
+        speech_checker.exportOnnxModel(args.onnx_path)
+
+    torch_results = [(timeRecognition(clip, args.repeat), speech_checker.audioToPhonemes(clip)) for clip in clips]
+
+    speech_checker.instantiateModels(num_threads=args.threads, backend='onnx', onnx_path=args.onnx_path)
+    onnx_results = [(timeRecognition(clip, args.repeat), speech_checker.audioToPhonemes(clip)) for clip in clips]
+
+    print(f"{'clip':>20} {'torch (ms)':>11} {'onnx (ms)':>10} {'speedup':>8} {'same output':>12}")
+    for name, (torch_time, torch_phonemes), (onnx_time, onnx_phonemes) in zip(names, torch_results, onnx_results):
+        print(f"{name[-20:]:>20} {torch_time * 1000:>11.1f} {onnx_time * 1000:>10.1f} "
+              f"{torch_time / onnx_time:>7.2f}x {str(torch_phonemes == onnx_phonemes):>12}")
+
+
+if __name__ == '__main__':
+    main()
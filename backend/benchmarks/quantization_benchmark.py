@@ -0,0 +1,115 @@
+"""
+Benchmark of the phoneme recognizer in fp32 and dynamic int8 on CPU.
+
+For every clip the script reports the median forward-pass latency of both models and
+whether the int8 phoneme string agrees with the fp32 one (exact match and character
+similarity). It also reports the size of both models and the process peak RSS. When
+one sentence per clip is given, the mispronounced words of both models are compared too.
+
+Usage:
+    python benchmarks/quantization_benchmark.py --clips a.wav b.wav [--sentences "..." "..."]
+        [--threads 4] [--interop-threads 1] [--repeat 5]
+"""
+import argparse
+import copy
+import difflib
+import resource
+import statistics
+import sys
+import os
+import time
+import numpy as np
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+
+
+def modelSizeMb(model):
+    """
+    Bytes held by the model's state dict, including the packed int8 weights of quantized layers.
+    """
+    def tensorBytes(value):
+        if isinstance(value, torch.Tensor):
+            return value.element_size() * value.nelement()
+        if isinstance(value, (tuple, list)):
+            return sum(tensorBytes(item) for item in value)
+        return 0
+
+    return sum(tensorBytes(value) for value in model.state_dict().values()) / 1e6
+
+
+def timeForwardPass(model, input_values, repeat):
+    with torch.no_grad():
+        model(input_values)  # warm-up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(input_values)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def recognize(model, audio):
+    speech_checker.model = model
+    return speech_checker.audioToPhonemes(audio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clips', nargs='*', default=[], help='WAV files (default: synthetic 3 s clips)')
+    parser.add_argument('--sentences', nargs='*', default=[], help='Sentence read in each clip, to compare mispronounced words')
+    parser.add_argument('--threads', type=int, default=None, help='torch intra-op threads')
+    parser.add_argument('--interop-threads', type=int, default=None, help='torch inter-op threads')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed forward passes per clip')
+    args = parser.parse_args()
+
+    speech_checker.instantiateModels(num_threads=args.threads, num_interop_threads=args.interop_threads)
+    fp32_model = speech_checker.model
+    int8_model = speech_checker.quantizeModel(copy.deepcopy(fp32_model))
+
+    if args.clips:
+        import librosa
+        clips = [librosa.load(path, sr=16000)[0] for path in args.clips]
+        names = [os.path.basename(path) for path in args.clips]
+    else:
+        rng = np.random.default_rng(0)
+        clips = [0.1 * rng.standard_normal(16000 * 3).astype(np.float32)]
+        names = ['synthetic-3s']
+
+    print(f"threads: intra-op {torch.get_num_threads()}, inter-op {torch.get_num_interop_threads()}")
+    print(f"model size: fp32 {modelSizeMb(fp32_model):.1f} MB, int8 {modelSizeMb(int8_model):.1f} MB")
+    print(f"{'clip':>20} {'fp32 (ms)':>10} {'int8 (ms)':>10} {'speedup':>8} {'exact':>6} {'similarity':>11}")
+
+    exact_matches = 0
+    word_agreements = []
+    for index, (name, clip) in enumerate(zip(names, clips)):
+        input_values = speech_checker.processor(clip, return_tensors="pt").input_values
+        fp32_time = timeForwardPass(fp32_model, input_values, args.repeat)
+        int8_time = timeForwardPass(int8_model, input_values, args.repeat)
+
+        fp32_phonemes = recognize(fp32_model, clip)
+        int8_phonemes = recognize(int8_model, clip)
+        similarity = difflib.SequenceMatcher(None, fp32_phonemes, int8_phonemes).ratio()
+        exact_matches += fp32_phonemes == int8_phonemes
+
+        print(f"{name[-20:]:>20} {fp32_time * 1000:>10.1f} {int8_time * 1000:>10.1f} "
+              f"{fp32_time / int8_time:>7.2f}x {str(fp32_phonemes == int8_phonemes):>6} {similarity:>11.3f}")
+
+        if index < len(args.sentences):
+            sentence = args.sentences[index]
+            espeak_arr = speech_checker.sentenceToPhonemes(sentence)
+            sentence_arr = sentence.split(' ')
+            fp32_words = speech_checker.findMispronouncedWords(espeak_arr, fp32_phonemes, sentence_arr)
+            int8_words = speech_checker.findMispronouncedWords(espeak_arr, int8_phonemes, sentence_arr)
+            word_agreements.append(fp32_words == int8_words)
+            print(f"{'':>20} mispronounced fp32 {fp32_words} int8 {int8_words}")
+
+    speech_checker.model = fp32_model
+    print(f"phoneme strings identical: {exact_matches}/{len(clips)}")
+    if word_agreements:
+        print(f"mispronounced words identical: {sum(word_agreements)}/{len(word_agreements)}")
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Time from the end of a recording to its phonemes, for the upload flow (audioToPhonemes
+on the whole clip after it is recorded) and for StreamingRecognizer fed in real time.
+
+The clip is fed in chunks of --chunk-ms with a matching sleep, so the streaming
+recognizer runs its windows while "the learner is still reading", like the WebSocket
+endpoint. Both flows must give similar phonemes; the character similarity is printed.
+
+Usage:
+    python benchmarks/streaming_latency.py [--clip a.wav] [--chunk-ms 100]
+        [--step 1.0] [--left-context 1.0] [--right-context 0.5]
+"""
+import argparse
+import difflib
+import sys
+import os
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from streaming_recognizer import StreamingRecognizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', default=None, help='WAV file (default: a synthetic 8 s clip)')
+    parser.add_argument('--chunk-ms', type=int, default=100, help='Audio per streamed message')
+    parser.add_argument('--step', type=float, default=1.0)
+    parser.add_argument('--left-context', type=float, default=1.0)
+    parser.add_argument('--right-context', type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.clip:
+        import librosa
+        audio = librosa.load(args.clip, sr=16000)[0]
+    else:
+        audio = 0.1 * np.random.default_rng(0).standard_normal(16000 * 8).astype(np.float32)
+
+    speech_checker.instantiateModels()
+    speech_checker.audioToPhonemes(audio[:16000])  # warm-up
+
+    start = time.perf_counter()
+    upload_phonemes = speech_checker.audioToPhonemes(audio)
+    upload_latency = time.perf_counter() - start
+
+    chunk = 16 * args.chunk_ms
+    recognizer = StreamingRecognizer(args.step, args.left_context, args.right_context)
+    for offset in range(0, len(audio), chunk):
+        sent = time.perf_counter()
+        recognizer.feed(audio[offset:offset + chunk])
+        time.sleep(max(0.0, args.chunk_ms / 1000 - (time.perf_counter() - sent)))
+    start = time.perf_counter()
+    streaming_phonemes = recognizer.finish()
+    streaming_latency = time.perf_counter() - start
+
+    similarity = difflib.SequenceMatcher(None, upload_phonemes, streaming_phonemes).ratio()
+    print(f"clip length:                {len(audio) / 16000:.1f} s")
+    print(f"upload, after recording:    {upload_latency * 1000:8.1f} ms")
+    print(f"streaming, after recording: {streaming_latency * 1000:8.1f} ms")
+    print(f"phoneme similarity:         {similarity:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import redis
+import os
 
 load_dotenv()
 
@@ -13,4 +14,80 @@ class ApplicationConfig:
     SESSION_TYPE = "redis"
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
-    SESSION_REDIS = redis.from_url("redis://127.0.0.1:6379")
\ No newline at end of file
+    SESSION_REDIS = redis.from_url("redis://127.0.0.1:6379")
+
+    # Word alignment used for mispronunciation detection: "greedy" or "global"
+    ALIGNMENT_MODE = "greedy"
+
+    # Group concurrent phoneme recognition requests into one forward pass
+    INFERENCE_BATCHING = False
+    INFERENCE_MAX_BATCH_SIZE = 8
+    INFERENCE_MAX_WAIT_MS = 10
+
+    # Address ("host:port" or socket path) of a phoneme_server process that owns the model.
+    # When set, the web workers do not load the model themselves.
+    PHONEME_SERVER_ADDRESS = os.environ.get("PHONEME_SERVER_ADDRESS")
+    PHONEME_SERVER_AUTHKEY = os.environ.get("PHONEME_SERVER_AUTHKEY", "phonemes").encode()
+    # Seconds to wait for the phoneme server before recognizing in the web worker instead
+    PHONEME_SERVER_TIMEOUT = float(os.environ.get("PHONEME_SERVER_TIMEOUT", 60))
+
+    # CPU inference tuning: dynamic int8 quantization and torch thread pools (None = torch default)
+    MODEL_QUANTIZE = False
+    TORCH_NUM_THREADS = None
+    TORCH_NUM_INTEROP_THREADS = None
+
+    # Phoneme recognizer backend: "torch", or "onnx" to run the model exported by export_onnx.py
+    INFERENCE_BACKEND = "torch"
+    ONNX_MODEL_PATH = "models/wav2vec2-xlsr-53-espeak-cv-ft.onnx"
+
+    # Recordings longer than INFERENCE_CHUNK_SECONDS (plus context) are recognized in chunks with
+    # INFERENCE_CHUNK_CONTEXT_SECONDS of context on either side, to bound memory (None = never chunk)
+    INFERENCE_CHUNK_SECONDS = 20
+    INFERENCE_CHUNK_CONTEXT_SECONDS = 2
+
+    # Seconds clients are asked to wait (Retry-After) while the models are still loading
+    MODEL_LOADING_RETRY_AFTER = 10
+
+    # Most statistics accepted by one /statistic/upload_statistics_batch request
+    STATISTICS_BATCH_MAX_SIZE = 500
+
+    # Records per page of the statistics history endpoints, by default and at most
+    STATISTICS_HISTORY_PAGE_SIZE = 50
+    STATISTICS_HISTORY_MAX_PAGE_SIZE = 200
+
+    # Analyses kept for re-sent recordings (keyed by the decoded audio and the sentence, 0 = off)
+    # and how many seconds they are reused
+    ANALYSIS_CACHE_ENTRIES = 1024
+    ANALYSIS_CACHE_TTL = 300
+
+    # Background mispronunciation analysis (form field async=true on /learner/check_mispronounciation):
+    # "redis" shares the job queue between all processes, "memory" keeps it in this process, None disables it.
+    # ANALYSIS_WORKERS analyses run at once in every process that loads the models. With the redis queue,
+    # 0 makes web processes only queue jobs for `flask analysis-worker` processes, without loading the model.
+    ANALYSIS_QUEUE = os.environ.get("ANALYSIS_QUEUE")
+    ANALYSIS_REDIS = SESSION_REDIS
+    ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", 2))
+    ANALYSIS_JOB_TTL = 600
+
+    # Cut leading and trailing silence from uploaded recordings before recognition
+    # and reject recordings without speech (see voice_activity.trimSilence)
+    SILENCE_TRIMMING = True
+
+    # Streaming recognition (/learner/stream_mispronounciation): audio committed per model run,
+    # context on either side of it, the longest accepted recording and the longest wait for the
+    # client's next message before the stream is closed, all in seconds
+    STREAMING_STEP_SECONDS = 1.0
+    STREAMING_LEFT_CONTEXT_SECONDS = 1.0
+    STREAMING_RIGHT_CONTEXT_SECONDS = 0.5
+    STREAMING_MAX_SECONDS = 60
+    STREAMING_IDLE_TIMEOUT_SECONDS = 30
+
+    # Number of reference pronunciation WAVs kept in memory
+    PRONUNCIATION_CACHE_MEMORY_ENTRIES = 512
+
+    # Retention of the served audio files: total size, seconds since last served (None = no limit)
+    # and how often the background sweeper runs. Every server process enforces the size on its own
+    # index of the folder, so with several processes divide the disk budget between them.
+    AUDIO_RETENTION_MAX_BYTES = 500 * 1024 * 1024
+    AUDIO_RETENTION_MAX_AGE = 30 * 24 * 60 * 60
+    AUDIO_RETENTION_SWEEP_INTERVAL = 10 * 60
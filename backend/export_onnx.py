@@ -0,0 +1,27 @@
+"""
+Export the wav2vec2 phoneme recognizer to ONNX for the 'onnx' inference backend.
+
+Usage:
+    python export_onnx.py [--output models/wav2vec2-xlsr-53-espeak-cv-ft.onnx] [--opset 17]
+"""
+import argparse
+import os
+from config import ApplicationConfig
+from speech_checker import instantiateModels, exportOnnxModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=ApplicationConfig.ONNX_MODEL_PATH, help='Where to write the ONNX model')
+    parser.add_argument('--opset', type=int, default=17, help='ONNX opset version')
+    args = parser.parse_args()
+
+    instantiateModels()
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    exportOnnxModel(args.output, opset_version=args.opset)
+    print(f"Exported ONNX model to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
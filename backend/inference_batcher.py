@@ -0,0 +1,99 @@
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class BatchedInferenceWorker:
+    """
+    In-process scheduler that groups concurrent phoneme recognition requests into batches.
+
+    Request threads call submit() and block until their result is ready. A single worker
+    thread takes the first waiting request, keeps collecting requests for up to max_wait_ms
+    (or until max_batch_size is reached), runs one batched forward pass and hands every
+    caller its own result.
+    """
+
+    def __init__(self, recognize_batch, max_batch_size=8, max_wait_ms=10):
+        """
+        Args:
+        recognize_batch (callable): Takes a list of waveforms and returns one phoneme string per waveform.
+        max_batch_size (int): Largest number of utterances sent through the model at once.
+        max_wait_ms (float): How long to wait for more requests after the first one arrives.
+        """
+        self.recognize_batch = recognize_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the worker thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="batched-inference", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Finish the batch in progress and stop the worker thread.
+        """
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, audio):
+        """
+        Queue one waveform for recognition and wait for its phonemes.
+
+        Args:
+        audio (np.ndarray): The 16 kHz waveform.
+
+        Returns:
+        str: The phoneme string for this waveform.
+        """
+        future = Future()
+        self._requests.put((audio, future))
+        return future.result()
+
+    def _collectBatch(self, first):
+        """
+        Gather requests that arrive within max_wait of the first one.
+
+        Returns:
+        tuple: The batch of (audio, future) pairs and whether a stop was requested.
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._requests.get()
+            if first is None:
+                break
+            batch, stopping = self._collectBatch(first)
+
+            try:
+                results = self.recognize_batch([audio for audio, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -4,4 +4,4 @@ from flask import Blueprint
 learner_bp = Blueprint('learner', __name__)
 
 # Import the routes
-from . import learner_routes
\ No newline at end of file
+from . import learner_routes, learner_stream
\ No newline at end of file
@@ -1,13 +1,16 @@
 from flask import jsonify, request,session,url_for,current_app
 from . import learner_bp
-from models import Learner, Statistic, Story
+from models import Learner, Story
 from app import db
 import random
-from speech_checker import analyzeSpeech
-import uuid
-import librosa
+from speech_checker import analyzeSpeech, modelStatus, storePronunciationAudio, touchPronunciationAudio
+from story.story_index import find_indexed_sentence
+from learner_statistics import lifetime_summary, statistic_records, statistic_history, parse_history_args
+from audio_decoding import decodeAudio
+from voice_activity import trimSilence
+from analysis_cache import AnalysisResultCache
+import numpy as np
 import math
-import os
 
 
 
@@ -123,10 +126,10 @@ def get_lifetime_statistics():
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
     
-    # Query statistics for the user
-    learner_statistics = Statistic.query.filter_by(learnerID=user_id).all()
+    # Totals and averages are computed by the database, the records come with their story in one joined query
+    summary = lifetime_summary(user_id)
     
-    if not learner_statistics:
+    if summary is None:
         # Return only the username and a message that no statistics exist
         return jsonify({
             "message": "No statistics exist",
@@ -138,53 +141,59 @@ def get_lifetime_statistics():
             "all_statistic_records": []
         }), 200
 
-    # Calculate total number of stories read (unique story IDs)
-    total_stories_read = len(set(stat.storyID for stat in learner_statistics))
-    
-    # Calculate averages for word error rate, words per minute, and pronunciation score
-    total_word_error_rate = sum(stat.wordErrorRate for stat in learner_statistics)
-    total_words_per_minute = sum(stat.wordsPerMinute for stat in learner_statistics)
-    total_pronounciation_score = sum(stat.pronounciationScore for stat in learner_statistics)
-    total_statistics = len(learner_statistics)
-    
-    # Calculate averages
-    average_word_error_rate = round(total_word_error_rate / total_statistics,2)
-    average_words_per_minute = round(total_words_per_minute / total_statistics,2)
-    average_pronounciation_score = round(total_pronounciation_score / total_statistics,2)
-    
-    # Prepare a list to hold the statistics data
-    statistics_data = []
-
-    for stat in learner_statistics:
-        story = Story.query.filter_by(id=stat.storyID).first()
-        
-        # Append the statistic data in the format needed for the table
-        statistics_data.append({
-            "storyTitle": story.title,
-            "storyDifficulty": story.difficulty,
-            "wordErrorRate": stat.wordErrorRate,
-            "wordsPerMinute": stat.wordsPerMinute,
-            "pronunciationScore": stat.pronounciationScore,
-            "dateTime": stat.recordedDate.strftime("%Y-%m-%d %H:%M")
-        })
-
     # Return the aggregated lifetime statistics
     return jsonify({
         "username": learner.username,
-        "total_stories_read": total_stories_read,
-        "average_word_error_rate": average_word_error_rate,
-        "average_words_per_minute": average_words_per_minute,
-        "average_pronounciation_score": average_pronounciation_score,
-        "all_statistic_records": statistics_data,
+        **summary,
+        "all_statistic_records": statistic_records(user_id),
     }), 200
     
 
+@learner_bp.route("/statistics_history", methods=["GET"])
+def get_statistics_history():
+    """
+    This endpoint returns one page of the current learner's statistic records, oldest first.
+
+    Query parameters:
+        limit (int): Records per page, capped at STATISTICS_HISTORY_MAX_PAGE_SIZE.
+        cursor (str): The next_cursor of the previous page.
+        from, to (str): ISO 8601 dates or times, only records made at or after from and before to.
+
+    Returns:
+        Response (json):
+            - 200: The records and the next_cursor to pass for the following page (null on the last page).
+            - 400: If a parameter is malformed.
+            - 401: If no learner is logged in.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        page = parse_history_args(request.args, current_app.config['STATISTICS_HISTORY_PAGE_SIZE'], current_app.config['STATISTICS_HISTORY_MAX_PAGE_SIZE'])
+        records, next_cursor = statistic_history(user_id, **page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"records": records, "next_cursor": next_cursor}), 200
+
+
 @learner_bp.route('/check_mispronounciation', methods=['POST'])
 def check_mispronunciation():
     """
     This endpoint analyzes an audio file of the user reading a sentence and identifies any mispronounced words.
+    With the form field async=true (and an analysis job queue configured) the analysis runs in the
+    background instead: the endpoint answers 202 with a job ID to poll at /analysis_jobs/<job_id>.
+    A recording that was analyzed recently is answered straight away from the analysis cache.
     """
-
+    # The speech models load in the background when the server starts. Queued analyses run in
+    # the analysis workers, only analyses run in this request need them.
+    job_queue = current_app.extensions.get('analysis_jobs')
+    queued = job_queue is not None and request.form.get("async", "").lower() in ("1", "true")
+    if not queued and modelStatus() != "ready":
+        if current_app.config['ANALYSIS_QUEUE_ONLY']:
+            return jsonify({"error": "This server only queues analyses, send the recording with async=true"}), 503
+        return jsonify({"error": "Speech models are not ready yet"}), 503, {"Retry-After": str(current_app.config['MODEL_LOADING_RETRY_AFTER'])}
 
     # Check if the 'audio' part is present in the request
     if 'audio' not in request.files:
@@ -192,42 +201,201 @@ def check_mispronunciation():
 
     audio_file = request.files['audio']
     sentence = request.form.get("currentSentence")
+    story_id = request.form.get("story_id", type=int)
+    sentence_index = request.form.get("sentence_index", type=int)
     
-    audio_data, sample_rate = librosa.load(audio_file, sr=16000)
+    # WAV and raw PCM uploads are decoded without librosa, see decodeAudio
+    audio_data, sample_rate = decodeAudio(audio_file.read(), audio_file.mimetype)
     
     # Calculate the duration of the audio file
     duration_seconds = len(audio_data) / sample_rate
     duration_seconds_rounded = math.ceil(duration_seconds)
-    
+
+    # Retries and re-sent recordings get the stored analysis, as long as its pronunciation files are still there
+    analysis_cache = current_app.extensions.get('analysis_cache')
+    cache_key = AnalysisResultCache.key(audio_data, sentence)
+    if analysis_cache is not None:
+        cached_analysis = analysis_cache.get(cache_key, validate=pronunciation_files_available)
+        if cached_analysis is not None:
+            return jsonify(mispronunciation_results(cached_analysis))
+
+    # Cut the leading and trailing silence before recognition, the duration above stays that of the whole recording
+    dropped_seconds = 0.0
+    if current_app.config['SILENCE_TRIMMING']:
+        audio_data, dropped_seconds = trimSilence(audio_data, sample_rate)
+        if audio_data is None:
+            return jsonify({"error": "No speech detected in the recording", "duration_audio_file": duration_seconds_rounded}), 422
+        current_app.logger.debug(f"Trimmed {dropped_seconds:.2f}s of silence from a {duration_seconds:.2f}s recording")
+
+    analysis = {"duration_audio_file": duration_seconds_rounded, "silence_trimmed_seconds": round(dropped_seconds, 2)}
+
+    # Hand the analysis to the analysis workers and let the client poll for the result
+    if queued:
+        job_id = job_queue.enqueue(
+            {"sentence": sentence, "story_id": story_id, "sentence_index": sentence_index, "cache_key": cache_key, **analysis},
+            np.asarray(audio_data, dtype=np.float32).tobytes(),
+        )
+        job_url = url_for('learner.get_analysis_job', job_id=job_id)
+        return jsonify({"job_id": job_id, "status": "queued", "job_url": job_url}), 202, {"Location": job_url}
+
+    analysis["mispronounced_words"] = analyze_recording(audio_data, sentence, story_id, sentence_index)
+    if analysis_cache is not None:
+        analysis_cache.put(cache_key, analysis)
+    return jsonify(mispronunciation_results(analysis))
+
+
+@learner_bp.route('/analysis_jobs/<string:job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """
+    This endpoint returns the state of a mispronunciation analysis queued by /check_mispronounciation.
+
+    Args:
+        job_id (string): The ID returned when the analysis was queued.
+
+    Returns:
+        Response (json):
+            - 200: {"status": "queued"} or {"status": "running"} while the job waits or runs,
+                   {"status": "done"} with the same fields as /check_mispronounciation when it finished,
+                   or {"status": "failed", "error": ...}.
+            - 404: If the job does not exist or its result expired.
+    """
+    job_queue = current_app.extensions.get('analysis_jobs')
+    state = job_queue.status(job_id) if job_queue is not None else None
+    if state is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if state["status"] == "done":
+        return jsonify({"status": "done", **mispronunciation_results(state["result"])}), 200
+    if state["status"] == "failed":
+        return jsonify({"status": "failed", "error": state["error"]}), 200
+    return jsonify({"status": state["status"]}), 200
+
+
+def run_analysis_job(metadata, audio):
+    """
+    Run a queued analysis, in an analysis worker within the application context.
+
+    Args:
+        metadata (dict): The sentence, story position, duration and trimmed silence of the recording.
+        audio (bytes): The float32 samples of the (trimmed) recording.
+
+    Returns:
+        dict: The analysis, turned into a response by mispronunciation_results.
+    """
+    audio_data = np.frombuffer(audio, dtype=np.float32)
+    mispronounced_words = analyze_recording(audio_data, metadata["sentence"], metadata["story_id"], metadata["sentence_index"])
+    analysis = {
+        "duration_audio_file": metadata["duration_audio_file"],
+        "silence_trimmed_seconds": metadata["silence_trimmed_seconds"],
+        "mispronounced_words": mispronounced_words,
+    }
+
+    analysis_cache = current_app.extensions.get('analysis_cache')
+    if analysis_cache is not None:
+        analysis_cache.put(metadata["cache_key"], analysis)
+    return analysis
+
+
+def pronunciation_files_available(analysis):
+    """
+    Check that the pronunciation files of a stored analysis were not removed by the
+    audio retention sweeper, and mark them as served again.
+
+    Args:
+        analysis (dict): An analysis from the analysis cache.
+
+    Returns:
+        bool: True if every file is still there.
+    """
+    return all(touchPronunciationAudio(stored_word["audio_filename"]) for stored_word in analysis["mispronounced_words"])
+
+
+def analyze_recording(audio_data, sentence, story_id=None, sentence_index=None):
+    """
+    Find the mispronounced words of a recording and store their correct pronunciation.
+
+    Args:
+        audio_data (np.ndarray): The 16 kHz recording.
+        sentence (str): The sentence the learner read.
+        story_id (int): Optional ID of the story being read.
+        sentence_index (int): Optional position of the sentence in the story.
+
+    Returns:
+        list: The mispronounced words, see store_mispronounced_words.
+    """
+    # Use the phonemes precomputed when the story was added, phonemizing on the fly for unknown text
+    indexed_sentence = find_indexed_sentence(sentence, story_id, sentence_index)
+    espeak_arr = indexed_sentence.phonemes if indexed_sentence else None
+    syllables = indexed_sentence.syllables if indexed_sentence else None
+
     # Call analyzeSpeech with the loaded audio data and the sentence
-    mispronounced_words, audio_files, syllable_list = analyzeSpeech(audio_data, sentence)
+    mispronounced_words, audio_files, syllable_list = analyzeSpeech(
+        audio_data, sentence, alignment_mode=current_app.config['ALIGNMENT_MODE'], espeak_arr=espeak_arr, syllables=syllables
+    )
     #print(f"This is the list of mispronounced words: {mispronounced_words}")
-    
-    # No mispronounciation detected
-    if len(mispronounced_words) == 0:
-        return jsonify({"results":"pass","duration_audio_file":duration_seconds_rounded}) 
 
-    # Initialize a list to store the results
-    results = []
+    return store_mispronounced_words(mispronounced_words, audio_files, syllable_list)
 
-    for word, wav_file, syllable_string in zip(mispronounced_words, audio_files, syllable_list):
-        # Generate a unique filename for each mispronounced word's audio
-        audio_filename = f"{uuid.uuid4()}.wav"
-        audio_file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], audio_filename)
 
-        with open(audio_file_path, 'wb') as f:
-            f.write(wav_file)
+def store_mispronounced_words(mispronounced_words, audio_files, syllable_list):
+    """
+    Store the correct pronunciation of each mispronounced word.
 
-        # Generate a URL for the saved audio file
-        audio_url = url_for('static', filename=f'audio_files/{audio_filename}', _external=True)
+    Args:
+        mispronounced_words (list): The mispronounced words.
+        audio_files (list): The WAV data of their correct pronunciation, None where synthesis failed.
+        syllable_list (list): Their syllable spellings.
 
-        # Append the word and its audio URL to the results
-        results.append({
+    Returns:
+        list: One {"word", "audio_filename", "syllable_string"} dictionary per word that has its audio.
+    """
+    stored_words = []
+    for word, wav_file, syllable_string in zip(mispronounced_words, audio_files, syllable_list):
+        if wav_file is None:
+            continue
+        # Each word's audio is stored once in the pronunciation cache and keeps the same URL
+        stored_words.append({
             "word": word,
-            "audio_url": audio_url,
+            "audio_filename": storePronunciationAudio(word, wav_file),
             "syllable_string": syllable_string,
-            "duration_audio_file":duration_seconds_rounded,
         })
+    return stored_words
+
+
+def mispronunciation_results(analysis):
+    """
+    Build the response body of a mispronunciation check.
+
+    Args:
+        analysis (dict): The stored mispronounced words, the duration of the learner's recording
+                         in whole seconds and optionally the seconds of silence trimmed from it.
+
+    Returns:
+        dict: {"results": "pass"} with the duration, or {"results": [...]} with the word,
+              audio URL, syllables and duration of each mispronounced word.
+    """
+    duration_seconds_rounded = analysis["duration_audio_file"]
+
+    # No mispronounciation detected
+    if len(analysis["mispronounced_words"]) == 0:
+        response = {"results":"pass","duration_audio_file":duration_seconds_rounded}
+    else:
+        # Initialize a list to store the results
+        results = []
+
+        for stored_word in analysis["mispronounced_words"]:
+            # Generate a URL for the saved audio file
+            audio_url = url_for('static', filename=f'audio_files/pronunciations/{stored_word["audio_filename"]}', _external=True)
+
+            # Append the word and its audio URL to the results
+            results.append({
+                "word": stored_word["word"],
+                "audio_url": audio_url,
+                "syllable_string": stored_word["syllable_string"],
+                "duration_audio_file":duration_seconds_rounded,
+            })
+        response = {"results": results}
 
-    # Return the results as a JSON response
-    return jsonify({"results": results})
\ No newline at end of file
+    if "silence_trimmed_seconds" in analysis:
+        response["silence_trimmed_seconds"] = analysis["silence_trimmed_seconds"]
+    return response
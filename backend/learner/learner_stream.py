@@ -0,0 +1,111 @@
+from flask import current_app
+from flask_sock import Sock
+from . import learner_bp
+from .learner_routes import mispronunciation_results, store_mispronounced_words
+from speech_checker import analyzeTranscription, modelStatus
+from story.story_index import find_indexed_sentence
+from streaming_recognizer import StreamingRecognizer
+from audio_decoding import pcm16ToFloat
+from voice_activity import trimSilence
+import json
+import math
+
+sock = Sock()
+
+
+@sock.route("/stream_mispronounciation", bp=learner_bp)
+def stream_mispronunciation(ws):
+    """
+    WebSocket version of /check_mispronounciation that recognizes the recording while the
+    learner is still reading, so the verdict is ready shortly after they stop.
+
+    Protocol:
+        1. The client sends a JSON text message {"currentSentence": ..., "story_id": ..., "sentence_index": ...}
+           (story_id and sentence_index are optional, see find_indexed_sentence).
+        2. The client sends the recording as binary messages of 16 kHz mono 16-bit little-endian PCM.
+           The server answers {"type": "partial", "phonemes": ...} whenever more of it was recognized.
+        3. The client sends the text message {"type": "end"}. The server answers
+           {"type": "result", "results": ...} like /check_mispronounciation and closes the connection.
+           Recordings that fit in one model window get exactly the same results; longer ones are
+           recognized window by window, which can differ slightly from recognizing them in one pass.
+        Errors are sent as {"type": "error", "error": ...} before closing. Streams on which the client
+        sends nothing for STREAMING_IDLE_TIMEOUT_SECONDS are closed the same way.
+    """
+    if modelStatus() != "ready":
+        ws.send(json.dumps({"type": "error", "error": "Speech models are not ready yet"}))
+        return
+
+    idle_timeout = current_app.config['STREAMING_IDLE_TIMEOUT_SECONDS']
+    idle_error = json.dumps({"type": "error", "error": f"Nothing was received for {idle_timeout} seconds"})
+
+    message = ws.receive(timeout=idle_timeout)
+    if message is None:
+        ws.send(idle_error)
+        return
+
+    try:
+        start = json.loads(message)
+        sentence = start["currentSentence"]
+    except (TypeError, ValueError, KeyError):
+        ws.send(json.dumps({"type": "error", "error": "The first message must give the currentSentence"}))
+        return
+
+    recognizer = StreamingRecognizer(
+        current_app.config['STREAMING_STEP_SECONDS'],
+        current_app.config['STREAMING_LEFT_CONTEXT_SECONDS'],
+        current_app.config['STREAMING_RIGHT_CONTEXT_SECONDS'],
+    )
+    max_seconds = current_app.config['STREAMING_MAX_SECONDS']
+    phonemes = ""
+
+    while True:
+        message = ws.receive(timeout=idle_timeout)
+        if message is None:
+            ws.send(idle_error)
+            return
+        if isinstance(message, str):
+            try:
+                message_type = json.loads(message).get("type")
+            except (ValueError, AttributeError):
+                ws.send(json.dumps({"type": "error", "error": "Text messages must be JSON objects"}))
+                return
+            if message_type == "end":
+                break
+            continue
+
+        # A sample split across two messages would shift every sample after it
+        if len(message) % 2:
+            ws.send(json.dumps({"type": "error", "error": "Audio messages must hold whole 16-bit samples"}))
+            return
+
+        samples = pcm16ToFloat(message)
+        if recognizer.duration() + len(samples) / 16000 > max_seconds:
+            ws.send(json.dumps({"type": "error", "error": f"Recordings are limited to {max_seconds} seconds"}))
+            return
+
+        partial_phonemes = recognizer.feed(samples)
+        if partial_phonemes != phonemes:
+            phonemes = partial_phonemes
+            ws.send(json.dumps({"type": "partial", "phonemes": phonemes}))
+
+    # The audio was recognized while it arrived, so only recordings without any speech are rejected here
+    if current_app.config['SILENCE_TRIMMING'] and trimSilence(recognizer.audio())[0] is None:
+        ws.send(json.dumps({"type": "error", "error": "No speech detected in the recording"}))
+        return
+
+    wav2vec_phonemes = recognizer.finish()
+
+    # Use the phonemes precomputed when the story was added, phonemizing on the fly for unknown text
+    indexed_sentence = find_indexed_sentence(sentence, start.get("story_id"), start.get("sentence_index"))
+    espeak_arr = indexed_sentence.phonemes if indexed_sentence else None
+    syllables = indexed_sentence.syllables if indexed_sentence else None
+
+    mispronounced_words, audio_files, syllable_list = analyzeTranscription(
+        wav2vec_phonemes, sentence, alignment_mode=current_app.config['ALIGNMENT_MODE'], espeak_arr=espeak_arr, syllables=syllables
+    )
+
+    result = mispronunciation_results({
+        "mispronounced_words": store_mispronounced_words(mispronounced_words, audio_files, syllable_list),
+        "duration_audio_file": math.ceil(recognizer.duration()),
+    })
+    ws.send(json.dumps({"type": "result", **result}))
@@ -0,0 +1,332 @@
+import base64
+import json
+import math
+from datetime import datetime
+from sqlalchemy import func, and_, or_, update, insert, select
+from sqlalchemy.exc import IntegrityError
+from models import db, Statistic, Story, LearnerAggregate, LearnerStory
+
+
+def lifetime_summary(learner_id):
+    """
+    Read the totals and averages of a learner's reading statistics from their aggregate row.
+    Learners whose statistics predate the aggregates get them computed in a single aggregate query.
+
+    Args:
+        learner_id (str): The learner's ID.
+
+    Returns:
+        dict: The number of different stories read and the average word error rate, words per minute
+              and pronunciation score (rounded to two decimals), or None if the learner has no statistics.
+    """
+    aggregate = db.session.get(LearnerAggregate, learner_id) or compute_learner_aggregate(learner_id)
+    if aggregate is None:
+        return None
+
+    return {
+        "total_stories_read": aggregate.storiesRead,
+        "average_word_error_rate": round(aggregate.wordErrorRateSum / aggregate.statisticCount, 2),
+        "average_words_per_minute": round(aggregate.wordsPerMinuteSum / aggregate.statisticCount, 2),
+        "average_pronounciation_score": round(aggregate.pronounciationScoreSum / aggregate.statisticCount, 2),
+    }
+
+
+def record_statistic(statistic):
+    """
+    Add a new statistic to the session and update its learner's aggregate row in the same transaction.
+    The caller commits.
+
+    Args:
+        statistic (Statistic): The statistic to add, not yet in the session.
+    """
+    record_statistics([statistic])
+
+
+def record_statistics(statistics):
+    """
+    Add new statistics to the session and update their learners' aggregate rows in the same transaction,
+    once per learner however many statistics they have in the batch. The caller commits.
+
+    The totals are incremented by an UPDATE in the database, so concurrent uploads of one learner
+    do not overwrite each other's counts. storiesRead only grows by the stories the learner_stories
+    table did not hold for the learner yet, so the history is not read. A learner without an aggregate
+    row gets one computed from all their statistics, including the new ones.
+
+    Args:
+        statistics (list): The statistics to add, not yet in the session.
+    """
+    by_learner = {}
+    for statistic in statistics:
+        by_learner.setdefault(statistic.learnerID, []).append(statistic)
+
+    db.session.add_all(statistics)
+    db.session.flush()
+
+    for learner_id, learner_statistics in by_learner.items():
+        if _increment_aggregate(learner_id, learner_statistics):
+            continue
+        try:
+            # A concurrent first upload of the same learner may create the row first, then it is updated instead
+            with db.session.begin_nested():
+                db.session.add(compute_learner_aggregate(learner_id))
+                _add_learner_stories_of_history(learner_id)
+        except IntegrityError:
+            _increment_aggregate(learner_id, learner_statistics)
+
+
+def compute_learner_aggregate(learner_id):
+    """
+    Compute a learner's aggregate row from their statistics, without adding it to the session.
+
+    Args:
+        learner_id (str): The learner's ID.
+
+    Returns:
+        LearnerAggregate: The aggregate, or None if the learner has no statistics.
+    """
+    aggregates = _aggregate_query().filter(Statistic.learnerID == learner_id).group_by(Statistic.learnerID).all()
+    return _aggregate(aggregates[0]) if aggregates else None
+
+
+def rebuild_learner_aggregates():
+    """
+    Replace every aggregate row (and the learner_stories they count) by one computed from the statistics.
+    The caller commits.
+
+    Returns:
+        int: The number of learners with statistics.
+    """
+    rebuild_learner_stories()
+    LearnerAggregate.query.delete()
+    aggregates = [_aggregate(row) for row in _aggregate_query().group_by(Statistic.learnerID)]
+    db.session.add_all(aggregates)
+    return len(aggregates)
+
+
+def rebuild_learner_stories():
+    """
+    Replace the learner_stories table by the learner and story pairs of the statistics,
+    e.g. for aggregates that predate it. The caller commits.
+    """
+    LearnerStory.query.delete()
+    db.session.execute(insert(LearnerStory).from_select(
+        ["learnerID", "storyID"], select(Statistic.learnerID, Statistic.storyID).distinct()
+    ))
+
+
+def verify_learner_aggregates():
+    """
+    Compare the aggregate rows with the statistics they summarize.
+
+    Returns:
+        list: The IDs of the learners whose aggregate row is missing, left over or different.
+    """
+    stored = {aggregate.learnerID: aggregate for aggregate in LearnerAggregate.query}
+    computed = {row.learnerID: _aggregate(row) for row in _aggregate_query().group_by(Statistic.learnerID)}
+
+    mismatches = []
+    for learner_id in sorted(stored.keys() | computed.keys()):
+        expected, actual = computed.get(learner_id), stored.get(learner_id)
+        if expected is None or actual is None or not _same_aggregate(expected, actual):
+            mismatches.append(learner_id)
+    return mismatches
+
+
+def statistic_records(learner_id):
+    """
+    Load a learner's statistic records together with the title and difficulty of their story,
+    joined in one query instead of one Story query per record.
+
+    Args:
+        learner_id (str): The learner's ID.
+
+    Returns:
+        list: The records in the format of the statistics table, oldest first.
+    """
+    rows = _records_query(learner_id).order_by(Statistic.id).all()
+    return [_record(row) for row in rows]
+
+
+def statistic_history(learner_id, cursor=None, page_size=50, start=None, end=None):
+    """
+    Load one page of a learner's statistic records, oldest first.
+
+    The pages use keyset pagination on (recordedDate, id): a page continues after the last record
+    of the previous one, which the statistics(learnerID, recordedDate) index finds directly,
+    instead of skipping an offset. Records uploaded while a learner pages through the history
+    are neither repeated nor skipped.
+
+    Args:
+        learner_id (str): The learner's ID.
+        cursor (str): The next_cursor of the previous page, or None for the first page.
+        page_size (int): Maximum number of records in the page.
+        start (datetime): Only records made at or after this time, if given.
+        end (datetime): Only records made before this time, if given.
+
+    Returns:
+        tuple: (records, next_cursor), next_cursor is None on the last page.
+
+    Raises:
+        ValueError: If the cursor is not one returned by this function.
+    """
+    query = _records_query(learner_id)
+    if start is not None:
+        query = query.filter(Statistic.recordedDate >= start)
+    if end is not None:
+        query = query.filter(Statistic.recordedDate < end)
+    if cursor is not None:
+        recorded_date, statistic_id = decode_history_cursor(cursor)
+        query = query.filter(or_(
+            Statistic.recordedDate > recorded_date,
+            and_(Statistic.recordedDate == recorded_date, Statistic.id > statistic_id),
+        ))
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Statistic.recordedDate, Statistic.id).limit(page_size + 1).all()
+    next_cursor = encode_history_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [_record(row) for row in rows[:page_size]], next_cursor
+
+
+def parse_history_args(args, default_page_size, max_page_size):
+    """
+    Read the paging parameters of a statistics history request.
+
+    Args:
+        args (MultiDict): The query parameters: cursor, limit, and from / to as ISO 8601 dates or times.
+        default_page_size (int): Page size when no limit is given.
+        max_page_size (int): Largest page size a request can ask for.
+
+    Returns:
+        dict: The keyword arguments of statistic_history, apart from the learner.
+
+    Raises:
+        ValueError: If a parameter is malformed.
+    """
+    page_size = int(args.get("limit", default_page_size))
+    if page_size < 1:
+        raise ValueError("limit must be positive")
+
+    start = args.get("from")
+    end = args.get("to")
+    return {
+        "cursor": args.get("cursor") or None,
+        "page_size": min(page_size, max_page_size),
+        "start": datetime.fromisoformat(start) if start else None,
+        "end": datetime.fromisoformat(end) if end else None,
+    }
+
+
+def encode_history_cursor(row):
+    position = json.dumps([row.recordedDate.isoformat(), row.id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_history_cursor(cursor):
+    try:
+        recorded_date, statistic_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(recorded_date), int(statistic_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _increment_aggregate(learner_id, statistics):
+    # Add flushed statistics to the learner's aggregate row; returns False if the learner has none
+    updated = db.session.execute(update(LearnerAggregate).where(LearnerAggregate.learnerID == learner_id).values(
+        statisticCount=LearnerAggregate.statisticCount + len(statistics),
+        wordErrorRateSum=LearnerAggregate.wordErrorRateSum + sum(float(statistic.wordErrorRate) for statistic in statistics),
+        wordsPerMinuteSum=LearnerAggregate.wordsPerMinuteSum + sum(float(statistic.wordsPerMinute) for statistic in statistics),
+        pronounciationScoreSum=LearnerAggregate.pronounciationScoreSum + sum(float(statistic.pronounciationScore) for statistic in statistics),
+    ).execution_options(synchronize_session=False)).rowcount
+    if not updated:
+        return False
+
+    new_stories = _add_learner_stories(learner_id, {int(statistic.storyID) for statistic in statistics})
+    if new_stories:
+        db.session.execute(update(LearnerAggregate).where(LearnerAggregate.learnerID == learner_id).values(
+            storiesRead=LearnerAggregate.storiesRead + new_stories,
+        ).execution_options(synchronize_session=False))
+    return True
+
+
+def _add_learner_stories(learner_id, story_ids):
+    # Record the learner's pairs with the stories; returns how many of the stories are new to the learner
+    known_story_ids = _known_story_ids(learner_id, story_ids)
+    new_stories = 0
+    for story_id in sorted(story_ids - known_story_ids):
+        try:
+            # A concurrent upload of the learner may record the story first, then it is not new
+            with db.session.begin_nested():
+                db.session.add(LearnerStory(learnerID=learner_id, storyID=story_id))
+        except IntegrityError:
+            continue
+        new_stories += 1
+    return new_stories
+
+
+def _known_story_ids(learner_id, story_ids):
+    return {story_id for story_id, in db.session.query(LearnerStory.storyID).filter(
+        LearnerStory.learnerID == learner_id, LearnerStory.storyID.in_(story_ids)
+    )}
+
+
+def _add_learner_stories_of_history(learner_id):
+    # Pairs of a learner whose aggregate is computed from their history, the stories it counts
+    recorded = select(LearnerStory.storyID).where(LearnerStory.learnerID == learner_id)
+    db.session.execute(insert(LearnerStory).from_select(
+        ["learnerID", "storyID"],
+        select(Statistic.learnerID, Statistic.storyID).where(
+            Statistic.learnerID == learner_id, Statistic.storyID.not_in(recorded)
+        ).distinct(),
+    ))
+
+
+def _aggregate_query():
+    return db.session.query(
+        Statistic.learnerID,
+        func.count(Statistic.id).label('statisticCount'),
+        func.count(Statistic.storyID.distinct()).label('storiesRead'),
+        func.sum(Statistic.wordErrorRate).label('wordErrorRateSum'),
+        func.sum(Statistic.wordsPerMinute).label('wordsPerMinuteSum'),
+        func.sum(Statistic.pronounciationScore).label('pronounciationScoreSum'),
+    )
+
+
+def _aggregate(row):
+    return LearnerAggregate(
+        learnerID=row.learnerID,
+        statisticCount=row.statisticCount,
+        storiesRead=row.storiesRead,
+        wordErrorRateSum=row.wordErrorRateSum,
+        wordsPerMinuteSum=row.wordsPerMinuteSum,
+        pronounciationScoreSum=row.pronounciationScoreSum,
+    )
+
+
+def _same_aggregate(expected, actual):
+    # The running sums are added up in a different order than SUM() does, allow for rounding
+    return (expected.statisticCount == actual.statisticCount and expected.storiesRead == actual.storiesRead
+            and all(math.isclose(getattr(expected, name), getattr(actual, name), rel_tol=1e-9, abs_tol=1e-6)
+                    for name in ('wordErrorRateSum', 'wordsPerMinuteSum', 'pronounciationScoreSum')))
+
+
+def _records_query(learner_id):
+    return db.session.query(
+        Statistic.id,
+        Statistic.wordErrorRate,
+        Statistic.wordsPerMinute,
+        Statistic.pronounciationScore,
+        Statistic.recordedDate,
+        Story.title,
+        Story.difficulty,
+    ).join(Story, Statistic.storyID == Story.id).filter(Statistic.learnerID == learner_id)
+
+
+def _record(row):
+    return {
+        "storyTitle": row.title,
+        "storyDifficulty": row.difficulty,
+        "wordErrorRate": row.wordErrorRate,
+        "wordsPerMinute": row.wordsPerMinute,
+        "pronunciationScore": row.pronounciationScore,
+        "dateTime": row.recordedDate.strftime("%Y-%m-%d %H:%M")
+    }
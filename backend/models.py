@@ -53,6 +53,19 @@ class Story(db.Model):
     content = db.Column(db.Text, unique=True,nullable=False)
     difficulty = db.Column(db.String(30),nullable=False)
     statistics = db.relationship('Statistic', backref='story', lazy=True)
+    sentences = db.relationship('StorySentence', backref='story', lazy=True, order_by='StorySentence.sentenceIndex')
+    
+class StorySentence(db.Model):
+    # Sentences of a story with their espeak phonemes and word syllabifications, computed once when the story is added
+    __tablename__ = "story_sentences"
+    id = db.Column(db.Integer,primary_key=True)
+    storyID = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
+    sentenceIndex = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    phonemes = db.Column(db.JSON, nullable=False)
+    syllables = db.Column(db.JSON, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('storyID', 'sentenceIndex'),)
     
 class Statistic(db.Model):
     __tablename__ = "statistics"
@@ -63,4 +76,48 @@ class Statistic(db.Model):
     wordsPerMinute = db.Column(db.Float, nullable=False)
     pronounciationScore = db.Column(db.Float, nullable=False)
     recordedDate = db.Column(db.DateTime, default=datetime.now)
+
+    # A learner's history is read in recordedDate order, one page at a time
+    __table_args__ = (db.Index('ix_statistics_learner_recorded', 'learnerID', 'recordedDate'),)
+
+class StatisticRollup(db.Model):
+    # Statistics summed up per story and day or week (period "day" or "week", periodStart the first day),
+    # updated as statistics are uploaded, so trends are read without scanning the statistics (see statistic_rollups.py).
+    # The story's difficulty is copied so difficulty trends need no join.
+    __tablename__ = "statistic_rollups"
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)
+    periodStart = db.Column(db.Date, nullable=False)
+    storyID = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False)
+    difficulty = db.Column(db.String(30), nullable=False)
+    statisticCount = db.Column(db.Integer, nullable=False)
+    wordErrorRateSum = db.Column(db.Float, nullable=False)
+    wordErrorRateMin = db.Column(db.Float, nullable=False)
+    wordErrorRateMax = db.Column(db.Float, nullable=False)
+    wordsPerMinuteSum = db.Column(db.Float, nullable=False)
+    wordsPerMinuteMin = db.Column(db.Float, nullable=False)
+    wordsPerMinuteMax = db.Column(db.Float, nullable=False)
+    pronounciationScoreSum = db.Column(db.Float, nullable=False)
+    pronounciationScoreMin = db.Column(db.Float, nullable=False)
+    pronounciationScoreMax = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('period', 'periodStart', 'storyID'),)
+
+class LearnerAggregate(db.Model):
+    # Running totals of a learner's statistics, updated in the transaction that adds each statistic
+    # so the lifetime averages are read without scanning the history (see learner_statistics.record_statistic)
+    __tablename__ = "learner_aggregates"
+    learnerID = db.Column(db.String(32), db.ForeignKey('learners.id'), primary_key=True)
+    statisticCount = db.Column(db.Integer, nullable=False, default=0)
+    storiesRead = db.Column(db.Integer, nullable=False, default=0)
+    wordErrorRateSum = db.Column(db.Float, nullable=False, default=0.0)
+    wordsPerMinuteSum = db.Column(db.Float, nullable=False, default=0.0)
+    pronounciationScoreSum = db.Column(db.Float, nullable=False, default=0.0)
+
+class LearnerStory(db.Model):
+    # The stories a learner has uploaded statistics for, so the aggregate's storiesRead is only incremented
+    # when an upload adds a pair (unlike read_stories, which the learner marks themselves)
+    __tablename__ = "learner_stories"
+    learnerID = db.Column(db.String(32), db.ForeignKey('learners.id'), primary_key=True)
+    storyID = db.Column(db.Integer, db.ForeignKey('stories.id'), primary_key=True)
     
\ No newline at end of file
@@ -0,0 +1,35 @@
+class PhonemeNormalizer:
+    """
+    Rewrites phoneme strings with a fixed, ordered list of rules, like a chain of str.replace
+    calls: each rule applies to the output of the rules before it, e.g. 'dɛi' becomes 'dei'
+    and then 'dɐ'.
+
+    The rules are built once at import instead of on every call. They stay separate
+    str.replace scans: on strings of this length a replace chain measured several times
+    faster than a single str.translate or regular expression pass.
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+        rules (list): (old, new) pairs, applied in order. An empty new deletes old.
+        """
+        self._rules = tuple((old, new) for old, new in rules if old != new)
+
+    def __call__(self, phonemes):
+        for old, new in self._rules:
+            phonemes = phonemes.replace(old, new)
+        return phonemes
+
+
+# Flattening and common corrections of decoded wav2vec transcriptions,
+# e.g. 'ðɪ kwɪk bɹaʊn' -> 'ðəkwɪkbɹaʊn'
+TRANSCRIPTION_NORMALIZER = PhonemeNormalizer([
+    (' ', ''), ('ː', ''), ('ɚ', 'ə'), ('ðɪ', 'ðə'), ('tu', 'tə'),
+    ('ðɛ', 'ðe'), ('dɛ', 'de'), ('da', 'ðə'), ('ei', 'ɐ'),
+])
+
+# Separators, stress and length marks of espeak-ng output, e.g. 'ð_ə k_w_ˈɪ_k' -> 'ðə kwɪk'
+ESPEAK_NORMALIZER = PhonemeNormalizer([
+    ('_', ''), ('ˈ', ''), ('ˌ', ''), ('ː', ''), ('\\', ''),
+])
@@ -0,0 +1,231 @@
+"""
+Phoneme recognition server that owns the wav2vec2 model outside of the Flask workers.
+
+The model is loaded once in the server process and a pool of worker processes is forked
+from it, so the weights are shared copy-on-write instead of being duplicated per web
+worker. Flask workers connect over a local socket (see PhonemeServerClient) and send raw
+float32 16 kHz audio; the server replies with the flattened phoneme string.
+
+Usage:
+    python phoneme_server.py --address 127.0.0.1:6001 --workers 2 --threads-per-worker 2 [--quantize]
+"""
+from multiprocessing.connection import Client, Listener
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+import numpy as np
+
+
+def parseAddress(address):
+    """
+    Convert "host:port" into a TCP address tuple; anything else is used as a Unix socket path.
+
+    Args:
+    address (str): The configured server address.
+
+    Returns:
+    tuple or str: An address accepted by multiprocessing.connection.
+    """
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+class PhonemeServer:
+    """
+    Accepts client connections and answers recognition requests, one thread per connection.
+    """
+
+    def __init__(self, address, authkey, recognize):
+        """
+        Args:
+        address (str): "host:port" or a Unix socket path.
+        authkey (bytes): Shared secret clients must present.
+        recognize (callable): Takes a float32 waveform and returns its phoneme string.
+        """
+        self.listener = Listener(parseAddress(address), authkey=authkey)
+        self.recognize = recognize
+        self._closed = threading.Event()
+
+    def serveForever(self):
+        """
+        Accept connections until close() is called.
+        """
+        while not self._closed.is_set():
+            try:
+                connection = self.listener.accept()
+            except Exception as e:
+                if self._closed.is_set():
+                    break
+                # One client failing the handshake (e.g. a wrong authkey) must not stop the others
+                print(f"Phoneme server rejected a connection: {type(e).__name__}: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def close(self):
+        self._closed.set()
+        self.listener.close()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    audio = np.frombuffer(connection.recv_bytes(), dtype=np.float32)
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    response = ("ok", self.recognize(audio))
+                except Exception as e:
+                    response = ("error", f"{type(e).__name__}: {e}")
+                try:
+                    connection.send(response)
+                except (EOFError, OSError):
+                    # The client gave up waiting
+                    return
+
+
+class PhonemeServerUnavailable(Exception):
+    """
+    The phoneme server could not be reached or did not answer in time.
+    """
+
+
+class PhonemeServerClient:
+    """
+    Thread-safe client used by the Flask workers. Connections are pooled and reused across
+    requests, and a broken connection is replaced once before giving up.
+    """
+
+    def __init__(self, address, authkey, timeout=60):
+        """
+        Args:
+        address (str): "host:port" or a Unix socket path.
+        authkey (bytes): Shared secret of the server.
+        timeout (float): Seconds to wait for a connection and for each answer.
+        """
+        self.address = parseAddress(address)
+        self.authkey = authkey
+        self.timeout = timeout
+        self._connections = queue.LifoQueue()
+
+    def recognize(self, audio):
+        """
+        Send one waveform to the server.
+
+        Args:
+        audio (np.ndarray): The 16 kHz waveform.
+
+        Returns:
+        str: The flattened phoneme string.
+
+        Raises:
+        PhonemeServerUnavailable: If the server cannot be reached or does not answer within the timeout.
+        RuntimeError: If the server failed to recognize the audio.
+        """
+        payload = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+
+        for attempt in range(2):
+            connection = self._getConnection()
+            try:
+                connection.send_bytes(payload)
+                if not connection.poll(self.timeout):
+                    connection.close()
+                    raise PhonemeServerUnavailable(f"No answer within {self.timeout} seconds")
+                status, result = connection.recv()
+            except (EOFError, OSError) as e:
+                connection.close()
+                if attempt == 1:
+                    raise PhonemeServerUnavailable(f"{type(e).__name__}: {e}") from e
+                continue
+
+            self._connections.put(connection)
+            if status == "error":
+                raise RuntimeError(f"Phoneme server error: {result}")
+            return result
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+    def _getConnection(self):
+        try:
+            return self._connections.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _connect(self):
+        # Client() has no timeout and blocks in the handshake while the server is stuck,
+        # so it runs in a thread that closes the connection if it is only made after the timeout
+        outcome = {}
+        lock = threading.Lock()
+
+        def connect():
+            try:
+                connection = Client(self.address, authkey=self.authkey)
+            except Exception as e:
+                outcome["error"] = e
+                return
+            with lock:
+                if outcome.get("abandoned"):
+                    connection.close()
+                else:
+                    outcome["connection"] = connection
+
+        thread = threading.Thread(target=connect, name="phoneme-server-connect", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        with lock:
+            if "connection" in outcome:
+                return outcome["connection"]
+            outcome["abandoned"] = True
+        error = outcome.get("error")
+        if error is None:
+            raise PhonemeServerUnavailable(f"Could not connect within {self.timeout} seconds")
+        raise PhonemeServerUnavailable(f"{type(error).__name__}: {error}") from error
+
+
+def _initWorker(threads_per_worker):
+    import torch
+    torch.set_num_threads(threads_per_worker)
+
+
+def _recognize(audio):
+    import speech_checker
+    return speech_checker.audioToPhonemes(audio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--address', default=os.environ.get('PHONEME_SERVER_ADDRESS', '127.0.0.1:6001'))
+    parser.add_argument('--authkey', default=os.environ.get('PHONEME_SERVER_AUTHKEY', 'phonemes'))
+    parser.add_argument('--workers', type=int, default=2, help='Inference processes sharing the model')
+    parser.add_argument('--threads-per-worker', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--quantize', action='store_true', help='Use the dynamic int8 quantized model')
+    parser.add_argument('--chunk-seconds', type=float, default=20, help='Recognize longer recordings in chunks (0 = never)')
+    parser.add_argument('--chunk-context-seconds', type=float, default=2, help='Context on either side of a chunk')
+    args = parser.parse_args()
+
+    import speech_checker
+    speech_checker.instantiateModels(quantize=args.quantize)
+    if args.chunk_seconds:
+        speech_checker.enableChunkedInference(args.chunk_seconds, args.chunk_context_seconds)
+
+    # Fork after loading so every worker maps the same model weights
+    pool = multiprocessing.get_context('fork').Pool(args.workers, initializer=_initWorker, initargs=(args.threads_per_worker,))
+    server = PhonemeServer(args.address, args.authkey.encode(), lambda audio: pool.apply(_recognize, (audio,)))
+    print(f"Phoneme server listening on {args.address} with {args.workers} workers")
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        pool.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+from audio_retention import AudioRetention
+
+
+class PronunciationCache:
+    """
+    Content-addressed cache of synthesized reference pronunciations.
+
+    Entries are keyed by the word and the synthesis settings (see key()). Recently used
+    WAVs are kept in a least-recently-used memory tier bounded by the number of entries.
+    Every entry is also stored on disk as "<key>.wav", which gives each word a stable URL.
+    The disk tier is bounded by an AudioRetention index: it decides which files are kept,
+    and the cache only reads and writes files the index knows about.
+    """
+
+    def __init__(self, directory, max_memory_entries=512, retention=None):
+        """
+        Args:
+        directory (str): Folder holding the cached WAV files, created if missing.
+        max_memory_entries (int): Number of WAVs kept in memory.
+        retention (AudioRetention): Index of the folder (or of a parent folder) that bounds
+                                    the disk tier. An unbounded index of directory is used when None.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.retention = retention if retention is not None else AudioRetention(directory)
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(word, voice, speed, pitch, amplitude):
+        """
+        Cache key of a word synthesized with the given espeak-ng settings.
+
+        Returns:
+        str: A hex digest, also used as the file name.
+        """
+        settings = "\0".join(str(part) for part in (word, voice, speed, pitch, amplitude))
+        return hashlib.sha256(settings.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def filename(key):
+        return f"{key}.wav"
+
+    def get(self, key):
+        """
+        Look up a cached WAV, promoting disk entries into memory.
+
+        Returns:
+        bytes: The WAV data, or None on a miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._retentionName(key) in self.retention:
+                try:
+                    with open(self._path(key), 'rb') as f:
+                        audio_data = f.read()
+                except FileNotFoundError:
+                    pass
+                else:
+                    self._remember(key, audio_data)
+                    self.hits += 1
+                    return audio_data
+
+            self.misses += 1
+            return None
+
+    def put(self, key, audio_data):
+        """
+        Store a WAV in both tiers and mark its file as served. The file is only written if
+        it is not on disk already.
+
+        Returns:
+        str: The file name of the entry inside the cache directory.
+        """
+        with self._lock:
+            self._remember(key, audio_data)
+            if self.retention.touch(self._retentionName(key)):
+                return self.filename(key)
+
+            # Write to a temporary file first so a concurrent reader never sees a partial WAV
+            temporary_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(temporary_path, 'wb') as f:
+                f.write(audio_data)
+            os.replace(temporary_path, self._path(key))
+            self.retention.add(self._retentionName(key), len(audio_data))
+            return self.filename(key)
+
+    def touch(self, filename):
+        """
+        Mark a file handed out earlier as served again.
+
+        Returns:
+        bool: False if the file has been removed since.
+        """
+        return self.retention.touch(os.path.relpath(os.path.join(self.directory, filename), self.retention.directory))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+    def _path(self, key):
+        return os.path.join(self.directory, self.filename(key))
+
+    def _retentionName(self, key):
+        return os.path.relpath(self._path(key), self.retention.directory)
+
+    def _remember(self, key, audio_data):
+        self._memory[key] = audio_data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -1,33 +1,487 @@
-from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC
+from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC, Wav2Vec2Config
 import torch
 from phonemizer.backend.espeak.wrapper import EspeakWrapper
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
+import threading
+import logging
+import os
 import numpy as np
 import pyphen
+from inference_batcher import BatchedInferenceWorker
+from phoneme_server import PhonemeServerClient, PhonemeServerUnavailable
+from pronunciation_cache import PronunciationCache
+from phoneme_normalization import TRANSCRIPTION_NORMALIZER, ESPEAK_NORMALIZER
+
+
+logger = logging.getLogger(__name__)
 
 
 # Set the path to the espeak-ng library and get espeak-ng recognized 
-_ESPEAK_LIBRARY = '/opt/homebrew/bin/espeak-ng'
-EspeakWrapper.set_library(_ESPEAK_LIBRARY)
+# (phonemizer searches the system library path when this file does not exist)
+_ESPEAK_LIBRARY = os.environ.get('PHONEMIZER_ESPEAK_LIBRARY', '/opt/homebrew/lib/libespeak-ng.dylib')
+if os.path.exists(_ESPEAK_LIBRARY):
+    EspeakWrapper.set_library(_ESPEAK_LIBRARY)
+_ESPEAK_VOICE = 'en-za'
+
+# espeak-ng settings of the reference pronunciations: speed (words per minute), pitch and volume
+_SYNTHESIS_SPEED = 130
+_SYNTHESIS_PITCH = 50
+_SYNTHESIS_AMPLITUDE = 150
+
+# Largest number of espeak-ng synthesis processes running at once
+_SYNTHESIS_WORKERS = min(8, os.cpu_count() or 1)
+
+
+_MODEL_NAME = "facebook/wav2vec2-xlsr-53-espeak-cv-ft"
 
 
 # Global variables for model, processor, and dictionary
 processor = None
 model = None
+model_config = None
+onnx_session = None
 dic = None
+espeak = None
+inference_batcher = None
+phoneme_client = None
+pronunciation_cache = None
+
+# Long recordings are recognized in chunks of chunk_samples with chunk_context_samples
+# of audio on either side (see enableChunkedInference)
+chunk_samples = None
+chunk_context_samples = 0
+_synthesis_executor = None
+_synthesis_executor_lock = threading.Lock()
+
+# The espeak-ng library is not re-entrant
+_espeak_lock = threading.Lock()
+
+# Guards loading the model when the phoneme server is unavailable (see _loadLocalAcousticModel)
+_local_model_lock = threading.Lock()
+
+# Readiness of the models loaded by loadModelsInBackground
+models_ready = threading.Event()
+model_loading_error = None
+_model_loader = None
 
 
-def instantiateModels():
+def instantiateModels(load_acoustic_model=True, quantize=False, num_threads=None, num_interop_threads=None,
+                      backend='torch', onnx_path=None):
     """
     Initialize the global models and processor.
     This function should be called once before using other functions in this module.
+
+    Args:
+    load_acoustic_model (bool): Load the wav2vec2 processor and model. Pass False when
+                                phoneme recognition is served by a separate process (see connectPhonemeServer).
+    quantize (bool): Use dynamic int8 quantization for the model's Linear layers.
+    num_threads (int): Intra-op thread count for torch (None keeps torch's default).
+    num_interop_threads (int): Inter-op thread count for torch (None keeps torch's default).
+    backend (str): 'torch' runs the model in PyTorch, 'onnx' runs the exported model at onnx_path
+                   through ONNX Runtime (see exportOnnxModel).
+    onnx_path (str): Path of the exported ONNX model, used by the 'onnx' backend.
     """
-    global processor, model, dic
-    processor = Wav2Vec2Processor.from_pretrained("facebook/wav2vec2-xlsr-53-espeak-cv-ft")
-    model = Wav2Vec2ForCTC.from_pretrained("facebook/wav2vec2-xlsr-53-espeak-cv-ft")
+    global processor, model, model_config, onnx_session, dic
+    configureTorchThreads(num_threads, num_interop_threads)
+    if load_acoustic_model:
+        processor = Wav2Vec2Processor.from_pretrained(_MODEL_NAME)
+        if backend == 'onnx':
+            model = None
+            model_config = Wav2Vec2Config.from_pretrained(_MODEL_NAME)
+            onnx_session = createOnnxSession(onnx_path, num_threads, num_interop_threads)
+        else:
+            model = Wav2Vec2ForCTC.from_pretrained(_MODEL_NAME)
+            model_config = model.config
+            onnx_session = None
+            if quantize:
+                model = quantizeModel(model)
     dic = pyphen.Pyphen(lang='en')
-   
-    
+    instantiateEspeak()
+
+
+def instantiateEspeak(voice=_ESPEAK_VOICE):
+    """
+    Load libespeak-ng in-process so sentenceToPhonemes does not fork an espeak-ng
+    process per sentence. If the library cannot be loaded, sentenceToPhonemes keeps
+    using the espeak-ng command line.
+
+    Args:
+    voice (str): The espeak voice used for phonemization.
+    """
+    global espeak
+    try:
+        wrapper = EspeakWrapper()
+        wrapper.set_voice(voice)
+    except (RuntimeError, OSError) as e:
+        logger.warning("Using the espeak-ng command line, the library could not be loaded: %s", e)
+        espeak = None
+        return
+    espeak = wrapper
+
+
+def loadModelsInBackground(load_models):
+    """
+    Run the model loading function in a background thread so the server can answer
+    requests that don't need the models while they load. models_ready is set once
+    loading completes. Only the first call starts a loader.
+
+    Args:
+    load_models (callable): Loads and configures the models (e.g. calls instantiateModels).
+
+    Returns:
+    threading.Thread: The loader thread.
+    """
+    global _model_loader
+
+    def run():
+        global model_loading_error
+        try:
+            load_models()
+        except Exception as e:
+            model_loading_error = f"{type(e).__name__}: {e}"
+            logger.error("Loading the speech models failed: %s", model_loading_error)
+            return
+        models_ready.set()
+
+    if _model_loader is None:
+        _model_loader = threading.Thread(target=run, name="model-loader", daemon=True)
+        _model_loader.start()
+    return _model_loader
+
+
+def modelStatus():
+    """
+    Report the state of the background model loading.
+
+    Returns:
+    str: 'ready', 'loading' or 'failed'.
+    """
+    if models_ready.is_set():
+        return 'ready'
+    if model_loading_error is not None:
+        return 'failed'
+    return 'loading'
+
+
+def configureTorchThreads(num_threads=None, num_interop_threads=None):
+    """
+    Set torch's intra-op and inter-op thread pools.
+
+    Args:
+    num_threads (int): Threads used inside a single operator (None leaves it unchanged).
+    num_interop_threads (int): Threads used to run independent operators (None leaves it unchanged).
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work has started
+            logger.warning("Could not set inter-op threads: %s", e)
+
+
+def quantizeModel(fp32_model):
+    """
+    Apply dynamic int8 quantization to the Linear layers of a model for CPU inference.
+    Weights are stored as int8 and activations are quantized on the fly.
+
+    Args:
+    fp32_model (torch.nn.Module): The model to quantize.
+
+    Returns:
+    torch.nn.Module: The quantized model.
+    """
+    return torch.ao.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def exportOnnxModel(onnx_path, opset_version=17):
+    """
+    Export the loaded wav2vec2 CTC model to ONNX, with dynamic batch and length axes.
+    This only needs to run once; the file is then served by the 'onnx' backend.
+
+    Args:
+    onnx_path (str): Where to write the ONNX model.
+    opset_version (int): ONNX opset to target.
+    """
+    example_values = torch.zeros(1, 16000)
+    example_mask = torch.ones(1, 16000, dtype=torch.long)
+    dynamic_axes = {
+        'input_values': {0: 'batch', 1: 'samples'},
+        'attention_mask': {0: 'batch', 1: 'samples'},
+        'logits': {0: 'batch', 1: 'frames'},
+    }
+    torch.onnx.export(
+        model, (example_values, example_mask), onnx_path,
+        input_names=['input_values', 'attention_mask'], output_names=['logits'],
+        dynamic_axes=dynamic_axes, opset_version=opset_version, dynamo=False,
+    )
+
+
+def createOnnxSession(onnx_path, num_threads=None, num_interop_threads=None):
+    """
+    Open an exported model with ONNX Runtime on CPU.
+
+    Args:
+    onnx_path (str): Path of the exported ONNX model.
+    num_threads (int): Intra-op thread count (None keeps the runtime default).
+    num_interop_threads (int): Inter-op thread count (None keeps the runtime default).
+
+    Returns:
+    onnxruntime.InferenceSession: The inference session.
+    """
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    if num_interop_threads:
+        options.inter_op_num_threads = num_interop_threads
+    return onnxruntime.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _computeLogits(input_values, attention_mask=None):
+    """
+    Run the acoustic model on the configured backend.
+
+    Args:
+    input_values (torch.Tensor): Normalised waveforms, shape (batch, samples).
+    attention_mask (torch.Tensor): Optional mask of real (1) and padded (0) samples.
+
+    Returns:
+    torch.Tensor: CTC logits, shape (batch, frames, vocabulary).
+    """
+    if onnx_session is not None:
+        if attention_mask is None:
+            attention_mask = torch.ones(input_values.shape, dtype=torch.long)
+        logits = onnx_session.run(['logits'], {
+            'input_values': input_values.numpy(),
+            'attention_mask': attention_mask.numpy().astype(np.int64),
+        })[0]
+        return torch.from_numpy(logits)
+
+    with torch.no_grad():
+        return model(input_values, attention_mask=attention_mask).logits
+
+
+def _frameLengths(sample_lengths):
+    """
+    Number of logit frames the convolutional feature encoder produces for each input length.
+
+    Args:
+    sample_lengths (torch.Tensor): Number of real samples per waveform.
+
+    Returns:
+    torch.Tensor: Number of logit frames per waveform.
+    """
+    config = model.config if model is not None else model_config
+    frame_lengths = sample_lengths
+    for kernel, stride in zip(config.conv_kernel, config.conv_stride):
+        frame_lengths = torch.div(frame_lengths - kernel, stride, rounding_mode='floor') + 1
+    return frame_lengths
+
+
+def _frameStride():
+    """
+    Number of samples between two logit frames (the product of the feature encoder strides).
+    """
+    config = model.config if model is not None else model_config
+    return int(np.prod(config.conv_stride))
+
+
+def _receptiveFieldOverhang():
+    """
+    Number of samples beyond a frame's own stride that its logits depend on, on either side:
+    the feature encoder reads past the end of the frame and the positional convolution
+    mixes in num_conv_pos_embeddings // 2 neighbouring frames. The transformer layers
+    attend to the whole input and are not counted.
+    """
+    config = model.config if model is not None else model_config
+    receptive_field, jump = 1, 1
+    for kernel, stride in zip(config.conv_kernel, config.conv_stride):
+        receptive_field += (kernel - 1) * jump
+        jump *= stride
+    return receptive_field - jump + (config.num_conv_pos_embeddings // 2) * jump
+
+
+def _checkChunkContext(context_samples):
+    overhang = _receptiveFieldOverhang()
+    if context_samples < overhang:
+        raise ValueError(f"The chunk context must be at least {overhang / 16000:.2f} seconds "
+                         f"(the receptive field of the model beyond a chunk), got {context_samples / 16000:.2f}")
+
+
+def _chunkedLogits(input_values):
+    """
+    Compute the logits of one long normalised waveform chunk by chunk, so the attention
+    memory is bounded by the chunk size instead of growing with the square of the length.
+
+    Chunk boundaries are multiples of the feature encoder stride, so the frames of every
+    chunk line up with the frames of the whole waveform. Each chunk is run with context
+    on both sides and only the frames that start inside the chunk are kept.
+
+    Args:
+    input_values (torch.Tensor): The normalised waveform, shape (1, samples).
+
+    Returns:
+    torch.Tensor: CTC logits of the whole waveform, shape (1, frames, vocabulary).
+
+    Raises:
+    ValueError: If the context is shorter than the receptive field overhang, so the frames
+                at chunk edges would be computed from truncated input.
+    """
+    _checkChunkContext(chunk_context_samples)
+    stride = _frameStride()
+    length = input_values.shape[1]
+    total_frames = int(_frameLengths(torch.tensor([length]))[0])
+    step = max(1, chunk_samples // stride) * stride
+    context = -(-chunk_context_samples // stride) * stride
+
+    pieces = []
+    for start in range(0, length, step):
+        end = min(length, start + step)
+        first_frame = start // stride
+        last_frame = total_frames if end == length else end // stride
+        if last_frame <= first_frame:
+            continue
+
+        window_start = max(0, start - context)
+        logits = _computeLogits(input_values[:, window_start:min(length, end + context)])
+        offset = window_start // stride
+        pieces.append(logits[:, first_frame - offset:last_frame - offset])
+
+    return torch.cat(pieces, dim=1)
+
+
+def connectPhonemeServer(address, authkey, timeout=60):
+    """
+    Send phoneme recognition to a phoneme_server process instead of running the model here.
+    When the server does not answer within the timeout, the recording is recognized by a
+    model loaded in this process on first use.
+
+    Args:
+    address (str): "host:port" or Unix socket path of the server.
+    authkey (bytes): Shared secret configured on the server.
+    timeout (float): Seconds to wait for a connection to the server and for each answer.
+    """
+    global phoneme_client
+    phoneme_client = PhonemeServerClient(address, authkey, timeout)
+
+
+def _loadLocalAcousticModel():
+    """
+    Load the acoustic model in this process if it is not loaded yet, for recognizing
+    recordings while the phoneme server is unavailable.
+    """
+    global processor, model, model_config
+    with _local_model_lock:
+        if processor is not None:
+            return
+        local_model = Wav2Vec2ForCTC.from_pretrained(_MODEL_NAME)
+        model, model_config = local_model, local_model.config
+        # Set last, audioToPhonemes only uses the model once the processor is there
+        processor = Wav2Vec2Processor.from_pretrained(_MODEL_NAME)
+
+
+def enableBatchedInference(max_batch_size=8, max_wait_ms=10):
+    """
+    Route audioToPhonemes through a BatchedInferenceWorker so that concurrent requests
+    share one forward pass. Call after instantiateModels.
+
+    Args:
+    max_batch_size (int): Largest number of utterances per forward pass.
+    max_wait_ms (float): How long the worker waits for more requests before running a batch.
+    """
+    global inference_batcher
+    if inference_batcher is not None:
+        inference_batcher.stop()
+    inference_batcher = BatchedInferenceWorker(audioBatchToPhonemes, max_batch_size, max_wait_ms)
+    inference_batcher.start()
+
+
+def enableChunkedInference(chunk_seconds=20, context_seconds=2):
+    """
+    Recognize recordings longer than chunk_seconds (plus the context) in chunks, e.g. a
+    learner reading a whole story in one take, to bound the memory of the forward pass.
+
+    Args:
+    chunk_seconds (float): Audio whose frames are kept from each forward pass.
+    context_seconds (float): Audio added on either side of a chunk so its edges are recognized with context.
+
+    Raises:
+    ValueError: If the models are loaded and context_seconds is shorter than their receptive field overhang.
+    """
+    global chunk_samples, chunk_context_samples
+    if model is not None or model_config is not None:
+        _checkChunkContext(int(context_seconds * 16000))
+    chunk_samples = int(chunk_seconds * 16000)
+    chunk_context_samples = int(context_seconds * 16000)
+
+
+def _useChunkedInference(audio_length):
+    return chunk_samples is not None and audio_length > chunk_samples + 2 * chunk_context_samples
+
+
+def enablePronunciationCache(directory, max_memory_entries=512, retention=None):
+    """
+    Cache the reference pronunciations made by generateAudioFiles, so repeated words are
+    not synthesized again and are served from one stable file (see storePronunciationAudio).
+
+    Args:
+    directory (str): Folder holding the cached WAV files.
+    max_memory_entries (int): Number of WAVs kept in memory.
+    retention (AudioRetention): Retention index that bounds the cached files on disk.
+    """
+    global pronunciation_cache
+    pronunciation_cache = PronunciationCache(directory, max_memory_entries, retention)
+
+
+def _pronunciationKey(word):
+    return PronunciationCache.key(word, _ESPEAK_VOICE, _SYNTHESIS_SPEED, _SYNTHESIS_PITCH, _SYNTHESIS_AMPLITUDE)
+
+
+def storePronunciationAudio(word, audio_data):
+    """
+    Make sure the reference pronunciation of a word is on disk. Nothing is written when
+    the cache already holds the file.
+
+    Args:
+    word (str): The word that was synthesized.
+    audio_data (bytes): Its WAV data, as returned by generateAudioFiles.
+
+    Returns:
+    str: The file name inside the pronunciation cache directory.
+    """
+    return pronunciation_cache.put(_pronunciationKey(word), audio_data)
+
+
+def touchPronunciationAudio(audio_filename):
+    """
+    Mark a reference pronunciation returned by storePronunciationAudio as served again.
+
+    Args:
+    audio_filename (str): The file name inside the pronunciation cache directory.
+
+    Returns:
+    bool: False if the file has been removed since.
+    """
+    return pronunciation_cache.touch(audio_filename)
+
+
+def _cleanTranscription(transcription):
+    """
+    Flatten a decoded wav2vec transcription and apply common corrections.
+
+    Args:
+    transcription (str): The decoded transcription with spaces between words.
+
+    Returns:
+    str: A string of phonemes flattened with no spaces.
+    """
+    return TRANSCRIPTION_NORMALIZER(transcription)    #ðəkwɪkbɹaʊnfɔksdʒampsoʊvəðəleɪzidɔɡ
+
 
 def audioToPhonemes(audio_file):
     """
@@ -41,29 +495,82 @@ def audioToPhonemes(audio_file):
     """
     global processor,model
 
-    # Tokenize audio file
+    if phoneme_client is not None:
+        try:
+            return phoneme_client.recognize(audio_file)
+        except PhonemeServerUnavailable as e:
+            logger.warning("Phoneme server unavailable, recognizing in this process: %s", e)
+            _loadLocalAcousticModel()
+    # Long recordings would pad a whole batch to their length, they are recognized in chunks instead
+    if inference_batcher is not None and not _useChunkedInference(len(audio_file)):
+        return inference_batcher.submit(audio_file)
+
+    # Tokenize audio file (the whole recording is normalised at once, also when it is recognized in chunks)
     input_values = processor(audio_file, return_tensors="pt").input_values
 
     # Retrieve logits
-    with torch.no_grad():
-        logits = model(input_values).logits
+    if _useChunkedInference(input_values.shape[1]):
+        logits = _chunkedLogits(input_values)
+    else:
+        logits = _computeLogits(input_values)
 
     # Take argmax and decode
     predicted_ids = torch.argmax(logits, dim=-1)
     transcription = processor.batch_decode(predicted_ids)
-    
-    transcription = transcription[0].replace(' ','')    #ðəkwɪkbɹaʊnfɔksdʒampsoʊvɚðəleɪzidɔɡ
 
-    
-    # Apply common corrections
-    corrections = {
-        'ː': '', 'ɚ': 'ə', 'ðɪ': 'ðə', 'tu': 'tə', 'ðɛ': 'ðe', 'dɛ': 'de','da':'ðə','ei':'ɐ'
-    }
-    for old, new in corrections.items():
-        transcription = transcription.replace(old, new)
-    return transcription
+    return _cleanTranscription(transcription[0])
+
+
+def audioBatchToPhonemes(audio_files):
+    """
+    Convert several audio files to phonemes with a single padded forward pass.
+
+    Args:
+    audio_files (list): The input waveforms, which may have different lengths.
+
+    Returns:
+    list: One flattened phoneme string per waveform, in the same order.
+    """
+    global processor,model
+
+    # Pad to the longest waveform; the attention mask keeps padding out of normalisation and attention
+    inputs = processor(audio_files, padding=True, return_attention_mask=True, return_tensors="pt")
+
+    logits = _computeLogits(inputs.input_values, inputs.attention_mask)
+
+    # Only decode the frames that cover real audio
+    predicted_ids = torch.argmax(logits, dim=-1)
+    frame_lengths = _frameLengths(inputs.attention_mask.sum(dim=-1))
+    transcriptions = processor.batch_decode([ids[:length] for ids, length in zip(predicted_ids, frame_lengths)])
+
+    return [_cleanTranscription(transcription) for transcription in transcriptions]
     
     
+def _espeakPhonemes(sentence):
+    """
+    Get the raw IPA phonemes for a sentence from espeak-ng, with '_' between phonemes and
+    ' ' between words. Uses the in-process library when it is loaded, otherwise runs the
+    espeak-ng command line.
+
+    Args:
+    sentence (str): The input sentence.
+
+    Returns:
+    str: The raw espeak-ng phoneme string.
+    """
+    if espeak is not None:
+        with _espeak_lock:
+            return espeak.text_to_phonemes(sentence)
+
+    result = subprocess.run(
+        ['espeak-ng', '--ipa=1','-q', '-v', _ESPEAK_VOICE, sentence],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout
+
+
 def sentenceToPhonemes(sentence):
     """
     Convert a sentence to phonemes using espeak-ng.
@@ -75,21 +582,11 @@ def sentenceToPhonemes(sentence):
     list: A list of phoneme strings for each word of the sentence
     """
     try:
-        result = subprocess.run(
-            ['espeak-ng', '--ipa=1','-q', '-v', 'en-za', sentence],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        phonemes = result.stdout.strip()
+        phonemes = _espeakPhonemes(sentence).strip()
         
         
         # Cleaning up phoneme string
-        phonemes = phonemes.replace("_","")
-        phonemes = phonemes.replace('ˈ', '')
-        phonemes = phonemes.replace('ˌ', '')
-        phonemes = phonemes.replace('ː', '')
-        phonemes = phonemes.replace("\\", '')
+        phonemes = ESPEAK_NORMALIZER(phonemes)
         
         # ['ðə','kwɪk','bɹaʊn','fɒks','dʒʌmps','əʊvə','ðə','leɪzi','dɒɡ']
         espeak_arr = phonemes.split(' ')
@@ -102,11 +599,83 @@ def sentenceToPhonemes(sentence):
         return espeak_arr
     
     except subprocess.CalledProcessError as e:
-        print("Error occurred:", e.stderr)
+        logger.error("espeak-ng failed to phonemize the sentence: %s", e.stderr)
         return None, None
     
     
-def needlemanWunsch(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=-1):
+def _encodeSequence(seq):
+    """
+    Encode a phoneme string as an array of code points so that a whole row of
+    character comparisons can be done in one NumPy operation.
+
+    Args:
+    seq (str): The phoneme string.
+
+    Returns:
+    np.ndarray: One int32 code point per character.
+    """
+    return np.fromiter((ord(char) for char in seq), dtype=np.int32, count=len(seq))
+
+
+def _needlemanWunschRows(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=-1, band=None):
+    """
+    Yield the rows of the Needleman-Wunsch scoring matrix one at a time.
+
+    Each row is computed with vectorised NumPy operations: the diagonal and vertical
+    moves only depend on the previous row, and because the gap penalty is linear the
+    horizontal moves collapse into a running maximum over the row. Integer scores are
+    kept in an integer dtype so the results are exact.
+
+    Args:
+    seq1 (str): First sequence (one row per character).
+    seq2 (str): Second sequence (one column per character).
+    match_score (int): Score for matching characters.
+    mismatch_penalty (int): Penalty for mismatching characters.
+    gap_penalty (int): Penalty for gaps.
+    band (int): Optional band limit, only cells with |i - j| <= band are filled.
+                The band is widened to |len(seq1) - len(seq2)| so the final cell is always reachable.
+
+    Yields:
+    np.ndarray: Row i of the scoring matrix (length len(seq2) + 1), for i = 0..len(seq1).
+    """
+    n, m = len(seq1), len(seq2)
+    integer_scores = all(isinstance(value, (int, np.integer)) for value in (match_score, mismatch_penalty, gap_penalty))
+    dtype = np.int64 if integer_scores else np.float64
+    # Unreachable cells (outside the band) hold a large negative value instead of -inf for integer dtypes
+    unreachable = np.iinfo(np.int64).min // 4 if integer_scores else -np.inf
+
+    if band is None:
+        band = max(n, m)
+    band = max(band, abs(n - m))
+
+    codes1 = _encodeSequence(seq1)
+    codes2 = _encodeSequence(seq2)
+    gap_offsets = np.arange(m + 1, dtype=dtype) * gap_penalty
+
+    # First row: seq2 prefixes aligned against nothing
+    row = np.full(m + 1, unreachable, dtype=dtype)
+    row[:min(m, band) + 1] = gap_offsets[:min(m, band) + 1]
+    yield row
+
+    for i in range(1, n + 1):
+        previous = row
+        row = np.full(m + 1, unreachable, dtype=dtype)
+        if i <= band:
+            row[0] = i * gap_penalty
+
+        lo, hi = max(1, i - band), min(m, i + band)
+        if lo <= hi:
+            substitution = np.where(codes2[lo - 1:hi] == codes1[i - 1], match_score, mismatch_penalty)
+            best = np.maximum(previous[lo - 1:hi] + substitution, previous[lo:hi + 1] + gap_penalty)
+
+            # row[j] = max(best[j], row[j - 1] + gap) == max over k <= j of (best[k] + (j - k) * gap)
+            offsets = gap_offsets[lo - 1:hi + 1]
+            seeded = np.concatenate(([row[lo - 1]], best))
+            row[lo - 1:hi + 1] = np.maximum.accumulate(seeded - offsets) + offsets
+        yield row
+
+
+def needlemanWunsch(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=-1, band=None):
     """
     Compute the Needleman-Wunsch alignment for two sequences.
 
@@ -116,34 +685,126 @@ def needlemanWunsch(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=
     match_score (int): Score for matching characters.
     mismatch_penalty (int): Penalty for mismatching characters.
     gap_penalty (int): Penalty for gaps.
+    band (int): Optional band limit around the main diagonal (None computes the full matrix).
 
     Returns:
     float: The alignment score.
     """
-    n, m = len(seq1), len(seq2)
-    score = np.zeros((n + 1, m + 1))
-    
-    # Initialize first row and column
-    for i in range(1, n + 1):
-        score[i][0] = i * gap_penalty
-    for j in range(1, m + 1):
-        score[0][j] = j * gap_penalty
-    
-    # Fill the scoring matrix
-    for i in range(1, n + 1):
-        for j in range(1, m + 1):
-            if seq1[i - 1] == seq2[j - 1]:
-                diag_score = score[i - 1][j - 1] + match_score
-            else:
-                diag_score = score[i - 1][j - 1] + mismatch_penalty
-            score[i][j] = max(score[i - 1][j] + gap_penalty, score[i][j - 1] + gap_penalty, diag_score)
-    
+    for row in _needlemanWunschRows(seq1, seq2, match_score, mismatch_penalty, gap_penalty, band):
+        pass
+
     # The score for optimal alignment
-    alignment_score = score[n][m]
+    alignment_score = float(row[len(seq2)])
     return alignment_score
 
 
-def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr):
+def bestSegmentMatch(word, wav2vec_string, start_index):
+    """
+    Find the wav2vec segment starting at start_index that best matches a word, using a
+    single alignment of the word against the rest of the wav2vec string.
+
+    Row n of the scoring matrix holds the score of the word against every prefix of the
+    remaining string, so the best segment length is read off that row instead of
+    re-aligning each candidate length from scratch.
+
+    Args:
+    word (str): The espeak phonemes of the word.
+    wav2vec_string (str): Flattened string of phonemes from wav2vec.
+    start_index (int): Where the segment starts in wav2vec_string.
+
+    Returns:
+    tuple: The distance of the best segment and the index just past its end.
+    """
+    remaining = wav2vec_string[start_index:]
+    if not remaining:
+        return float('inf'), start_index
+
+    for last_row in _needlemanWunschRows(word, remaining, match_score=2, mismatch_penalty=-1, gap_penalty=-2):
+        pass
+
+    # Distance of every segment length 1..len(remaining), scanned shortest first
+    distances = -last_row[1:]
+
+    # Stop at the first exact match, then keep the first minimum (as the per-length scan does)
+    exact_matches = np.flatnonzero(distances == 0)
+    if exact_matches.size:
+        distances = distances[:exact_matches[0] + 1]
+    best_length = int(np.argmin(distances)) + 1
+
+    return float(distances[best_length - 1]), start_index + best_length
+
+
+def globalWordAlignment(espeak_phonemes, wav2vec_string, match_score=2, mismatch_penalty=-1, gap_penalty=-2):
+    """
+    Align the whole sentence against the wav2vec string in one Needleman-Wunsch pass and
+    split the optimal alignment back into words.
+
+    The espeak words are concatenated into one reference string with a word-boundary marker
+    (the word index) kept for every reference phoneme. Wav2vec phonemes left over after the
+    last word are not penalised, and phonemes inserted between two words are given to the
+    word that follows, mirroring how the greedy search starts each segment.
+
+    Args:
+    espeak_phonemes (list): List of words as phonemes from espeak.
+    wav2vec_string (str): Flattened string of phonemes from wav2vec.
+    match_score (int): Score for matching characters.
+    mismatch_penalty (int): Penalty for mismatching characters.
+    gap_penalty (int): Penalty for gaps.
+
+    Returns:
+    tuple: Per-word distances (list of float) and the wav2vec segment aligned to each word (list of str).
+    """
+    reference = ''.join(espeak_phonemes)
+    word_of_phoneme = [index for index, word in enumerate(espeak_phonemes) for _ in word]
+    word_starts = set()
+    position = 0
+    for word in espeak_phonemes:
+        word_starts.add(position)
+        position += len(word)
+
+    if not espeak_phonemes:
+        return [], []
+
+    score = np.vstack(list(_needlemanWunschRows(reference, wav2vec_string, match_score, mismatch_penalty, gap_penalty)))
+    word_scores = [0] * len(espeak_phonemes)
+    word_segments = [[] for _ in espeak_phonemes]
+
+    def wordForInsertion(i):
+        # Wav2vec phonemes inserted at a word boundary belong to the next word
+        if i == len(reference):
+            return len(espeak_phonemes) - 1
+        if i in word_starts:
+            return word_of_phoneme[i]
+        return word_of_phoneme[i - 1]
+
+    # Free trailing wav2vec phonemes: start the traceback from the best cell of the last row
+    i, j = len(reference), int(np.argmax(score[-1]))
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            substitution = match_score if reference[i - 1] == wav2vec_string[j - 1] else mismatch_penalty
+            if score[i, j] == score[i - 1, j - 1] + substitution:
+                word_scores[word_of_phoneme[i - 1]] += substitution
+                word_segments[word_of_phoneme[i - 1]].append(wav2vec_string[j - 1])
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and score[i, j] == score[i - 1, j] + gap_penalty:
+            # Reference phoneme that was not spoken
+            word_scores[word_of_phoneme[i - 1]] += gap_penalty
+            i -= 1
+        else:
+            # Spoken phoneme with no reference counterpart
+            word = wordForInsertion(i)
+            word_scores[word] += gap_penalty
+            word_segments[word].append(wav2vec_string[j - 1])
+            j -= 1
+
+    # Convert scores to distances (negative because higher scores are better in NW)
+    word_distances = [float(-word_score) for word_score in word_scores]
+    word_segments = [''.join(reversed(segment)) for segment in word_segments]
+    return word_distances, word_segments
+
+
+def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr, segment_search='prefix', alignment_mode='greedy'):
     """
     Identify mispronounced words by comparing espeak phonemes with wav2vec phonemes.
 
@@ -151,6 +812,10 @@ def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr):
     espeak_phonemes (list): List of words as phonemes from espeak.
     wav2vec_string (str): Flattened string of phonemes from wav2vec.
     sentence_arr (list): Original sentence split into words.
+    segment_search (str): 'prefix' aligns each word once against the rest of the utterance,
+                          'exhaustive' re-aligns every candidate segment length separately.
+    alignment_mode (str): 'greedy' matches words left to right one segment at a time,
+                          'global' aligns the whole sentence at once (see globalWordAlignment).
 
     Returns:
     list: List of mispronounced words.
@@ -170,6 +835,20 @@ def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr):
             return max(0.5, min(1.0, length / 4.0))
 
     mispronounced_words = []
+
+    if alignment_mode == 'global':
+        word_distances, word_segments = globalWordAlignment(espeak_phonemes, wav2vec_string)
+        for index, word in enumerate(espeak_phonemes):
+            # If key phoneme is present, assume correct pronunciation
+            if word.lower() in key_phoneme_acceptance and key_phoneme_acceptance[word.lower()] in word_segments[index]:
+                continue
+
+            # Mark as mispronounced if distance exceeds threshold
+            threshold = calculateThreshold(sentence_arr[index], len(word))
+            if word_distances[index] > threshold:
+                mispronounced_words.append(sentence_arr[index])
+        return mispronounced_words
+
     start_index = 0
 
     # Iterate over each word in the espeak_phonemes array
@@ -184,23 +863,26 @@ def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr):
                 continue
 
         # Find best matching segment in wav2vec string
-        min_distance = float('inf')
-        best_match_index = start_index
-        for length in range(1, len(wav2vec_string) - start_index + 1):
-            wav2vec_segment = wav2vec_string[start_index:start_index + length]
-            nw_score = needlemanWunsch(word, wav2vec_segment, match_score=2, mismatch_penalty=-1, gap_penalty=-2)
+        if segment_search == 'prefix':
+            min_distance, best_match_index = bestSegmentMatch(word, wav2vec_string, start_index)
+        else:
+            min_distance = float('inf')
+            best_match_index = start_index
+            for length in range(1, len(wav2vec_string) - start_index + 1):
+                wav2vec_segment = wav2vec_string[start_index:start_index + length]
+                nw_score = needlemanWunsch(word, wav2vec_segment, match_score=2, mismatch_penalty=-1, gap_penalty=-2)
 
-            # Convert score to distance (negative because higher scores are better in NW)
-            distance = -nw_score
+                # Convert score to distance (negative because higher scores are better in NW)
+                distance = -nw_score
 
-            # Check if this is the best match
-            if distance < min_distance:
-                min_distance = distance
-                best_match_index = start_index + length
+                # Check if this is the best match
+                if distance < min_distance:
+                    min_distance = distance
+                    best_match_index = start_index + length
 
-            # Stop if we find an exact match
-            if distance == 0:
-                break
+                # Stop if we find an exact match
+                if distance == 0:
+                    break
 
         # Mark as mispronounced if distance exceeds threshold
         threshold = calculateThreshold(sentence_arr[index], len(word))
@@ -213,43 +895,80 @@ def findMispronouncedWords(espeak_phonemes, wav2vec_string, sentence_arr):
     return mispronounced_words
 
 
+def _synthesizeWord(word):
+    """
+    Synthesize the reference pronunciation of one word with espeak-ng, or take it from
+    the pronunciation cache.
+
+    Args:
+    word (str): The word to pronounce.
+
+    Returns:
+    bytes: The WAV data, or None if espeak-ng failed.
+    """
+    # Words synthesized before are served from the pronunciation cache
+    if pronunciation_cache is not None:
+        audio_data = pronunciation_cache.get(_pronunciationKey(word))
+        if audio_data is not None:
+            return audio_data
+
+    try:
+        command = [
+            "espeak-ng",
+            "-v", _ESPEAK_VOICE,               # Voice selection (ZA English)
+            "-s", str(_SYNTHESIS_SPEED),       # Speed (130 words per minute)
+            "-p", str(_SYNTHESIS_PITCH),       # Pitch (neutral)
+            "-a", str(_SYNTHESIS_AMPLITUDE),   # Volume (slightly increased)
+            word,
+            "--stdout"        # Output the audio to stdout instead of a file
+        ]
+
+        # Run the command and capture the audio output in memory
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        if result.returncode == 0:
+            audio_data = result.stdout  # Audio data (WAV format)
+            if pronunciation_cache is not None:
+                pronunciation_cache.put(_pronunciationKey(word), audio_data)
+            return audio_data
+        else:
+            logger.warning("Error generating audio for word '%s': %s", word, result.stderr.decode())
+
+    except subprocess.CalledProcessError as e:
+        logger.error("Subprocess error occurred: %s", e.stderr)
+
+    return None
+
+
+def _synthesisExecutor():
+    """
+    Thread pool shared by all requests, so concurrent requests cannot start more than
+    _SYNTHESIS_WORKERS espeak-ng processes at a time.
+    """
+    global _synthesis_executor
+    with _synthesis_executor_lock:
+        if _synthesis_executor is None:
+            _synthesis_executor = ThreadPoolExecutor(max_workers=_SYNTHESIS_WORKERS, thread_name_prefix="espeak-synthesis")
+        return _synthesis_executor
+
+
 def generateAudioFiles(mispronounced_words_arr):
     """
     Generate correct pronounciation audio files for mispronounced words using espeak-ng.
+    The espeak-ng processes of the different words run concurrently.
 
     Args:
     mispronounced_words_arr (list): List of mispronounced words.
 
     Returns:
-    list: List of audio data for each mispronounced word.
+    list: The audio data of each mispronounced word, in the order of the words, with None
+          for the words espeak-ng failed to synthesize so the others keep their positions.
     """
-    audio_files = []
-    
-    for word in mispronounced_words_arr:
-        try:
-            command = [
-                "espeak-ng",
-                "-v", "en-za",    # Voice selection (ZA English)
-                "-s", "130",      # Speed (130 words per minute)
-                "-p", "50",       # Pitch (neutral)
-                "-a", "150",      # Volume (slightly increased)
-                word,
-                "--stdout"        # Output the audio to stdout instead of a file
-            ]
-
-            # Run the command and capture the audio output in memory
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-            if result.returncode == 0:
-                audio_data = result.stdout  # Audio data (WAV format)
-                audio_files.append(audio_data)
-            else:
-                print(f"Error generating audio for word '{word}': {result.stderr.decode()}")
-
-        except subprocess.CalledProcessError as e:
-            print(f"Subprocess error occurred: {e.stderr}")
-            
-    return audio_files
+    if len(mispronounced_words_arr) <= 1:
+        return [_synthesizeWord(word) for word in mispronounced_words_arr]
+
+    # map() yields the results in the order of the words, whichever process finishes first
+    return list(_synthesisExecutor().map(_synthesizeWord, mispronounced_words_arr))
 
 
 def generateSyllables(words):
@@ -262,6 +981,10 @@ def generateSyllables(words):
     Returns:
     list: List of syllable spellings for each word.
     """
+    global dic
+    if dic is None:
+        dic = pyphen.Pyphen(lang='en')
+
     syllables_list = []
     for word in words:
         syllable_string = dic.inserted(word)
@@ -270,30 +993,53 @@ def generateSyllables(words):
     return syllables_list
     
     
-def analyzeSpeech(audio_file, sentence):
+def analyzeSpeech(audio_file, sentence, alignment_mode='greedy', espeak_arr=None, syllables=None):
     """
     Analyze speech by comparing an audio file to a given sentence.
 
     Args:
     audio_file (file): The input audio file of user pronouncing a sentence.
     sentence (str): The sentence read by the user.
+    alignment_mode (str): Word alignment strategy passed to findMispronouncedWords ('greedy' or 'global').
+    espeak_arr (list): Precomputed espeak phonemes of the sentence, phonemized on the fly when None.
+    syllables (dict): Precomputed syllable spellings by word, generated on the fly for missing words.
 
     Returns:
     tuple: A tuple containing lists of mispronounced words, their audio files, and syllable spellings.
     """
     wav2vec_phonemes = audioToPhonemes(audio_file)
-    
-    espeak_arr = sentenceToPhonemes(sentence)
+    return analyzeTranscription(wav2vec_phonemes, sentence, alignment_mode, espeak_arr, syllables)
+
+
+def analyzeTranscription(wav2vec_phonemes, sentence, alignment_mode='greedy', espeak_arr=None, syllables=None):
+    """
+    Compare recognized phonemes to a given sentence, the second half of analyzeSpeech.
+    Used directly when the phonemes were recognized while streaming (see StreamingRecognizer).
+
+    Args:
+    wav2vec_phonemes (str): The flattened phonemes recognized from the user's audio.
+    sentence (str): The sentence read by the user.
+    alignment_mode (str): Word alignment strategy passed to findMispronouncedWords ('greedy' or 'global').
+    espeak_arr (list): Precomputed espeak phonemes of the sentence, phonemized on the fly when None.
+    syllables (dict): Precomputed syllable spellings by word, generated on the fly for missing words.
+
+    Returns:
+    tuple: A tuple containing lists of mispronounced words, their audio files, and syllable spellings.
+    """
+    if espeak_arr is None:
+        espeak_arr = sentenceToPhonemes(sentence)
     sentence_arr = sentence.split(' ')   # ['The','quick','brown','fox','jumps','over','the','lazy','dog']
     
-    print(f"This is the wav2vec phonemes: {wav2vec_phonemes}")
-    print(f"This is the espeak_arr: {espeak_arr}")
-    #print(f"This is the sentence_arr: {sentence_arr}")
-    mispronounced_words_data = findMispronouncedWords(espeak_arr,wav2vec_phonemes,sentence_arr)
+    logger.debug("Recognized phonemes: %s", wav2vec_phonemes)
+    logger.debug("Expected phonemes: %s", espeak_arr)
+    mispronounced_words_data = findMispronouncedWords(espeak_arr,wav2vec_phonemes,sentence_arr,alignment_mode=alignment_mode)
     
     # Generate correct pronounciation audio files for mispronounced words
     audio_files = generateAudioFiles(mispronounced_words_data)
-    syllables_list = generateSyllables(mispronounced_words_data)
+    if syllables is None:
+        syllables_list = generateSyllables(mispronounced_words_data)
+    else:
+        syllables_list = [syllables[word] if word in syllables else generateSyllables([word])[0] for word in mispronounced_words_data]
     
     return (mispronounced_words_data,audio_files,syllables_list)
     
@@ -1,7 +1,11 @@
-from flask import jsonify, request,session
+from flask import jsonify, request,session,current_app
 from . import statistic_bp
 from models import Statistic, Story
 from app import db
+from datetime import datetime
+import math
+from learner_statistics import record_statistic, record_statistics
+from statistic_rollups import add_to_rollups
 
 
 @statistic_bp.route("/upload_statistics",methods=["POST"])
@@ -17,12 +21,22 @@ def upload_statistics():
     # Check if the required data is provided
     if not errorsMade or not pronounciationScore or not story_id:
         return jsonify({"error": "Missing data"}), 400
+
+    # The running totals and rollups need finite numbers and the story's difficulty
+    try:
+        errorsMade, pronounciationScore, wordsPerMinute = (parse_metric(value) for value in (errorsMade, pronounciationScore, wordsPerMinute))
+        story_id = parse_story_id(story_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "errors_made, pronounciation_score, wpm_averaged and story_id must be finite numbers"}), 400
+    if db.session.get(Story, story_id) is None:
+        return jsonify({"error": "Story not found"}), 404
     
     user_id = session.get("user_id")
     new_statistic = Statistic(learnerID=user_id, storyID=story_id, wordErrorRate=errorsMade, wordsPerMinute=wordsPerMinute, pronounciationScore=pronounciationScore)
     
-    # Add to the database
-    db.session.add(new_statistic)
+    # Add to the database, together with the learner's running totals and the daily and weekly rollups
+    record_statistic(new_statistic)
+    add_to_rollups([new_statistic])
     db.session.commit()
 
     return jsonify({
@@ -31,6 +45,146 @@ def upload_statistics():
     }), 201
     
 
+@statistic_bp.route("/upload_statistics_batch",methods=["POST"])
+def upload_statistics_batch():
+    """
+    Upload several statistics at once, e.g. the sessions a tablet recorded while offline.
+
+    The body is a JSON array of statistics with the fields of /upload_statistics (errors_made,
+    pronounciation_score, story_id, wpm_averaged) and an optional recorded_date (ISO 8601) for
+    sessions recorded earlier. The valid statistics are added in a single transaction and the
+    learner's aggregates and the rollups are updated once for the whole batch.
+
+    Returns:
+        Response (json):
+            - 201: Every statistic was added.
+            - 207: Some statistics were added.
+            - 400: No statistic was added, or the body is not a JSON array of at most STATISTICS_BATCH_MAX_SIZE items.
+            - 401: If no learner is logged in.
+            Apart from malformed bodies, "results" holds one entry per item, in order: its index and
+            status (201 with the statistic_id, or 400 with an error).
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON array of statistics"}), 400
+    if len(items) > current_app.config['STATISTICS_BATCH_MAX_SIZE']:
+        return jsonify({"error": f"At most {current_app.config['STATISTICS_BATCH_MAX_SIZE']} statistics per batch"}), 400
+
+    # Check every story of the batch with one query (None for items without a valid story_id)
+    story_ids = []
+    for item in items:
+        try:
+            story_ids.append(parse_story_id(item.get("story_id")) if isinstance(item, dict) else None)
+        except (TypeError, ValueError):
+            story_ids.append(None)
+    known_story_ids = {story_id for story_id, in db.session.query(Story.id).filter(Story.id.in_(set(story_ids) - {None}))}
+
+    results = []
+    new_statistics = []
+    for index, (item, story_id) in enumerate(zip(items, story_ids)):
+        try:
+            new_statistic = batch_statistic(item, story_id, user_id, known_story_ids)
+        except ValueError as e:
+            results.append({"index": index, "status": 400, "error": str(e)})
+            continue
+        results.append({"index": index, "status": 201})
+        new_statistics.append(new_statistic)
+
+    if not new_statistics:
+        return jsonify({"message": "No statistics added", "results": results}), 400
+
+    # One transaction for the whole batch
+    record_statistics(new_statistics)
+    add_to_rollups(new_statistics)
+    db.session.commit()
+
+    added = iter(new_statistics)
+    for result in results:
+        if result["status"] == 201:
+            result["statistic_id"] = next(added).id
+
+    return jsonify({
+        "message": f"{len(new_statistics)} of {len(items)} statistics added",
+        "results": results,
+    }), 201 if len(new_statistics) == len(items) else 207
+
+
+def parse_story_id(value):
+    """
+    Read an uploaded story ID, given as a number or a string of digits.
+
+    Raises:
+        ValueError: If the value is not a whole number (booleans and fractions included).
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError("story_id must be a whole number")
+    return int(value)
+
+
+def parse_metric(value):
+    """
+    Read an uploaded metric. NaN and infinity are rejected: they would stay in the learner's
+    running totals and the rollups until those are rebuilt.
+
+    Raises:
+        ValueError: If the value is not a finite number (booleans included).
+    """
+    if isinstance(value, bool):
+        raise ValueError("Metrics must be numbers")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError("Metrics must be finite")
+    return number
+
+
+def batch_statistic(item, story_id, user_id, known_story_ids):
+    """
+    Validate one item of a statistics batch.
+
+    Args:
+        item (dict): The statistic as uploaded.
+        story_id (int): Its story_id as read by parse_story_id, or None if that failed.
+        user_id (str): The learner uploading the batch.
+        known_story_ids (set): IDs of the stories that exist.
+
+    Returns:
+        Statistic: The new statistic, not yet added to the session.
+
+    Raises:
+        ValueError: If the item is incomplete or malformed.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Expected an object")
+
+    fields = ("errors_made", "pronounciation_score", "story_id", "wpm_averaged")
+    missing = [field for field in fields if item.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing data: {', '.join(missing)}")
+
+    try:
+        values = [parse_metric(item[field]) for field in ("errors_made", "pronounciation_score", "wpm_averaged")]
+    except (TypeError, ValueError):
+        values = None
+    if values is None or story_id is None:
+        raise ValueError("errors_made, pronounciation_score, wpm_averaged and story_id must be finite numbers")
+    if story_id not in known_story_ids:
+        raise ValueError(f"Unknown story {story_id}")
+
+    recorded_date = item.get("recorded_date")
+    try:
+        recorded_date = datetime.fromisoformat(recorded_date) if recorded_date else datetime.now()
+    except (TypeError, ValueError):
+        raise ValueError("recorded_date must be an ISO 8601 date and time")
+
+    errors_made, pronounciation_score, words_per_minute = values
+    return Statistic(learnerID=user_id, storyID=story_id, wordErrorRate=errors_made, wordsPerMinute=words_per_minute,
+                     pronounciationScore=pronounciation_score, recordedDate=recorded_date)
+    
+
 @statistic_bp.route("/get_story_statistic",methods=["GET"])
 def get_story_statistic():
     """
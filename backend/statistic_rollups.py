@@ -0,0 +1,222 @@
+from datetime import date, timedelta
+from sqlalchemy import func, case, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Statistic, Story, StatisticRollup
+
+
+PERIODS = ("day", "week")
+
+# Statistic columns summarized in the rollups, each as <metric>Sum, <metric>Min and <metric>Max
+_METRICS = ("wordErrorRate", "wordsPerMinute", "pronounciationScore")
+
+
+def period_start(recorded_date, period):
+    """
+    First day of the day or week (starting on Monday) a statistic falls in.
+
+    Args:
+        recorded_date (datetime): When the statistic was recorded.
+        period (str): "day" or "week".
+
+    Returns:
+        date: The start of the bucket.
+    """
+    day = recorded_date.date()
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def add_to_rollups(statistics):
+    """
+    Add new statistics to their daily and weekly buckets, in the transaction that adds them.
+    The statistics must be flushed (so they have their recordedDate); the caller commits.
+
+    Statistics of the same bucket are summed up first, so every bucket is updated once however many
+    statistics it receives. Buckets are updated with an UPDATE in the database, so concurrent uploads
+    do not overwrite each other's counts.
+
+    Statistics of stories that do not exist are left out, the upload endpoints reject them beforehand.
+
+    Args:
+        statistics (list): The new Statistic objects.
+    """
+    difficulties = dict(db.session.query(Story.id, Story.difficulty).filter(
+        Story.id.in_({int(statistic.storyID) for statistic in statistics})
+    ))
+
+    for (period, start, story_id), bucket in _buckets(statistics).items():
+        if story_id in difficulties:
+            _add_bucket(period, start, story_id, difficulties[story_id], bucket)
+
+
+def rebuild_statistic_rollups():
+    """
+    Replace every rollup by buckets computed from the statistics. The caller commits.
+
+    Returns:
+        int: The number of buckets.
+    """
+    StatisticRollup.query.delete()
+    db.session.flush()
+
+    statistics = db.session.query(
+        Statistic.storyID, Statistic.recordedDate, *(getattr(Statistic, metric) for metric in _METRICS)
+    ).order_by(Statistic.id).yield_per(1000)
+    buckets = _buckets(statistics)
+    difficulties = dict(db.session.query(Story.id, Story.difficulty))
+    rollups = [
+        StatisticRollup(period=period, periodStart=start, storyID=story_id, difficulty=difficulties[story_id], **bucket)
+        for (period, start, story_id), bucket in buckets.items() if story_id in difficulties
+    ]
+    db.session.add_all(rollups)
+    return len(rollups)
+
+
+def rollup_trends(period, group_by, start=None, end=None):
+    """
+    Combine the rollups into one row per bucket and difficulty or story.
+
+    Args:
+        period (str): "day" or "week".
+        group_by (str): "difficulty" or "story".
+        start (date): Only buckets starting on or after this day, if given.
+        end (date): Only buckets starting before this day, if given.
+
+    Returns:
+        list: Per bucket, oldest first: the difficulty (or the story ID and title), the number of
+              statistics and the average, minimum and maximum of every metric.
+    """
+    if group_by == "story":
+        groups = (StatisticRollup.storyID, Story.title)
+    else:
+        groups = (StatisticRollup.difficulty,)
+
+    query = db.session.query(StatisticRollup.periodStart, *groups, *_combined_columns()).filter(StatisticRollup.period == period)
+    if group_by == "story":
+        query = query.join(Story, StatisticRollup.storyID == Story.id)
+    if start is not None:
+        query = query.filter(StatisticRollup.periodStart >= start)
+    if end is not None:
+        query = query.filter(StatisticRollup.periodStart < end)
+
+    rows = query.group_by(StatisticRollup.periodStart, *groups).order_by(StatisticRollup.periodStart, *groups).all()
+
+    trends = []
+    for row in rows:
+        trend = {"periodStart": row.periodStart.isoformat()}
+        if group_by == "story":
+            trend.update({"storyID": row.storyID, "storyTitle": row.title})
+        else:
+            trend["difficulty"] = row.difficulty
+        trend.update(_metric_summary(row))
+        trends.append(trend)
+    return trends
+
+
+def overall_averages():
+    """
+    Average of every metric over all statistics, combined from the weekly rollups.
+
+    Returns:
+        dict: The averages rounded to two decimals, or None if there are no statistics.
+    """
+    row = db.session.query(*_combined_columns()).filter(StatisticRollup.period == "week").one()
+    if not row.statisticCount:
+        return None
+
+    return {
+        "averagePronunciationScore": round(row.pronounciationScoreSum / row.statisticCount, 2),
+        "averageWPM": round(row.wordsPerMinuteSum / row.statisticCount, 2),
+        "averageWordErrorRate": round(row.wordErrorRateSum / row.statisticCount, 2),
+    }
+
+
+def parse_trend_args(args):
+    """
+    Read the parameters of a trends request.
+
+    Args:
+        args (MultiDict): The query parameters: period ("day" or "week", weekly by default) and
+                          from / to as ISO 8601 dates.
+
+    Returns:
+        tuple: (period, start, end), start and end are None when not given.
+
+    Raises:
+        ValueError: If a parameter is malformed.
+    """
+    period = args.get("period", "week")
+    if period not in PERIODS:
+        raise ValueError("period must be day or week")
+
+    start = args.get("from")
+    end = args.get("to")
+    return period, date.fromisoformat(start) if start else None, date.fromisoformat(end) if end else None
+
+
+def _buckets(statistics):
+    # Sum up statistics per (period, periodStart, storyID); form uploads hold their values as strings
+    buckets = {}
+    for statistic in statistics:
+        values = {metric: float(getattr(statistic, metric)) for metric in _METRICS}
+        for period in PERIODS:
+            key = (period, period_start(statistic.recordedDate, period), int(statistic.storyID))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {"statisticCount": 0}
+                for metric in _METRICS:
+                    bucket.update({f"{metric}Sum": 0.0, f"{metric}Min": values[metric], f"{metric}Max": values[metric]})
+
+            bucket["statisticCount"] += 1
+            for metric in _METRICS:
+                bucket[f"{metric}Sum"] += values[metric]
+                bucket[f"{metric}Min"] = min(bucket[f"{metric}Min"], values[metric])
+                bucket[f"{metric}Max"] = max(bucket[f"{metric}Max"], values[metric])
+    return buckets
+
+
+def _add_bucket(period, start, story_id, difficulty, bucket):
+    if _update_bucket(period, start, story_id, bucket):
+        return
+    try:
+        # A concurrent upload may create the same bucket first, then it is updated instead
+        with db.session.begin_nested():
+            db.session.add(StatisticRollup(period=period, periodStart=start, storyID=story_id, difficulty=difficulty, **bucket))
+    except IntegrityError:
+        _update_bucket(period, start, story_id, bucket)
+
+
+def _update_bucket(period, start, story_id, bucket):
+    values = {"statisticCount": StatisticRollup.statisticCount + bucket["statisticCount"]}
+    for metric in _METRICS:
+        total, smallest, largest = (getattr(StatisticRollup, f"{metric}{part}") for part in ("Sum", "Min", "Max"))
+        values[f"{metric}Sum"] = total + bucket[f"{metric}Sum"]
+        values[f"{metric}Min"] = case((smallest > bucket[f"{metric}Min"], bucket[f"{metric}Min"]), else_=smallest)
+        values[f"{metric}Max"] = case((largest < bucket[f"{metric}Max"], bucket[f"{metric}Max"]), else_=largest)
+
+    return db.session.execute(update(StatisticRollup).where(
+        StatisticRollup.period == period,
+        StatisticRollup.periodStart == start,
+        StatisticRollup.storyID == story_id,
+    ).values(**values).execution_options(synchronize_session=False)).rowcount
+
+
+def _combined_columns():
+    columns = [func.sum(StatisticRollup.statisticCount).label("statisticCount")]
+    for metric in _METRICS:
+        columns += [
+            func.sum(getattr(StatisticRollup, f"{metric}Sum")).label(f"{metric}Sum"),
+            func.min(getattr(StatisticRollup, f"{metric}Min")).label(f"{metric}Min"),
+            func.max(getattr(StatisticRollup, f"{metric}Max")).label(f"{metric}Max"),
+        ]
+    return columns
+
+
+def _metric_summary(row):
+    summary = {"statisticCount": row.statisticCount}
+    for metric in _METRICS:
+        summary.update({
+            f"{metric}Average": round(getattr(row, f"{metric}Sum") / row.statisticCount, 2),
+            f"{metric}Min": getattr(row, f"{metric}Min"),
+            f"{metric}Max": getattr(row, f"{metric}Max"),
+        })
+    return summary
@@ -4,4 +4,4 @@ from flask import Blueprint
 story_bp = Blueprint('story', __name__)
 
 # Import the routes
-from . import story_routes
\ No newline at end of file
+from . import story_routes, story_index
\ No newline at end of file
@@ -0,0 +1,95 @@
+from . import story_bp
+from models import db, Story, StorySentence
+from speech_checker import sentenceToPhonemes, generateSyllables
+
+
+def split_story_sentences(content):
+    """
+    Split story content into sentences the same way the reading board does
+    (on full stops, dropping empty pieces and surrounding whitespace).
+
+    Args:
+        content (str): The story content.
+
+    Returns:
+        list: The sentences in reading order.
+    """
+    return [sentence.strip() for sentence in content.split(".") if sentence.strip() != ""]
+
+
+def index_story(story):
+    """
+    Precompute the espeak phonemes and word syllabifications of every sentence of a story
+    and add them to the session. Sentences espeak cannot phonemize are left out and are
+    phonemized on the fly when they are read.
+
+    Args:
+        story (Story): The story to index, already added to the session.
+    """
+    StorySentence.query.filter_by(storyID=story.id).delete()
+
+    for sentence_index, sentence in enumerate(split_story_sentences(story.content)):
+        phonemes = sentenceToPhonemes(sentence)
+        if not isinstance(phonemes, list):
+            continue
+
+        words = sentence.split(' ')
+        syllables = dict(zip(words, generateSyllables(words)))
+        db.session.add(StorySentence(
+            storyID=story.id,
+            sentenceIndex=sentence_index,
+            text=sentence,
+            phonemes=phonemes,
+            syllables=syllables,
+        ))
+
+
+def index_stories(stories):
+    """
+    Index several stories and commit once.
+
+    Args:
+        stories (list): The Story objects to index.
+    """
+    db.session.flush()
+    for story in stories:
+        index_story(story)
+    db.session.commit()
+
+
+def find_indexed_sentence(sentence, story_id=None, sentence_index=None):
+    """
+    Look up the precomputed phonemes of a sentence.
+
+    The (story_id, sentence_index) position is tried first; the stored text must match
+    the sentence, since feedback mode sends single words. Otherwise the sentence is
+    searched by text, within the story when one is given.
+
+    Args:
+        sentence (str): The sentence being read.
+        story_id (int): Optional ID of the story being read.
+        sentence_index (int): Optional position of the sentence in the story.
+
+    Returns:
+        StorySentence: The indexed sentence, or None if it is not indexed.
+    """
+    if story_id is not None and sentence_index is not None:
+        indexed = StorySentence.query.filter_by(storyID=story_id, sentenceIndex=sentence_index).first()
+        if indexed and indexed.text == sentence:
+            return indexed
+
+    query = StorySentence.query.filter_by(text=sentence)
+    if story_id is not None:
+        query = query.filter_by(storyID=story_id)
+    return query.first()
+
+
+@story_bp.cli.command("index")
+def index_all_stories():
+    """
+    Build the phoneme index for every story, e.g. for stories added before the index existed.
+    Run with: flask --app app story index
+    """
+    stories = Story.query.all()
+    index_stories(stories)
+    print(f"Indexed {len(stories)} stories")
@@ -0,0 +1,136 @@
+import numpy as np
+import torch
+import speech_checker
+
+
+class StreamingRecognizer:
+    """
+    Incremental phoneme recognition of audio that is still being recorded.
+
+    Audio is fed in as it arrives. Every time step_seconds of new audio (plus the right
+    context) is available, the model runs over a window made of that audio, up to
+    left_context_seconds of audio before it and right_context_seconds after it. Only the
+    logit frames of the new step are kept, so every frame of the recording is predicted
+    exactly once and always with context on both sides (except at the very end). When the
+    recording stops, finish() only has to run the last window.
+
+    Window boundaries are multiples of the feature encoder stride (320 samples), so the
+    frames of a window line up with the frames of the whole recording. Windows are normalised
+    with the mean and variance of all the audio fed so far rather than their own, so the
+    last window is normalised exactly like audioToPhonemes normalises the whole recording.
+
+    When the acoustic model is not loaded in this process (phoneme server mode), the audio
+    is only buffered and recognized in one piece by finish().
+    """
+
+    def __init__(self, step_seconds=1.0, left_context_seconds=1.0, right_context_seconds=0.5, sample_rate=16000):
+        """
+        Args:
+        step_seconds (float): Audio whose frames are committed by each window.
+        left_context_seconds (float): Audio before the step included in the window.
+        right_context_seconds (float): Audio after the step included in the window.
+        sample_rate (int): Sample rate of the fed audio, 16 kHz for wav2vec2.
+        """
+        self.incremental = speech_checker.processor is not None and \
+            (speech_checker.model is not None or speech_checker.onnx_session is not None)
+        stride = speech_checker._frameStride() if self.incremental else 1
+
+        def toSamples(seconds):
+            return max(1, round(seconds * sample_rate / stride)) * stride
+
+        self.step = toSamples(step_seconds)
+        self.left_context = toSamples(left_context_seconds)
+        self.right_context = toSamples(right_context_seconds)
+        self.stride = stride
+        self._chunks = []
+        self._length = 0
+        self._committed_samples = 0
+        self._predicted_ids = []
+        self._sum = 0.0
+        self._sum_squares = 0.0
+
+    def feed(self, samples):
+        """
+        Add recorded audio and recognize every step that now has its right context.
+
+        Args:
+        samples (np.ndarray): Float waveform samples in [-1, 1].
+
+        Returns:
+        str: The phonemes recognized so far.
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples):
+            self._chunks.append(samples)
+            self._length += len(samples)
+            self._sum += float(np.sum(samples, dtype=np.float64))
+            self._sum_squares += float(np.sum(np.square(samples, dtype=np.float64)))
+
+        if self.incremental:
+            while self._length - self._committed_samples >= self.step + self.right_context:
+                self._recognizeWindow(self._committed_samples + self.step)
+        return self.phonemes()
+
+    def finish(self):
+        """
+        Recognize the rest of the recording.
+
+        Returns:
+        str: The phonemes of the whole recording, like audioToPhonemes.
+        """
+        if not self.incremental:
+            return speech_checker.audioToPhonemes(self.audio())
+
+        self._recognizeWindow(self._length, final=True)
+        return self.phonemes()
+
+    def audio(self):
+        """
+        Returns:
+        np.ndarray: Everything fed so far.
+        """
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    def duration(self, sample_rate=16000):
+        return self._length / sample_rate
+
+    def phonemes(self):
+        if not self._predicted_ids:
+            return ""
+        transcription = speech_checker.processor.decode(self._predicted_ids)
+        return speech_checker._cleanTranscription(transcription)
+
+    def _recognizeWindow(self, commit_end, final=False):
+        """
+        Run the model over the window around [committed samples, commit_end) and keep the
+        logit frames that start inside it.
+        """
+        window_start = max(0, self._committed_samples - self.left_context)
+        window_end = self._length if final else min(self._length, commit_end + self.right_context)
+        window = self.audio()[window_start:window_end]
+
+        first_frame = (self._committed_samples - window_start) // self.stride
+        if final:
+            last_frame = int(speech_checker._frameLengths(torch.tensor([len(window)]))[0])
+        else:
+            last_frame = (commit_end - window_start) // self.stride
+
+        if last_frame > first_frame:
+            input_values = self._inputValues(window)
+            logits = speech_checker._computeLogits(input_values)
+            self._predicted_ids.extend(torch.argmax(logits[0, first_frame:last_frame], dim=-1).tolist())
+        self._committed_samples = commit_end
+
+    def _inputValues(self, window):
+        """
+        Normalise a window like the feature extractor does (zero mean, unit variance), but
+        with the statistics of everything fed so far.
+        """
+        if not getattr(speech_checker.processor.feature_extractor, 'do_normalize', False):
+            return speech_checker.processor(window, return_tensors="pt").input_values
+
+        mean = self._sum / self._length
+        variance = max(0.0, self._sum_squares / self._length - mean * mean)
+        return torch.from_numpy((window - mean) / np.sqrt(variance + 1e-7)).to(torch.float32)[None]
@@ -0,0 +1,29 @@
+import sys
+from unittest.mock import patch
+import click
+from flask.sessions import SecureCookieSessionInterface
+from config import ApplicationConfig
+import speech_checker
+
+
+def loadApp():
+    """
+    Import the app for route tests, the way a flask command other than run would (so no models
+    are loaded and no background threads are started), with an in-memory database and without
+    the pronunciation cache, which would be shared with the speech_checker tests.
+
+    Sessions are kept in signed cookies rather than Redis, so tests can log in with
+    client.session_transaction() without a Redis server.
+
+    Returns:
+    module: The app module, imported once and shared by all the tests.
+    """
+    if 'app' not in sys.modules:
+        with patch.object(ApplicationConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite://'), \
+             patch.object(ApplicationConfig, 'SQLALCHEMY_ECHO', False), \
+             patch.object(speech_checker, 'enablePronunciationCache'), \
+             click.Context(click.Command('test')):
+            import app
+        app.app.session_interface = SecureCookieSessionInterface()
+        app.app.config['TESTING'] = True
+    return sys.modules['app']
@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from analysis_cache import AnalysisResultCache
+
+
+class TestAnalysisResultCache(unittest.TestCase):
+    def setUp(self):
+        self.audio = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+        self.analysis = {"duration_audio_file": 1, "mispronounced_words": [{"word": "fox", "audio_filename": "a.wav", "syllable_string": "fox"}]}
+
+    def test_key(self):
+        key = AnalysisResultCache.key(self.audio, "The quick brown fox")
+        self.assertEqual(key, AnalysisResultCache.key(self.audio.copy(), "The quick brown fox"))
+        self.assertNotEqual(key, AnalysisResultCache.key(self.audio, "The quick brown dog"))
+
+        changed = self.audio.copy()
+        changed[100] += 1e-3
+        self.assertNotEqual(key, AnalysisResultCache.key(changed, "The quick brown fox"))
+
+    def test_hitsAndMisses(self):
+        cache = AnalysisResultCache()
+        key = AnalysisResultCache.key(self.audio, "The quick brown fox")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, self.analysis)
+        self.assertEqual(cache.get(key), self.analysis)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_ttl(self):
+        cache = AnalysisResultCache(ttl_seconds=60)
+        cache.put("key", self.analysis)
+        with patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_sizeBound(self):
+        cache = AnalysisResultCache(max_entries=2)
+        cache.put("a", self.analysis)
+        cache.put("b", self.analysis)
+        cache.get("a")
+        cache.put("c", self.analysis)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_invalidEntryIsDropped(self):
+        cache = AnalysisResultCache()
+        cache.put("key", self.analysis)
+        self.assertIsNone(cache.get("key", validate=lambda analysis: False))
+        self.assertIsNone(cache.get("key", validate=lambda analysis: True))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
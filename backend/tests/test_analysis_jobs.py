@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch
+import importlib.util
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from analysis_jobs import InProcessJobQueue, RedisJobQueue, AnalysisWorkerPool
+
+
+class JobQueueTests:
+    """
+    Behaviour shared by every job queue, mixed into a TestCase that defines createQueue.
+    """
+
+    def test_lifecycle(self):
+        job_queue = self.createQueue()
+        job_id = job_queue.enqueue({"sentence": "The quick brown fox"}, b'\x00\x01audio')
+        self.assertEqual(job_queue.status(job_id), {"status": "queued"})
+
+        dequeued_id, metadata, audio = job_queue.dequeue(timeout=1)
+        self.assertEqual(dequeued_id, job_id)
+        self.assertEqual(metadata, {"sentence": "The quick brown fox"})
+        self.assertEqual(audio, b'\x00\x01audio')
+        self.assertEqual(job_queue.status(job_id), {"status": "running"})
+
+        job_queue.complete(job_id, {"mispronounced_words": []})
+        self.assertEqual(job_queue.status(job_id), {"status": "done", "result": {"mispronounced_words": []}})
+
+    def test_failedJob(self):
+        job_queue = self.createQueue()
+        job_id = job_queue.enqueue({}, b'')
+        job_queue.dequeue(timeout=1)
+        job_queue.fail(job_id, "RuntimeError: boom")
+        self.assertEqual(job_queue.status(job_id), {"status": "failed", "error": "RuntimeError: boom"})
+
+    def test_fifoOrder(self):
+        job_queue = self.createQueue()
+        job_ids = [job_queue.enqueue({"index": index}, b'') for index in range(3)]
+        self.assertEqual([job_queue.dequeue(timeout=1)[0] for _ in job_ids], job_ids)
+
+    def test_unknownJob(self):
+        self.assertIsNone(self.createQueue().status("missing"))
+
+    def test_ping(self):
+        self.assertTrue(self.createQueue().ping())
+
+    def test_workerPool(self):
+        job_queue = self.createQueue()
+        calls = []
+
+        def runJob(metadata, audio):
+            calls.append(threading.current_thread().name)
+            if metadata["fail"]:
+                raise ValueError("bad audio")
+            return {"length": len(audio)}
+
+        pool = AnalysisWorkerPool(job_queue, runJob, workers=2)
+        pool.start()
+        good = job_queue.enqueue({"fail": False}, b'1234')
+        bad = job_queue.enqueue({"fail": True}, b'')
+
+        def finished(job_id):
+            return job_queue.status(job_id)["status"] in ("done", "failed")
+
+        deadline = time.time() + 10
+        while time.time() < deadline and not (finished(good) and finished(bad)):
+            time.sleep(0.01)
+        pool.stop()
+
+        self.assertEqual(job_queue.status(good), {"status": "done", "result": {"length": 4}})
+        self.assertEqual(job_queue.status(bad), {"status": "failed", "error": "ValueError: bad audio"})
+        self.assertTrue(all(name.startswith("analysis-worker-") for name in calls))
+
+
+class TestInProcessJobQueue(JobQueueTests, unittest.TestCase):
+    def createQueue(self):
+        return InProcessJobQueue(ttl_seconds=60)
+
+    def test_resultsExpire(self):
+        job_queue = InProcessJobQueue(ttl_seconds=60)
+        job_id = job_queue.enqueue({}, b'')
+        job_queue.dequeue(timeout=1)
+        job_queue.complete(job_id, {})
+
+        with patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(job_queue.status(job_id))
+
+    def test_dequeueTimeout(self):
+        self.assertIsNone(InProcessJobQueue().dequeue(timeout=0.01))
+
+
+@unittest.skipUnless(importlib.util.find_spec('fakeredis'), "fakeredis is not installed")
+class TestRedisJobQueue(JobQueueTests, unittest.TestCase):
+    def createQueue(self):
+        import fakeredis
+        return RedisJobQueue(fakeredis.FakeRedis(), prefix="test", ttl_seconds=60)
+
+    def test_jobsExpire(self):
+        job_queue = self.createQueue()
+        job_id = job_queue.enqueue({}, b'')
+        self.assertLessEqual(job_queue.redis.ttl(f"test:job:{job_id}"), 60)
+        job_queue.redis.delete(f"test:job:{job_id}")
+
+        # A job that expired while queued is skipped
+        self.assertIsNone(job_queue.dequeue(timeout=1))
+
+    def test_pingUnreachableRedis(self):
+        import redis
+        job_queue = RedisJobQueue(redis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1))
+        self.assertFalse(job_queue.ping())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tests.flask_app import loadApp
+
+
+class TestAppRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app_module = loadApp()
+        self.app = self.app_module.app
+        self.client = self.app.test_client()
+
+    def test_health(self):
+        with patch.object(self.app_module, 'modelStatus', return_value="loading"):
+            response = self.client.get("/health")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"status": "ok"})
+
+    def test_readyFollowsModelLoading(self):
+        with patch.object(self.app_module, 'modelStatus', return_value="loading"):
+            response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json(), {"status": "loading"})
+        self.assertEqual(response.headers["Retry-After"], str(self.app.config['MODEL_LOADING_RETRY_AFTER']))
+
+        with patch.object(self.app_module, 'modelStatus', return_value="failed"), \
+             patch.object(self.app_module.speech_checker, 'model_loading_error', "OSError: no model"):
+            response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json(), {"status": "failed", "error": "OSError: no model"})
+
+        with patch.object(self.app_module, 'modelStatus', return_value="ready"):
+            response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {"status": "ready"})
+
+    def test_readyWhenOnlyQueueing(self):
+        # Queue-only processes never load the models, they are ready while the job queue can be reached
+        job_queue = MagicMock()
+        with patch.dict(self.app.config, {'ANALYSIS_QUEUE_ONLY': True}), \
+             patch.dict(self.app.extensions, {'analysis_jobs': job_queue}), \
+             patch.object(self.app_module, 'modelStatus', return_value="loading"):
+            job_queue.ping.return_value = True
+            reachable = self.client.get("/ready")
+            job_queue.ping.return_value = False
+            unreachable = self.client.get("/ready")
+
+        self.assertEqual(reachable.status_code, 200)
+        self.assertEqual(reachable.get_json(), {"status": "ready"})
+        self.assertEqual(unreachable.status_code, 503)
+        self.assertEqual(unreachable.get_json(), {"status": "failed", "error": "The analysis job queue cannot be reached"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+import io
+import os
+import sys
+import wave
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_decoding import decodeAudio, resample
+
+
+def wavBytes(samples, sample_rate=16000, channels=1):
+    """
+    Encode int16 samples (interleaved when there are several channels) as a WAV file.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+    return buffer.getvalue()
+
+
+def floatWavBytes(samples, sample_rate=16000):
+    data = np.asarray(samples, dtype='<f4').tobytes()
+    header = b'RIFF' + (36 + len(data)).to_bytes(4, 'little') + b'WAVE'
+    header += b'fmt ' + (16).to_bytes(4, 'little')
+    header += (3).to_bytes(2, 'little') + (1).to_bytes(2, 'little') + sample_rate.to_bytes(4, 'little')
+    header += (sample_rate * 4).to_bytes(4, 'little') + (4).to_bytes(2, 'little') + (32).to_bytes(2, 'little')
+    return header + b'data' + len(data).to_bytes(4, 'little') + data
+
+
+class TestAudioDecoding(unittest.TestCase):
+    def setUp(self):
+        self.samples = np.random.default_rng(0).integers(-32768, 32767, size=16000).astype(np.int16)
+
+    def test_pcmWavMatchesLibrosa(self):
+        import librosa
+        data = wavBytes(self.samples)
+        expected, _ = librosa.load(io.BytesIO(data), sr=16000)
+
+        with patch('librosa.load') as mock_load:
+            waveform, sample_rate = decodeAudio(data, 'audio/wav')
+        mock_load.assert_not_called()
+
+        self.assertEqual(sample_rate, 16000)
+        self.assertEqual(waveform.dtype, np.float32)
+        np.testing.assert_allclose(waveform, expected, atol=1e-6)
+
+    def test_stereoIsMixedDown(self):
+        stereo = np.stack([self.samples, np.zeros_like(self.samples)], axis=1).reshape(-1)
+        waveform, _ = decodeAudio(wavBytes(stereo, channels=2))
+        np.testing.assert_allclose(waveform, self.samples / 32768.0 / 2, atol=1e-6)
+
+    def test_floatWav(self):
+        samples = np.linspace(-1, 1, 1000, dtype=np.float32)
+        waveform, _ = decodeAudio(floatWavBytes(samples))
+        np.testing.assert_array_equal(waveform, samples)
+
+    def test_rawPcm(self):
+        waveform, _ = decodeAudio(self.samples.astype('<i2').tobytes(), 'audio/L16;rate=16000')
+        np.testing.assert_allclose(waveform, self.samples / 32768.0, atol=1e-6)
+
+        waveform, _ = decodeAudio(self.samples.astype('<i2').tobytes(), 'audio/L16; rate=48000')
+        self.assertEqual(len(waveform), len(self.samples) // 3)
+
+    def test_otherRatesAreResampled(self):
+        tone = (8000 * np.sin(2 * np.pi * 440 * np.arange(44100) / 44100)).astype(np.int16)
+        waveform, sample_rate = decodeAudio(wavBytes(tone, sample_rate=44100))
+        self.assertEqual(sample_rate, 16000)
+        self.assertEqual(len(waveform), 16000)
+
+        expected = 8000 / 32768.0 * np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+        np.testing.assert_allclose(waveform, expected, atol=1e-3)
+
+    def test_resampleIntegerRatio(self):
+        waveform = np.array([0, 3, 6, 1, 1, 1, 9], dtype=np.float32)
+        np.testing.assert_array_equal(resample(waveform, 48000, 16000), [3, 1])
+
+    def test_otherFormatsUseLibrosa(self):
+        with patch('librosa.load', return_value=(np.zeros(10, dtype=np.float32), 16000)) as mock_load:
+            waveform, sample_rate = decodeAudio(b'\x1aE\xdf\xa3webm', 'audio/webm')
+        mock_load.assert_called_once()
+        self.assertEqual(len(waveform), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
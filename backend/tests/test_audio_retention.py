@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from audio_retention import AudioRetention
+
+
+class TestAudioRetention(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def writeFile(self, name, size, age_seconds=0):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        if age_seconds:
+            timestamp = time.time() - age_seconds
+            os.utime(path, (timestamp, timestamp))
+
+    def test_indexOfExistingFiles(self):
+        self.writeFile('old.wav', 10, age_seconds=100)
+        self.writeFile(os.path.join('pronunciations', 'new.wav'), 20)
+
+        retention = AudioRetention(self.directory)
+        self.assertIn('old.wav', retention)
+        self.assertIn(os.path.join('pronunciations', 'new.wav'), retention)
+        self.assertEqual(retention.stats()['files'], 2)
+        self.assertEqual(retention.stats()['bytes'], 30)
+
+    def test_sweepRemovesExpiredFiles(self):
+        self.writeFile('old.wav', 10, age_seconds=100)
+        self.writeFile('new.wav', 20)
+
+        retention = AudioRetention(self.directory, max_age_seconds=50)
+        self.assertEqual(retention.sweep(), (1, 10))
+        self.assertEqual(os.listdir(self.directory), ['new.wav'])
+        self.assertEqual(retention.stats()['bytes_reclaimed'], 10)
+
+    def test_sweepRemovesLeastRecentlyServed(self):
+        self.writeFile('a.wav', 10, age_seconds=300)
+        self.writeFile('b.wav', 10, age_seconds=200)
+        self.writeFile('c.wav', 10, age_seconds=100)
+
+        retention = AudioRetention(self.directory, max_bytes=20)
+        self.assertTrue(retention.touch('a.wav'))
+        self.assertEqual(retention.sweep(), (1, 10))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['a.wav', 'c.wav'])
+
+    def test_addEnforcesMaxBytes(self):
+        retention = AudioRetention(self.directory, max_bytes=20)
+        for name in ('a.wav', 'b.wav', 'c.wav'):
+            self.writeFile(name, 10)
+            retention.add(name, 10)
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ['b.wav', 'c.wav'])
+        self.assertEqual(retention.stats()['files_removed'], 1)
+
+    def test_reservedFileIsEvictedLast(self):
+        retention = AudioRetention(self.directory, max_bytes=30)
+        for name in ('a.wav', 'b.wav', 'c.wav'):
+            self.writeFile(name, 10)
+            retention.add(name, 10)
+
+        # a.wav is served again after b.wav, so b.wav is now the least recently served
+        self.assertTrue(retention.touch('a.wav'))
+        self.assertTrue(retention.touch('b.wav'))
+        self.assertTrue(retention.touch('a.wav'))
+        self.writeFile('d.wav', 10)
+        retention.add('d.wav', 10)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['a.wav', 'b.wav', 'd.wav'])
+        self.writeFile('e.wav', 10)
+        retention.add('e.wav', 10)
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ['a.wav', 'd.wav', 'e.wav'])
+        self.assertEqual(retention.stats()['bytes'], 30)
+
+    def test_fileServedByAnotherProcessIsKept(self):
+        self.writeFile('a.wav', 10, age_seconds=300)
+        self.writeFile('b.wav', 10, age_seconds=200)
+        retention = AudioRetention(self.directory, max_bytes=10, max_age_seconds=250)
+
+        # Another process serves a.wav, which updates its modification time
+        AudioRetention(self.directory).touch('a.wav')
+        self.assertEqual(retention.sweep(), (1, 10))
+        self.assertEqual(os.listdir(self.directory), ['a.wav'])
+
+    def test_touchIndexesFileWrittenByAnotherProcess(self):
+        retention = AudioRetention(self.directory, max_bytes=15)
+        self.writeFile('a.wav', 10)
+        self.assertNotIn('a.wav', retention)
+
+        self.assertTrue(retention.touch('a.wav'))
+        self.assertEqual(retention.stats()['bytes'], 10)
+        self.writeFile('b.wav', 10)
+        retention.add('b.wav', 10)
+        self.assertEqual(os.listdir(self.directory), ['b.wav'])
+        self.assertFalse(retention.touch('a.wav'))
+
+    def test_sweepDoesNotListTheFolder(self):
+        self.writeFile('a.wav', 10)
+        retention = AudioRetention(self.directory, max_bytes=5, max_age_seconds=50)
+        with patch('os.walk') as mock_walk, patch('os.scandir') as mock_scandir, patch('os.listdir') as mock_listdir:
+            retention.sweep()
+        mock_walk.assert_not_called()
+        mock_scandir.assert_not_called()
+        mock_listdir.assert_not_called()
+
+    def test_backgroundSweeper(self):
+        self.writeFile('old.wav', 10, age_seconds=100)
+        retention = AudioRetention(self.directory, max_age_seconds=50)
+        retention.startSweeper(0.01)
+        deadline = time.time() + 5
+        while retention.stats()['files_removed'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        retention.stopSweeper()
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import difflib
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import numpy as np
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+class TestChunkedInference(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Without transformer layers the receptive field is finite (feature encoder plus the
+        # positional convolution), so chunks with enough context must reproduce the single pass
+        cls.processor, cls.model = tinyProcessorAndModel(num_hidden_layers=0)
+        rng = np.random.default_rng(0)
+        cls.audio_files = [rng.standard_normal(length).astype(np.float32) for length in (16000 * 7 + 123, 16000 * 12, 50000)]
+
+    def patchModel(self, chunk_samples):
+        return [
+            patch.object(speech_checker, 'processor', self.processor),
+            patch.object(speech_checker, 'model', self.model),
+            patch.object(speech_checker, 'onnx_session', None),
+            patch.object(speech_checker, 'chunk_samples', chunk_samples),
+            patch.object(speech_checker, 'chunk_context_samples', 8000),
+            patch.object(speech_checker, 'phoneme_client', None),
+            patch.object(speech_checker, 'inference_batcher', None),
+        ]
+
+    def recognize(self, function, *args, chunk_samples=None):
+        patches = self.patchModel(chunk_samples)
+        for patcher in patches:
+            patcher.start()
+        try:
+            return function(*args)
+        finally:
+            for patcher in reversed(patches):
+                patcher.stop()
+
+    def test_stitchedLogitsMatchSinglePass(self):
+        for audio in self.audio_files:
+            input_values = self.processor(audio, return_tensors="pt").input_values
+            single = self.recognize(speech_checker._computeLogits, input_values)
+            for chunk_samples in (16000, 16000 * 3 + 5):
+                stitched = self.recognize(speech_checker._chunkedLogits, input_values, chunk_samples=chunk_samples)
+                self.assertEqual(stitched.shape, single.shape)
+                self.assertTrue(torch.allclose(stitched, single, atol=1e-4))
+
+    def test_audioToPhonemesMatchesSinglePass(self):
+        for audio in self.audio_files:
+            with patch.object(speech_checker, '_chunkedLogits', wraps=speech_checker._chunkedLogits) as chunked:
+                phonemes = self.recognize(speech_checker.audioToPhonemes, audio, chunk_samples=16000 * 2)
+            chunked.assert_called_once()
+            self.assertEqual(phonemes, self.recognize(speech_checker.audioToPhonemes, audio))
+
+    def test_shortRecordingsAreNotChunked(self):
+        with patch.object(speech_checker, '_chunkedLogits') as chunked:
+            self.recognize(speech_checker.audioToPhonemes, self.audio_files[2], chunk_samples=16000 * 20)
+        chunked.assert_not_called()
+
+    def test_contextShorterThanReceptiveFieldIsRejected(self):
+        input_values = self.processor(self.audio_files[0], return_tensors="pt").input_values
+        with patch.object(speech_checker, 'chunk_context_samples', 0), \
+             patch.object(speech_checker, 'chunk_samples', 16000), \
+             patch.object(speech_checker, 'model', self.model):
+            with self.assertRaises(ValueError):
+                speech_checker._chunkedLogits(input_values)
+            with patch.object(speech_checker, 'chunk_samples', None):
+                with self.assertRaises(ValueError):
+                    speech_checker.enableChunkedInference(chunk_seconds=1, context_seconds=0)
+
+
+class TestChunkedInferenceWithTransformer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The transformer layers attend to the whole input, so chunks only approximate the single pass
+        cls.processor, cls.model = tinyProcessorAndModel()
+        rng = np.random.default_rng(0)
+        cls.audio_files = [rng.standard_normal(length).astype(np.float32) for length in (16000 * 7 + 123, 16000 * 12, 50000)]
+
+    def test_chunkedPhonemesAgreeWithSinglePass(self):
+        with patch.object(speech_checker, 'model', self.model), \
+             patch.object(speech_checker, 'onnx_session', None), \
+             patch.object(speech_checker, 'chunk_context_samples', 8000):
+            for audio in self.audio_files:
+                input_values = self.processor(audio, return_tensors="pt").input_values
+                single = torch.argmax(speech_checker._computeLogits(input_values)[0], dim=-1)
+                for chunk_samples in (16000, 16000 * 2):
+                    with patch.object(speech_checker, 'chunk_samples', chunk_samples):
+                        stitched = torch.argmax(speech_checker._chunkedLogits(input_values)[0], dim=-1)
+
+                    self.assertEqual(stitched.shape, single.shape)
+                    self.assertGreater((stitched == single).float().mean().item(), 0.98)
+                    phonemes = [speech_checker._cleanTranscription(self.processor.decode(ids)) for ids in (stitched, single)]
+                    self.assertGreater(difflib.SequenceMatcher(None, *phonemes).ratio(), 0.98)
+
+
+if __name__ == '__main__':
+    unittest.main()
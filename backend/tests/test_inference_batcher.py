@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+import threading
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from inference_batcher import BatchedInferenceWorker
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+class TestBatchedInferenceWorker(unittest.TestCase):
+    def test_concurrentRequestsShareBatch(self):
+        batch_sizes = []
+
+        def recognize_batch(audio_files):
+            batch_sizes.append(len(audio_files))
+            return [f"len{len(audio)}" for audio in audio_files]
+
+        worker = BatchedInferenceWorker(recognize_batch, max_batch_size=4, max_wait_ms=200)
+        worker.start()
+
+        results = {}
+        def submit(length):
+            results[length] = worker.submit(np.zeros(length))
+
+        threads = [threading.Thread(target=submit, args=(length,)) for length in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        worker.stop()
+
+        # Every caller gets its own result back, from a single batch
+        self.assertEqual(results, {length: f"len{length}" for length in range(1, 5)})
+        self.assertEqual(batch_sizes, [4])
+
+    def test_errorsReachEveryCaller(self):
+        def recognize_batch(audio_files):
+            raise RuntimeError("model failed")
+
+        worker = BatchedInferenceWorker(recognize_batch, max_batch_size=2, max_wait_ms=1)
+        worker.start()
+        with self.assertRaises(RuntimeError):
+            worker.submit(np.zeros(10))
+        worker.stop()
+
+    def test_audioBatchToPhonemes_matchesSingle(self):
+        processor, model = tinyProcessorAndModel()
+        rng = np.random.default_rng(0)
+        audio_files = [rng.standard_normal(length).astype(np.float32) for length in (8000, 16000, 12000)]
+
+        with patch.object(speech_checker, 'processor', processor), patch.object(speech_checker, 'model', model):
+            batched = speech_checker.audioBatchToPhonemes(audio_files)
+            single = [speech_checker.audioToPhonemes(audio) for audio in audio_files]
+
+        self.assertEqual(batched, single)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import event, text
+from werkzeug.datastructures import MultiDict
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import learner_statistics
+from models import db, Learner, Story, Statistic, LearnerAggregate, LearnerStory
+from learner_statistics import (lifetime_summary, statistic_records, statistic_history, parse_history_args, record_statistic, record_statistics,
+                                compute_learner_aggregate, rebuild_learner_aggregates, verify_learner_aggregates)
+
+
+class TestLearnerStatistics(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add(Learner(id="learner", email="learner@example.com", password="x", username="learner"))
+        self.stories = [Story(title=f"Story {index}", content=f"Content {index}.", difficulty=("easy", "hard")[index % 2]) for index in range(3)]
+        db.session.add_all(self.stories)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def addStatistics(self, count):
+        start = datetime(2024, 1, 1, 9, 30)
+        for index in range(count):
+            db.session.add(Statistic(
+                learnerID="learner",
+                storyID=self.stories[index % len(self.stories)].id,
+                wordErrorRate=index % 7,
+                wordsPerMinute=60 + index * 0.37,
+                pronounciationScore=100 - index % 13,
+                recordedDate=start + timedelta(minutes=index),
+            ))
+        db.session.commit()
+
+    def countQueries(self, function, *args, exclude=None):
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            result = function(*args)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        return result, len([statement for statement in statements if exclude is None or not statement.startswith(exclude)])
+
+    def test_noStatistics(self):
+        self.assertIsNone(lifetime_summary("learner"))
+        self.assertEqual(statistic_records("learner"), [])
+
+    def test_matchesPythonAggregation(self):
+        self.addStatistics(20)
+        statistics = Statistic.query.filter_by(learnerID="learner").all()
+
+        summary = lifetime_summary("learner")
+        self.assertEqual(summary["total_stories_read"], 3)
+        self.assertEqual(summary["average_word_error_rate"], round(sum(stat.wordErrorRate for stat in statistics) / 20, 2))
+        self.assertEqual(summary["average_words_per_minute"], round(sum(stat.wordsPerMinute for stat in statistics) / 20, 2))
+        self.assertEqual(summary["average_pronounciation_score"], round(sum(stat.pronounciationScore for stat in statistics) / 20, 2))
+
+        records = statistic_records("learner")
+        self.assertEqual(len(records), 20)
+        self.assertEqual(records[1], {
+            "storyTitle": "Story 1",
+            "storyDifficulty": "hard",
+            "wordErrorRate": 1,
+            "wordsPerMinute": 60.37,
+            "pronunciationScore": 99,
+            "dateTime": "2024-01-01 09:31",
+        })
+
+    def test_queryCountDoesNotGrowWithHistory(self):
+        self.addStatistics(5)
+        _, summary_queries = self.countQueries(lifetime_summary, "learner")
+        _, records_queries = self.countQueries(statistic_records, "learner")
+
+        self.addStatistics(200)
+        self.assertEqual(self.countQueries(lifetime_summary, "learner")[1], summary_queries)
+        self.assertEqual(self.countQueries(statistic_records, "learner")[1], records_queries)
+        self.assertEqual(records_queries, 1)
+        # The aggregate row lookup, then the aggregate query for history without an aggregate row
+        self.assertEqual(summary_queries, 2)
+
+
+    def readHistory(self, **kwargs):
+        records, cursor, pages = [], None, 0
+        while True:
+            page, cursor = statistic_history("learner", cursor=cursor, **kwargs)
+            records.extend(page)
+            pages += 1
+            if cursor is None:
+                return records, pages
+
+    def test_historyPages(self):
+        self.addStatistics(23)
+        # Two more records made at the same minute as earlier ones, the id breaks the tie
+        db.session.add_all([Statistic(learnerID="learner", storyID=self.stories[0].id, wordErrorRate=9, wordsPerMinute=1,
+                                      pronounciationScore=1, recordedDate=datetime(2024, 1, 1, 9, 30 + index)) for index in (4, 5)])
+        db.session.commit()
+
+        expected = [row.id for row in Statistic.query.order_by(Statistic.recordedDate, Statistic.id)]
+        records, pages = self.readHistory(page_size=5)
+        self.assertEqual(pages, 5)
+        self.assertEqual(len(records), 25)
+        self.assertEqual([record["wordsPerMinute"] for record in records],
+                         [db.session.get(Statistic, statistic_id).wordsPerMinute for statistic_id in expected])
+
+    def test_historyDateRange(self):
+        self.addStatistics(30)
+        records, _ = self.readHistory(page_size=4, start=datetime(2024, 1, 1, 9, 40), end=datetime(2024, 1, 1, 9, 50))
+        self.assertEqual([record["dateTime"][-2:] for record in records], [str(minute) for minute in range(40, 50)])
+
+    def test_historyArguments(self):
+        self.assertEqual(parse_history_args(MultiDict(), 50, 200)["page_size"], 50)
+        page = parse_history_args(MultiDict({"limit": "1000", "from": "2024-01-01", "to": "2024-02-01T12:00"}), 50, 200)
+        self.assertEqual(page["page_size"], 200)
+        self.assertEqual(page["start"], datetime(2024, 1, 1))
+        self.assertEqual(page["end"], datetime(2024, 2, 1, 12))
+        for args in ({"limit": "0"}, {"limit": "many"}, {"from": "yesterday"}):
+            with self.assertRaises(ValueError):
+                parse_history_args(MultiDict(args), 50, 200)
+        for cursor in ("not a cursor", "WzFd"):
+            with self.assertRaises(ValueError):
+                statistic_history("learner", cursor=cursor)
+
+    def test_historyUsesIndex(self):
+        self.addStatistics(3)
+        _, cursor = statistic_history("learner", page_size=1)
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM statistics WHERE learnerID = 'learner' AND recordedDate > '2024-01-01' "
+            "ORDER BY recordedDate, id"
+        )).fetchall()
+        self.assertIn("ix_statistics_learner_recorded", " ".join(str(row) for row in plan))
+        self.assertIsNotNone(cursor)
+
+
+    def uploadStatistic(self, story_index, word_error_rate="2", words_per_minute="75.5", score="88"):
+        # Form values arrive as strings
+        record_statistic(Statistic(learnerID="learner", storyID=self.stories[story_index].id, wordErrorRate=word_error_rate,
+                                   wordsPerMinute=words_per_minute, pronounciationScore=score))
+        db.session.commit()
+
+    def assertAggregateMatchesStatistics(self):
+        stored = db.session.get(LearnerAggregate, "learner")
+        expected = compute_learner_aggregate("learner")
+        self.assertEqual((stored.statisticCount, stored.storiesRead), (expected.statisticCount, expected.storiesRead))
+        self.assertAlmostEqual(stored.wordErrorRateSum, expected.wordErrorRateSum)
+        self.assertAlmostEqual(stored.wordsPerMinuteSum, expected.wordsPerMinuteSum)
+        self.assertAlmostEqual(stored.pronounciationScoreSum, expected.pronounciationScoreSum)
+
+    def test_recordStatisticUpdatesAggregate(self):
+        self.uploadStatistic(0)
+        self.uploadStatistic(0, "4", "60", "70")
+        self.uploadStatistic(2, "0", "90.25", "100")
+        self.assertAggregateMatchesStatistics()
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 2)
+
+        summary, queries = self.countQueries(lifetime_summary, "learner")
+        self.assertEqual(summary, {
+            "total_stories_read": 2,
+            "average_word_error_rate": 2.0,
+            "average_words_per_minute": 75.25,
+            "average_pronounciation_score": 86.0,
+        })
+        self.assertLessEqual(queries, 1)
+        self.assertEqual(verify_learner_aggregates(), [])
+
+    def test_recordStatisticsBatch(self):
+        self.uploadStatistic(0)
+        db.session.add(Learner(id="other", email="other@example.com", password="x", username="other"))
+        db.session.commit()
+        batch = [Statistic(learnerID=learner_id, storyID=self.stories[story_index].id, wordErrorRate=index, wordsPerMinute=50 + index,
+                           pronounciationScore=90 - index) for index, (learner_id, story_index) in enumerate(
+                               [("learner", 0), ("learner", 1), ("other", 1), ("learner", 1), ("other", 2)])]
+
+        # SQLite cannot return the IDs of a multi-row INSERT in order, so the ORM inserts one row at a time there
+        _, queries = self.countQueries(record_statistics, batch, exclude="INSERT INTO statistics")
+        db.session.commit()
+        self.assertEqual(Statistic.query.count(), 6)
+        self.assertAggregateMatchesStatistics()
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 2)
+        self.assertEqual(db.session.get(LearnerAggregate, "other").statisticCount, 2)
+        self.assertEqual(verify_learner_aggregates(), [])
+
+        # The learner with an aggregate row: the totals UPDATE, the lookup of its known stories, the new story's
+        # INSERT in a savepoint and the storiesRead UPDATE. The new learner: the UPDATE that finds no row,
+        # the aggregate query, and the INSERTs of the aggregate and its stories in a savepoint
+        self.assertEqual(queries, (1 + 1 + 3 + 1) + (1 + 1 + 4))
+
+    def test_concurrentlyCreatedAggregate(self):
+        self.uploadStatistic(0)
+
+        # The first UPDATE misses the row as if a concurrent first upload created it in the meantime
+        increment_aggregate = learner_statistics._increment_aggregate
+        calls = []
+        def racing_increment(*args):
+            calls.append(args)
+            return False if len(calls) == 1 else increment_aggregate(*args)
+
+        with patch('learner_statistics._increment_aggregate', side_effect=racing_increment):
+            self.uploadStatistic(1, "4", "60", "70")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Statistic.query.count(), 2)
+        self.assertAggregateMatchesStatistics()
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 2)
+
+    def test_storiesReadCountsEachStoryOnce(self):
+        for story_index in (0, 1, 0, 1, 2):
+            self.uploadStatistic(story_index)
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 3)
+
+    def test_uploadDoesNotReadHistory(self):
+        self.addStatistics(50)
+        self.uploadStatistic(0)
+
+        statistic = Statistic(learnerID="learner", storyID=self.stories[1].id, wordErrorRate=1, wordsPerMinute=60, pronounciationScore=90)
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            record_statistic(statistic)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        db.session.commit()
+
+        self.assertEqual([statement for statement in statements if "FROM statistics" in statement], [])
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 3)
+        self.assertAggregateMatchesStatistics()
+
+    def test_concurrentlyRecordedStory(self):
+        self.uploadStatistic(0)
+
+        # The story lookup misses the pair as if a concurrent upload of the story recorded it in the meantime
+        with patch('learner_statistics._known_story_ids', return_value=set()):
+            self.uploadStatistic(0)
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 1)
+        self.assertEqual(LearnerStory.query.count(), 1)
+
+    def test_aggregateOfExistingHistory(self):
+        # Statistics stored before the aggregates existed are included by the first upload
+        self.addStatistics(10)
+        self.assertIsNone(db.session.get(LearnerAggregate, "learner"))
+        self.assertEqual(verify_learner_aggregates(), ["learner"])
+        self.uploadStatistic(1)
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").statisticCount, 11)
+        self.assertEqual(LearnerStory.query.count(), 3)
+        self.assertAggregateMatchesStatistics()
+
+        # The stories of the history are known, reading one again is not a new story
+        self.uploadStatistic(2)
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 3)
+
+    def test_rebuildAggregates(self):
+        self.uploadStatistic(0)
+        self.uploadStatistic(1)
+        db.session.get(LearnerAggregate, "learner").statisticCount = 7
+        db.session.commit()
+        self.assertEqual(verify_learner_aggregates(), ["learner"])
+
+        LearnerStory.query.delete()
+        self.assertEqual(rebuild_learner_aggregates(), 1)
+        db.session.commit()
+        self.assertEqual(verify_learner_aggregates(), [])
+        self.assertAggregateMatchesStatistics()
+        self.assertEqual(LearnerStory.query.count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import inspect
+import json
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from models import db
+from audio_decoding import pcm16ToFloat
+from tests.flask_app import loadApp
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+class FakeWebSocket:
+    """
+    Client side of a stream: receive() hands out the queued messages, then times out
+    (returns None) like a client that stopped sending.
+    """
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+        self.timeouts = []
+
+    def receive(self, timeout=None):
+        self.timeouts.append(timeout)
+        return self.messages.pop(0) if self.messages else None
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+class TestLearnerStream(unittest.TestCase):
+    def setUp(self):
+        self.app = loadApp().app
+        self.stream = inspect.unwrap(self.app.view_functions['learner.stream_mispronunciation'])
+        # Sentences are looked up in the story index, the route tests drop the tables after each test
+        with self.app.app_context():
+            db.create_all()
+
+    def run_stream(self, ws):
+        with self.app.test_request_context('/learner/stream_mispronounciation'), \
+             patch('learner.learner_stream.modelStatus', return_value="ready"):
+            self.stream(ws)
+
+    def test_resultMatchesCheckMispronunciation(self):
+        # One model window, so the streamed phonemes are those /check_mispronounciation recognizes
+        processor, model = tinyProcessorAndModel()
+        audio = (np.random.default_rng(1).standard_normal(12000) * 8000).astype('<i2').tobytes()
+        ws = FakeWebSocket([json.dumps({"currentSentence": "the quick brown fox"}), audio[:12000], audio[12000:], json.dumps({"type": "end"})])
+
+        with patch.object(speech_checker, 'processor', processor), \
+             patch.object(speech_checker, 'model', model), \
+             patch.object(speech_checker, 'onnx_session', None), \
+             patch.dict(self.app.config, {'SILENCE_TRIMMING': False}), \
+             patch('learner.learner_stream.analyzeTranscription', return_value=([], [], [])) as mock_analyzeTranscription:
+            self.run_stream(ws)
+            single_pass = speech_checker.audioToPhonemes(pcm16ToFloat(audio))
+
+        self.assertEqual(mock_analyzeTranscription.call_args[0][:2], (single_pass, "the quick brown fox"))
+        self.assertEqual(ws.sent[-1], {"type": "result", "results": "pass", "duration_audio_file": 1})
+
+    def test_idleStreamIsClosed(self):
+        ws = FakeWebSocket([json.dumps({"currentSentence": "the quick brown fox"})])
+
+        with patch.dict(self.app.config, {'STREAMING_IDLE_TIMEOUT_SECONDS': 5}):
+            self.run_stream(ws)
+
+        self.assertEqual(ws.timeouts, [5, 5])
+        self.assertEqual(ws.sent, [{"type": "error", "error": "Nothing was received for 5 seconds"}])
+
+    def test_idleBeforeStartIsClosed(self):
+        ws = FakeWebSocket([])
+
+        self.run_stream(ws)
+
+        self.assertEqual(ws.timeouts, [self.app.config['STREAMING_IDLE_TIMEOUT_SECONDS']])
+        self.assertEqual(ws.sent, [{"type": "error", "error": f"Nothing was received for {self.app.config['STREAMING_IDLE_TIMEOUT_SECONDS']} seconds"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
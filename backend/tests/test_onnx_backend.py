@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+import importlib.util
+import os
+import sys
+import tempfile
+import numpy as np
+import torch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+@unittest.skipUnless(importlib.util.find_spec('onnxruntime'), "onnxruntime is not installed")
+class TestOnnxBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processor, cls.model = tinyProcessorAndModel()
+        cls.onnx_path = os.path.join(tempfile.mkdtemp(), 'tiny.onnx')
+        with patch.object(speech_checker, 'model', cls.model):
+            speech_checker.exportOnnxModel(cls.onnx_path)
+        cls.session = speech_checker.createOnnxSession(cls.onnx_path)
+
+        rng = np.random.default_rng(0)
+        cls.audio_files = [rng.standard_normal(length).astype(np.float32) for length in (8000, 20000, 12000)]
+
+    def runTorch(self, function, *args):
+        with patch.object(speech_checker, 'processor', self.processor), \
+             patch.object(speech_checker, 'model', self.model), \
+             patch.object(speech_checker, 'onnx_session', None):
+            return function(*args)
+
+    def runOnnx(self, function, *args):
+        with patch.object(speech_checker, 'processor', self.processor), \
+             patch.object(speech_checker, 'model', None), \
+             patch.object(speech_checker, 'model_config', self.model.config), \
+             patch.object(speech_checker, 'onnx_session', self.session):
+            return function(*args)
+
+    def test_logitsParity(self):
+        input_values = self.processor(self.audio_files[1], return_tensors="pt").input_values
+        torch_logits = self.runTorch(speech_checker._computeLogits, input_values)
+        onnx_logits = self.runOnnx(speech_checker._computeLogits, input_values)
+        self.assertTrue(torch.allclose(torch_logits, onnx_logits, atol=1e-4))
+
+    def test_audioToPhonemesParity(self):
+        for audio in self.audio_files:
+            self.assertEqual(
+                self.runOnnx(speech_checker.audioToPhonemes, audio),
+                self.runTorch(speech_checker.audioToPhonemes, audio),
+            )
+
+    def test_audioBatchToPhonemesParity(self):
+        self.assertEqual(
+            self.runOnnx(speech_checker.audioBatchToPhonemes, self.audio_files),
+            self.runTorch(speech_checker.audioBatchToPhonemes, self.audio_files),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import random
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from phoneme_normalization import PhonemeNormalizer, TRANSCRIPTION_NORMALIZER, ESPEAK_NORMALIZER
+
+
+def replaceChainTranscription(transcription):
+    # The str.replace chain the normalizer replaces
+    transcription = transcription.replace(' ','')
+    corrections = {
+        'ː': '', 'ɚ': 'ə', 'ðɪ': 'ðə', 'tu': 'tə', 'ðɛ': 'ðe', 'dɛ': 'de','da':'ðə','ei':'ɐ'
+    }
+    for old, new in corrections.items():
+        transcription = transcription.replace(old, new)
+    return transcription
+
+
+def replaceChainEspeak(phonemes):
+    phonemes = phonemes.replace("_","")
+    phonemes = phonemes.replace('ˈ', '')
+    phonemes = phonemes.replace('ˌ', '')
+    phonemes = phonemes.replace('ː', '')
+    phonemes = phonemes.replace("\\", '')
+    return phonemes
+
+
+class TestPhonemeNormalization(unittest.TestCase):
+    def setUp(self):
+        # Every character that appears in a rule, and a few that do not
+        self.alphabet = list(' ːɚðɪtuɛdaeiɐə_ˈˌ\\kwbɹʊnfɔs')
+        self.random = random.Random(0)
+
+    def randomStrings(self, count=20000, max_length=24):
+        for _ in range(count):
+            yield ''.join(self.random.choice(self.alphabet) for _ in range(self.random.randint(0, max_length)))
+
+    def test_transcriptionMatchesReplaceChain(self):
+        self.assertEqual(TRANSCRIPTION_NORMALIZER("ðɪ kwɪk bɹaʊn fɔks"), "ðəkwɪkbɹaʊnfɔks")
+        for cascade in ("ðɛi", "dɛi", "d ɛ i", "ðɛːi", "dɛii", "ð ɪ", "ddaei"):
+            self.assertEqual(TRANSCRIPTION_NORMALIZER(cascade), replaceChainTranscription(cascade), cascade)
+        for transcription in self.randomStrings():
+            self.assertEqual(TRANSCRIPTION_NORMALIZER(transcription).encode('utf-8'),
+                             replaceChainTranscription(transcription).encode('utf-8'), transcription)
+
+    def test_espeakMatchesReplaceChain(self):
+        self.assertEqual(ESPEAK_NORMALIZER("ð_ə k_w_ˈɪ_k"), "ðə kwɪk")
+        for phonemes in self.randomStrings():
+            self.assertEqual(ESPEAK_NORMALIZER(phonemes).encode('utf-8'),
+                             replaceChainEspeak(phonemes).encode('utf-8'), phonemes)
+
+    def test_rulesApplyInOrder(self):
+        normalizer = PhonemeNormalizer([('ab', 'b'), ('bb', 'c'), ('x', 'x')])
+        self.assertEqual(normalizer("abb"), "c")
+
+if __name__ == '__main__':
+    unittest.main()
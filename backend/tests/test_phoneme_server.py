@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import threading
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from multiprocessing.connection import Listener
+from phoneme_server import PhonemeServer, PhonemeServerClient, PhonemeServerUnavailable, parseAddress
+import speech_checker
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+class TestPhonemeServer(unittest.TestCase):
+    def setUp(self):
+        self.address = os.path.join(tempfile.mkdtemp(), 'phonemes.sock')
+
+    def startServer(self, recognize):
+        server = PhonemeServer(self.address, b'secret', recognize)
+        thread = threading.Thread(target=server.serveForever, daemon=True)
+        thread.start()
+        self.addCleanup(server.close)
+        return server
+
+    def test_parseAddress(self):
+        self.assertEqual(parseAddress('127.0.0.1:6001'), ('127.0.0.1', 6001))
+        self.assertEqual(parseAddress('/tmp/phonemes.sock'), '/tmp/phonemes.sock')
+
+    def test_recognizeOverSocket(self):
+        received = []
+
+        def recognize(audio):
+            received.append(audio)
+            return f"ðə{len(audio)}"
+
+        self.startServer(recognize)
+        client = PhonemeServerClient(self.address, b'secret')
+        audio = np.linspace(-1, 1, 1600, dtype=np.float64)
+
+        # The pooled connection is reused for the second request
+        self.assertEqual(client.recognize(audio), 'ðə1600')
+        self.assertEqual(client.recognize(audio[:10]), 'ðə10')
+        client.close()
+
+        self.assertEqual(received[0].dtype, np.float32)
+        np.testing.assert_allclose(received[0], audio, rtol=1e-6)
+
+    def test_serverErrorsAreRaised(self):
+        def recognize(audio):
+            raise ValueError("bad audio")
+
+        self.startServer(recognize)
+        client = PhonemeServerClient(self.address, b'secret')
+        with self.assertRaisesRegex(RuntimeError, 'bad audio'):
+            client.recognize(np.zeros(10, dtype=np.float32))
+        client.close()
+
+    def test_wrongAuthkeyDoesNotStopTheServer(self):
+        self.startServer(lambda audio: 'ðə')
+        bad_client = PhonemeServerClient(self.address, b'wrong', timeout=5)
+        with self.assertRaises(PhonemeServerUnavailable):
+            bad_client.recognize(np.zeros(10, dtype=np.float32))
+
+        client = PhonemeServerClient(self.address, b'secret', timeout=5)
+        self.assertEqual(client.recognize(np.zeros(10, dtype=np.float32)), 'ðə')
+        client.close()
+
+    def test_unresponsiveServerTimesOut(self):
+        # A listener that never accepts, so the handshake never completes
+        listener = Listener(self.address, authkey=b'secret')
+        self.addCleanup(listener.close)
+        client = PhonemeServerClient(self.address, b'secret', timeout=0.2)
+        with self.assertRaisesRegex(PhonemeServerUnavailable, 'connect'):
+            client.recognize(np.zeros(10, dtype=np.float32))
+
+    def test_slowAnswerTimesOut(self):
+        answered = threading.Event()
+        self.startServer(lambda audio: answered.wait(5) and 'ðə')
+        self.addCleanup(answered.set)
+        client = PhonemeServerClient(self.address, b'secret', timeout=0.2)
+        with self.assertRaisesRegex(PhonemeServerUnavailable, 'answer'):
+            client.recognize(np.zeros(10, dtype=np.float32))
+
+    def test_audioToPhonemesFallsBackToLocalModel(self):
+        processor, model = tinyProcessorAndModel()
+        audio = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+
+        def loadLocalModel():
+            speech_checker.processor, speech_checker.model = processor, model
+
+        # No server is listening at the address
+        client = PhonemeServerClient(self.address, b'secret', timeout=0.2)
+        with patch.object(speech_checker, 'phoneme_client', client), \
+             patch.object(speech_checker, 'inference_batcher', None), \
+             patch.object(speech_checker, 'onnx_session', None), \
+             patch.object(speech_checker, 'processor', None), \
+             patch.object(speech_checker, 'model', None), \
+             patch.object(speech_checker, '_loadLocalAcousticModel', side_effect=loadLocalModel) as load:
+            phonemes = speech_checker.audioToPhonemes(audio)
+            load.assert_called_once()
+            with patch.object(speech_checker, 'phoneme_client', None):
+                self.assertEqual(phonemes, speech_checker.audioToPhonemes(audio))
+
+if __name__ == '__main__':
+    unittest.main()
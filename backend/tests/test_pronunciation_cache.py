@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from pronunciation_cache import PronunciationCache
+from audio_retention import AudioRetention
+
+
+class TestPronunciationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_key(self):
+        key = PronunciationCache.key('quick', 'en-za', 130, 50, 150)
+        self.assertEqual(key, PronunciationCache.key('quick', 'en-za', 130, 50, 150))
+        self.assertNotEqual(key, PronunciationCache.key('quick', 'en-za', 140, 50, 150))
+        self.assertNotEqual(key, PronunciationCache.key('quick', 'en-gb', 130, 50, 150))
+
+    def test_memoryAndDiskTiers(self):
+        cache = PronunciationCache(self.directory, max_memory_entries=1)
+        self.assertIsNone(cache.get('a'))
+
+        filename = cache.put('a', b'audio a')
+        self.assertEqual(filename, 'a.wav')
+        self.assertTrue(os.path.exists(os.path.join(self.directory, filename)))
+        cache.put('b', b'audio b')
+
+        # 'a' was pushed out of memory but is read back from disk
+        self.assertEqual(cache.get('a'), b'audio a')
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+        # A new cache finds the files of the previous one
+        self.assertEqual(PronunciationCache(self.directory).get('b'), b'audio b')
+
+    def test_putDoesNotRewriteExistingFile(self):
+        cache = PronunciationCache(self.directory)
+        cache.put('a', b'audio a')
+        with patch('os.replace') as mock_replace:
+            self.assertEqual(cache.put('a', b'audio a'), 'a.wav')
+        mock_replace.assert_not_called()
+
+    def test_diskTierIsBounded(self):
+        cache = PronunciationCache(self.directory, retention=AudioRetention(self.directory, max_bytes=10))
+        cache.put('a', b'12345')
+        cache.put('b', b'12345')
+        cache.put('a', b'12345')  # 'b' becomes the least recently served file
+        cache.put('c', b'12345')
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ['a.wav', 'c.wav'])
+        self.assertEqual(cache.retention.stats()['bytes'], 10)
+
+    def test_sharedRetentionOfParentFolder(self):
+        retention = AudioRetention(self.directory)
+        cache = PronunciationCache(os.path.join(self.directory, 'pronunciations'), retention=retention)
+        cache.put('a', b'audio a')
+        self.assertIn(os.path.join('pronunciations', 'a.wav'), retention)
+
+    @patch('subprocess.run')
+    def test_generateAudioFilesUsesCache(self, mock_run):
+        mock_result = MagicMock()
+        mock_result.stdout = b'audio data'
+        mock_result.returncode = 0
+        mock_run.return_value = mock_result
+
+        with patch.object(speech_checker, 'pronunciation_cache', PronunciationCache(self.directory)):
+            first = speech_checker.generateAudioFiles(["quick", "fox"])
+            second = speech_checker.generateAudioFiles(["fox", "quick"])
+            filename = speech_checker.storePronunciationAudio("fox", second[0])
+
+        self.assertEqual(first, [b'audio data', b'audio data'])
+        self.assertEqual(second, [b'audio data', b'audio data'])
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertIn(filename, os.listdir(self.directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
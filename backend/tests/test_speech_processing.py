@@ -1,6 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import torch
+import copy
+import io
+import random
+import threading
+import time
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,12 +15,18 @@ from speech_checker import (
     sentenceToPhonemes,
     needlemanWunsch,
     findMispronouncedWords,
+    globalWordAlignment,
     generateAudioFiles,
     generateSyllables,
-    analyzeSpeech
+    analyzeSpeech,
+    analyzeTranscription,
+    quantizeModel,
 )
+import speech_checker
+from tests.tiny_wav2vec import tinyProcessorAndModel
 
 class TestSpeechChecker(unittest.TestCase):
+    @patch('speech_checker.espeak', None)
     @patch('subprocess.run')
     def test_sentenceToPhonemes(self, mock_run):
         # Mock the subprocess run to simulate espeak-ng output
@@ -29,6 +40,18 @@ class TestSpeechChecker(unittest.TestCase):
         result_phonemes = sentenceToPhonemes(sentence)
         self.assertEqual(result_phonemes, expected_phonemes)
 
+    @patch('subprocess.run')
+    def test_sentenceToPhonemes_inProcess(self, mock_run):
+        # Simulate the libespeak-ng output, which separates phonemes with '_'
+        espeak_mock = MagicMock()
+        espeak_mock.text_to_phonemes.return_value = "ð_ə k_w_ˈɪ_k b_ɹ_ˈaʊ_n f_ˈɒ_k_s ɐ d_ˈɒ_ɡ"
+
+        with patch.object(speech_checker, 'espeak', espeak_mock):
+            result_phonemes = sentenceToPhonemes("The quick brown fox a dog")
+
+        self.assertEqual(result_phonemes, ['ðə', 'kwɪk', 'bɹaʊn', 'fɒks', 'eɪ', 'dɒɡ'])
+        mock_run.assert_not_called()
+
     @patch('transformers.Wav2Vec2Processor.from_pretrained')
     @patch('transformers.Wav2Vec2ForCTC.from_pretrained')
     def test_audioToPhonemes(self, mock_model, mock_processor):
@@ -55,6 +78,42 @@ class TestSpeechChecker(unittest.TestCase):
 
         self.assertEqual(transcription, expected_transcription) 
 
+    def test_quantizeModel(self):
+        _, fp32_model = tinyProcessorAndModel()
+        input_values = torch.randn(1, 16000)
+        with torch.no_grad():
+            expected = fp32_model(input_values).logits
+            int8_model = quantizeModel(copy.deepcopy(fp32_model))
+            result = int8_model(input_values).logits
+
+        self.assertFalse(any(type(module) is torch.nn.Linear for module in int8_model.modules()))
+        self.assertEqual(result.shape, expected.shape)
+        self.assertLess((result - expected).abs().max().item(), 0.1)
+
+    def test_loadModelsInBackground(self):
+        release = threading.Event()
+        with patch.object(speech_checker, '_model_loader', None), \
+             patch.object(speech_checker, 'models_ready', threading.Event()), \
+             patch.object(speech_checker, 'model_loading_error', None):
+            loader = speech_checker.loadModelsInBackground(release.wait)
+            self.assertEqual(speech_checker.modelStatus(), 'loading')
+            # Only the first call starts a loader
+            self.assertIs(speech_checker.loadModelsInBackground(release.wait), loader)
+
+            release.set()
+            loader.join()
+            self.assertEqual(speech_checker.modelStatus(), 'ready')
+
+        def failing_loader():
+            raise OSError("model not found")
+
+        with patch.object(speech_checker, '_model_loader', None), \
+             patch.object(speech_checker, 'models_ready', threading.Event()), \
+             patch.object(speech_checker, 'model_loading_error', None):
+            speech_checker.loadModelsInBackground(failing_loader).join()
+            self.assertEqual(speech_checker.modelStatus(), 'failed')
+            self.assertIn("model not found", speech_checker.model_loading_error)
+
     def test_needlemanWunsch(self):
         seq1 = 'cat'
         seq2 = 'cut'
@@ -62,6 +121,30 @@ class TestSpeechChecker(unittest.TestCase):
         result = needlemanWunsch(seq1, seq2, match_score=1, mismatch_penalty=-1, gap_penalty=-1)
         self.assertEqual(result, expected_score)
 
+    def test_needlemanWunsch_matchesCellByCell(self):
+        def reference(seq1, seq2, match_score, mismatch_penalty, gap_penalty):
+            score = [[0] * (len(seq2) + 1) for _ in range(len(seq1) + 1)]
+            for i in range(1, len(seq1) + 1):
+                score[i][0] = i * gap_penalty
+            for j in range(1, len(seq2) + 1):
+                score[0][j] = j * gap_penalty
+            for i in range(1, len(seq1) + 1):
+                for j in range(1, len(seq2) + 1):
+                    diag = match_score if seq1[i - 1] == seq2[j - 1] else mismatch_penalty
+                    score[i][j] = max(score[i - 1][j] + gap_penalty, score[i][j - 1] + gap_penalty, score[i - 1][j - 1] + diag)
+            return score[len(seq1)][len(seq2)]
+
+        rng = random.Random(0)
+        for _ in range(200):
+            seq1 = ''.join(rng.choice('ðəkwɪb') for _ in range(rng.randint(0, 8)))
+            seq2 = ''.join(rng.choice('ðəkwɪb') for _ in range(rng.randint(0, 12)))
+            expected = reference(seq1, seq2, 2, -1, -2)
+            self.assertEqual(needlemanWunsch(seq1, seq2, match_score=2, mismatch_penalty=-1, gap_penalty=-2), expected)
+            # A band at least as wide as both sequences is the full matrix
+            self.assertEqual(needlemanWunsch(seq1, seq2, 2, -1, -2, band=12), expected)
+            # A narrower band can only restrict the alignments considered
+            self.assertLessEqual(needlemanWunsch(seq1, seq2, 2, -1, -2, band=1), expected)
+
     def test_findMispronouncedWords(self):
         espeak_words = ['ðə', 'kwɪk', 'bɹaʊn', 'fɒks']
         wav2vec_string = 'ðəkwɪkbɹaʊnfɒks'
@@ -70,6 +153,35 @@ class TestSpeechChecker(unittest.TestCase):
         mispronounced_words = findMispronouncedWords(espeak_words, wav2vec_string, sentence_arr)
         self.assertEqual(mispronounced_words, [])  # Assuming no mispronunciations
 
+    def test_findMispronouncedWords_prefixMatchesExhaustive(self):
+        espeak_words = ['ðə', 'kwɪk', 'bɹaʊn', 'fɒks', 'dʒʌmps', 'əʊvə', 'ðə', 'leɪzi', 'dɒɡ']
+        sentence_arr = ['The', 'quick', 'brown', 'fox', 'jumps', 'over', 'the', 'lazy', 'dog']
+        wav2vec_strings = [
+            'ðəkwɪkbɹaʊnfɒksdʒʌmpsəʊvəðəleɪzidɒɡ',
+            'ðəkwɪkbɹaʊnfɔksdʒampsoʊvəðəleɪzidɔɡ',
+            'dəkwikbɹɑnfɑksdʒʌmpovəðəleidɑɡ',
+            'ðəkwɪkfɒks',
+            '',
+        ]
+        for wav2vec_string in wav2vec_strings:
+            self.assertEqual(
+                findMispronouncedWords(espeak_words, wav2vec_string, sentence_arr, segment_search='prefix'),
+                findMispronouncedWords(espeak_words, wav2vec_string, sentence_arr, segment_search='exhaustive'),
+            )
+
+    def test_findMispronouncedWords_global(self):
+        espeak_words = ['ðə', 'kwɪk', 'bɹaʊn', 'fɒks']
+        sentence_arr = ['the', 'quick', 'brown', 'fox']
+
+        self.assertEqual(findMispronouncedWords(espeak_words, 'ðəkwɪkbɹaʊnfɒks', sentence_arr, alignment_mode='global'), [])
+        self.assertEqual(findMispronouncedWords(espeak_words, 'ðəkwɪkpɑtfɒks', sentence_arr, alignment_mode='global'), ['brown'])
+        self.assertEqual(findMispronouncedWords(espeak_words, 'ðəkwɪkfɒks', sentence_arr, alignment_mode='global'), ['brown'])
+
+    def test_globalWordAlignment(self):
+        word_distances, word_segments = globalWordAlignment(['ðə', 'kwɪk', 'fɒks'], 'ðəkwɪkfɒksəəə')
+        self.assertEqual(word_distances, [-4.0, -8.0, -8.0])
+        self.assertEqual(word_segments, ['ðə', 'kwɪk', 'fɒks'])
+
     @patch('subprocess.run')
     def test_generateAudioFiles(self, mock_run):
         # Mock successful audio file generation
@@ -84,6 +196,45 @@ class TestSpeechChecker(unittest.TestCase):
         self.assertEqual(len(audio_files), 3)
         self.assertEqual(audio_files[0], b'audio data')
 
+    @patch('subprocess.run')
+    def test_generateAudioFiles_concurrentKeepsOrder(self, mock_run):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def synthesize(command, **kwargs):
+            word = command[-2]
+            with lock:
+                running.append(word)
+                peak.append(len(running))
+            # Earlier words take longer, so they finish last
+            time.sleep(0.05 * (4 - len(word) % 4))
+            with lock:
+                running.remove(word)
+            return MagicMock(returncode=0, stdout=word.encode())
+
+        mock_run.side_effect = synthesize
+        words = ["a", "bb", "ccc", "dddd"]
+        with patch('speech_checker._SYNTHESIS_WORKERS', 4), patch('speech_checker._synthesis_executor', None):
+            audio_files = generateAudioFiles(words)
+
+        self.assertEqual(audio_files, [b'a', b'bb', b'ccc', b'dddd'])
+        self.assertGreater(max(peak), 1)
+
+    @patch('subprocess.run')
+    def test_generateAudioFiles_failedWordKeepsPositions(self, mock_run):
+        def synthesize(command, **kwargs):
+            word = command[-2]
+            if word == "bb":
+                return MagicMock(returncode=1, stderr=b'synthesis failed')
+            return MagicMock(returncode=0, stdout=word.encode())
+
+        mock_run.side_effect = synthesize
+        with patch('speech_checker._SYNTHESIS_WORKERS', 4), patch('speech_checker._synthesis_executor', None):
+            audio_files = generateAudioFiles(["a", "bb", "ccc"])
+
+        self.assertEqual(audio_files, [b'a', None, b'ccc'])
+
     def test_generateSyllables(self):
         # Assuming the global dic is set up properly in instantiateModels
         instantiateModels()  # Initialize the dictionary
@@ -115,6 +266,35 @@ class TestSpeechChecker(unittest.TestCase):
         self.assertEqual(result[1], [b'audio data'])  # Audio data
         self.assertEqual(result[2], ['quick'])  # Syllables
 
+    @patch('speech_checker.audioToPhonemes')
+    @patch('speech_checker.sentenceToPhonemes')
+    @patch('speech_checker.generateAudioFiles')
+    @patch('speech_checker.generateSyllables')
+    def test_analyzeSpeech_precomputed(self, mock_generateSyllables, mock_generateAudioFiles,
+                                       mock_sentenceToPhonemes, mock_audioToPhonemes):
+        mock_audioToPhonemes.return_value = 'ðəkwɪkpɑtfɒks'
+        mock_generateAudioFiles.return_value = [b'audio data']
+
+        result = analyzeSpeech(MagicMock(), "The quick brown fox",
+                               espeak_arr=['ðə', 'kwɪk', 'bɹaʊn', 'fɒks'],
+                               syllables={'brown': 'brown'})
+
+        # The story index replaces espeak and pyphen for indexed sentences
+        mock_sentenceToPhonemes.assert_not_called()
+        mock_generateSyllables.assert_not_called()
+        self.assertEqual(result[0], ['brown'])
+        self.assertEqual(result[2], ['brown'])
+
+    @patch('speech_checker.generateAudioFiles', return_value=[b'audio data'])
+    def test_analyzeTranscription_logsInsteadOfPrinting(self, mock_generateAudioFiles):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+             self.assertLogs('speech_checker', level='DEBUG') as logs:
+            analyzeTranscription('ðəkwɪkpɑtfɒks', "The quick brown fox",
+                                 espeak_arr=['ðə', 'kwɪk', 'bɹaʊn', 'fɒks'], syllables={'brown': 'brown'})
+
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertIn("DEBUG:speech_checker:Recognized phonemes: ðəkwɪkpɑtfɒks", logs.output)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+from datetime import date, datetime, timedelta
+from flask import Flask
+from sqlalchemy import func
+from werkzeug.datastructures import MultiDict
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from models import db, Learner, Story, Statistic, StatisticRollup
+import statistic_rollups
+from statistic_rollups import add_to_rollups, rebuild_statistic_rollups, rollup_trends, overall_averages, parse_trend_args, period_start
+
+
+class TestStatisticRollups(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add(Learner(id="learner", email="learner@example.com", password="x", username="learner"))
+        self.stories = [Story(title=f"Story {index}", content=f"Content {index}.", difficulty=("easy", "hard")[index % 2]) for index in range(3)]
+        db.session.add_all(self.stories)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def upload(self, statistics):
+        db.session.add_all(statistics)
+        db.session.flush()
+        add_to_rollups(statistics)
+        db.session.commit()
+
+    def statistic(self, story_index, recorded_date, word_error_rate, words_per_minute=70, score=80):
+        return Statistic(learnerID="learner", storyID=self.stories[story_index].id, wordErrorRate=word_error_rate,
+                         wordsPerMinute=words_per_minute, pronounciationScore=score, recordedDate=recorded_date)
+
+    def rollups(self):
+        columns = [column.name for column in StatisticRollup.__table__.columns if column.name != "id"]
+        return sorted(tuple(getattr(rollup, name) for name in columns) for rollup in StatisticRollup.query)
+
+    def test_periodStart(self):
+        # 2024-01-03 is a Wednesday
+        self.assertEqual(period_start(datetime(2024, 1, 3, 23, 59), "day"), date(2024, 1, 3))
+        self.assertEqual(period_start(datetime(2024, 1, 3, 23, 59), "week"), date(2024, 1, 1))
+        self.assertEqual(period_start(datetime(2024, 1, 1), "week"), date(2024, 1, 1))
+
+    def test_incrementalMatchesRebuild(self):
+        start = datetime(2024, 1, 1, 8)
+        for batch in range(4):
+            self.upload([self.statistic(index % 3, start + timedelta(hours=batch * 20 + index * 7), str(batch + index), 60 + index, 100 - batch)
+                         for index in range(5)])
+        incremental = self.rollups()
+
+        rebuild_statistic_rollups()
+        db.session.commit()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_bucketValues(self):
+        monday = datetime(2024, 1, 1, 9)
+        self.upload([self.statistic(0, monday, 4), self.statistic(0, monday + timedelta(days=2), 1)])
+        self.upload([self.statistic(0, monday + timedelta(hours=1), 7, 90, 60)])
+
+        day = StatisticRollup.query.filter_by(period="day", periodStart=date(2024, 1, 1)).one()
+        self.assertEqual((day.statisticCount, day.wordErrorRateSum, day.wordErrorRateMin, day.wordErrorRateMax), (2, 11, 4, 7))
+        self.assertEqual((day.pronounciationScoreMin, day.pronounciationScoreMax, day.difficulty), (60, 80, "easy"))
+
+        week = StatisticRollup.query.filter_by(period="week").one()
+        self.assertEqual((week.statisticCount, week.wordErrorRateMin, week.wordsPerMinuteMax), (3, 1, 90))
+        self.assertEqual(StatisticRollup.query.filter_by(period="day").count(), 2)
+
+    def test_concurrentlyCreatedBucket(self):
+        monday = datetime(2024, 1, 1, 9)
+        self.upload([self.statistic(0, monday, 4)])
+
+        # The first UPDATE misses the buckets as if another upload created them in the meantime
+        update_bucket = statistic_rollups._update_bucket
+        calls = []
+        def racing_update(*args):
+            calls.append(args)
+            return 0 if len(calls) % 2 else update_bucket(*args)
+
+        with patch('statistic_rollups._update_bucket', side_effect=racing_update):
+            self.upload([self.statistic(0, monday + timedelta(hours=1), 6)])
+        self.assertEqual([rollup.statisticCount for rollup in StatisticRollup.query], [2, 2])
+        self.assertEqual(Statistic.query.count(), 2)
+
+    def test_unknownStoryIsLeftOut(self):
+        monday = datetime(2024, 1, 1, 9)
+        unknown = Statistic(learnerID="learner", storyID=999, wordErrorRate=1, wordsPerMinute=70, pronounciationScore=80, recordedDate=monday)
+        self.upload([self.statistic(0, monday, 4), unknown])
+        self.assertEqual([rollup.statisticCount for rollup in StatisticRollup.query], [1, 1])
+
+        self.assertEqual(rebuild_statistic_rollups(), 2)
+
+    def test_trends(self):
+        monday = datetime(2024, 1, 1, 9)
+        self.upload([
+            self.statistic(0, monday, 2), self.statistic(2, monday, 4), self.statistic(1, monday, 10),
+            self.statistic(0, monday + timedelta(days=7), 6),
+        ])
+
+        difficulty_trends = rollup_trends("week", "difficulty")
+        self.assertEqual([(trend["periodStart"], trend["difficulty"], trend["statisticCount"]) for trend in difficulty_trends],
+                         [("2024-01-01", "easy", 2), ("2024-01-01", "hard", 1), ("2024-01-08", "easy", 1)])
+        self.assertEqual(difficulty_trends[0]["wordErrorRateAverage"], 3)
+        self.assertEqual((difficulty_trends[0]["wordErrorRateMin"], difficulty_trends[0]["wordErrorRateMax"]), (2, 4))
+
+        story_trends = rollup_trends("day", "story", start=date(2024, 1, 1), end=date(2024, 1, 2))
+        self.assertEqual([(trend["storyTitle"], trend["statisticCount"]) for trend in story_trends],
+                         [("Story 0", 1), ("Story 1", 1), ("Story 2", 1)])
+
+    def test_overallAverages(self):
+        self.assertIsNone(overall_averages())
+        self.upload([self.statistic(index % 3, datetime(2024, 1, 1) + timedelta(days=index * 3), index * 1.3, 50 + index, 90 - index)
+                     for index in range(12)])
+
+        averages = db.session.query(
+            func.avg(Statistic.pronounciationScore), func.avg(Statistic.wordsPerMinute), func.avg(Statistic.wordErrorRate)
+        ).one()
+        self.assertEqual(overall_averages(), {
+            "averagePronunciationScore": round(averages[0], 2),
+            "averageWPM": round(averages[1], 2),
+            "averageWordErrorRate": round(averages[2], 2),
+        })
+
+    def test_trendArguments(self):
+        self.assertEqual(parse_trend_args(MultiDict()), ("week", None, None))
+        self.assertEqual(parse_trend_args(MultiDict({"period": "day", "from": "2024-01-01", "to": "2024-02-01"})),
+                         ("day", date(2024, 1, 1), date(2024, 2, 1)))
+        for args in ({"period": "month"}, {"from": "January"}):
+            with self.assertRaises(ValueError):
+                parse_trend_args(MultiDict(args))
+
+
+if __name__ == '__main__':
+    unittest.main()
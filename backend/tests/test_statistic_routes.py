@@ -0,0 +1,90 @@
+import unittest
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from models import db, Learner, Story, Statistic, LearnerAggregate
+from tests.flask_app import loadApp
+
+
+class TestStatisticRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = loadApp().app
+        self.context = self.app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(Learner(id="learner", email="learner@example.com", password="x", username="learner"))
+        self.stories = [Story(title=f"Story {index}", content=f"Content {index}.", difficulty="easy") for index in range(3)]
+        db.session.add_all(self.stories)
+        db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session["user_id"] = "learner"
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def postBatch(self, items):
+        return self.client.post("/statistic/upload_statistics_batch", data=json.dumps(items), content_type="application/json")
+
+    def test_batchWithMixedResults(self):
+        statistic = {"errors_made": 2, "pronounciation_score": 90, "wpm_averaged": 80}
+        response = self.postBatch([
+            {**statistic, "story_id": self.stories[0].id},
+            {**statistic, "story_id": float(self.stories[1].id)},
+            {**statistic, "story_id": "²"},
+            {**statistic, "story_id": 99},
+            {**statistic, "story_id": self.stories[2].id, "errors_made": float("nan")},
+            {**statistic, "story_id": self.stories[2].id, "wpm_averaged": True},
+            {**statistic, "story_id": self.stories[2].id, "pronounciation_score": None},
+            "not a statistic",
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        body = response.get_json()
+        self.assertEqual(body["message"], "2 of 8 statistics added")
+        self.assertEqual([result["status"] for result in body["results"]], [201, 201, 400, 400, 400, 400, 400, 400])
+        self.assertEqual([result["index"] for result in body["results"]], list(range(8)))
+        self.assertEqual(body["results"][3]["error"], "Unknown story 99")
+        self.assertEqual(body["results"][6]["error"], "Missing data: pronounciation_score")
+
+        statistics = Statistic.query.order_by(Statistic.id).all()
+        self.assertEqual([statistic.id for statistic in statistics], [result["statistic_id"] for result in body["results"][:2]])
+        self.assertEqual([statistic.storyID for statistic in statistics], [self.stories[0].id, self.stories[1].id])
+        self.assertEqual(db.session.get(LearnerAggregate, "learner").storiesRead, 2)
+
+    def test_batchWithoutValidStatistics(self):
+        response = self.postBatch([{"errors_made": 2, "pronounciation_score": 90, "wpm_averaged": 80, "story_id": "²"}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["results"][0]["status"], 400)
+        self.assertEqual(Statistic.query.count(), 0)
+
+    def test_historyRejectsMalformedParameters(self):
+        for query in ("limit=0", "limit=ten", "from=yesterday", "to=2024-13-01", "cursor=not-a-cursor"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/learner/statistics_history?{query}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.get_json())
+
+        response = self.client.get("/admin/learner_statistics_history?learner_id=learner&limit=-1")
+        self.assertEqual(response.status_code, 400)
+
+    def test_trendsRejectMalformedParameters(self):
+        for path in ("/admin/difficulty_trends", "/admin/story_trends"):
+            for query in ("period=month", "from=yesterday", "to=2024-02-30"):
+                with self.subTest(path=path, query=query):
+                    response = self.client.get(f"{path}?{query}")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("error", response.get_json())
+
+        self.assertEqual(self.client.get("/admin/story_trends?period=day").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import difflib
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import numpy as np
+import torch
+from transformers import Wav2Vec2Config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import speech_checker
+from streaming_recognizer import StreamingRecognizer
+from tests.tiny_wav2vec import tinyProcessorAndModel
+
+
+def positionLogits(input_values):
+    """
+    Fake model whose predicted id for every frame is the frame's index in the whole
+    recording, read from the audio below (where each sample holds its own index).
+    """
+    frames = (input_values.shape[1] - 400) // 320 + 1
+    sample_positions = input_values[0, torch.arange(frames) * 320].long()
+    return torch.nn.functional.one_hot(sample_positions // 320, num_classes=1000).float()[None]
+
+
+class TestStreamingRecognizer(unittest.TestCase):
+    def test_everyFramePredictedOnce(self):
+        processor = MagicMock(side_effect=lambda audio, return_tensors: MagicMock(input_values=torch.tensor(audio)[None]))
+        processor.feature_extractor.do_normalize = False
+        audio = np.arange(16000 * 5 + 123, dtype=np.float32)
+        chunk_sizes = np.random.default_rng(0).integers(100, 4000, size=200)
+        boundaries = np.cumsum(chunk_sizes)[np.cumsum(chunk_sizes) < len(audio)]
+
+        with patch.object(speech_checker, 'processor', processor), \
+             patch.object(speech_checker, 'model', MagicMock(config=Wav2Vec2Config())), \
+             patch.object(speech_checker, '_computeLogits', positionLogits):
+            recognizer = StreamingRecognizer(step_seconds=0.5, left_context_seconds=0.3, right_context_seconds=0.2)
+            for chunk in np.split(audio, boundaries):
+                recognizer.feed(chunk)
+            windows_before_end = processor.call_count
+            with patch.object(recognizer, 'phonemes'):
+                recognizer.finish()
+
+        total_frames = (len(audio) - 400) // 320 + 1
+        self.assertEqual(recognizer._predicted_ids, list(range(total_frames)))
+        self.assertGreater(windows_before_end, 5)
+        self.assertEqual(processor.call_count, windows_before_end + 1)
+
+    def test_shortRecordingMatchesAudioToPhonemes(self):
+        processor, model = tinyProcessorAndModel()
+        audio = np.random.default_rng(1).standard_normal(12000).astype(np.float32)
+
+        with patch.object(speech_checker, 'processor', processor), \
+             patch.object(speech_checker, 'model', model), \
+             patch.object(speech_checker, 'onnx_session', None):
+            recognizer = StreamingRecognizer(step_seconds=1.0, left_context_seconds=1.0, right_context_seconds=0.5)
+            self.assertEqual(recognizer.feed(audio[:6000]), "")
+            recognizer.feed(audio[6000:])
+            self.assertEqual(recognizer.finish(), speech_checker.audioToPhonemes(audio))
+
+    def test_longRecordingMatchesAudioToPhonemes(self):
+        # Several windows, with the loudness changing between them like a learner pausing between
+        # sentences, so every window would be normalised differently on its own
+        processor, model = tinyProcessorAndModel()
+        rng = np.random.default_rng(2)
+        envelope = np.repeat(rng.uniform(0.05, 1.0, 12), 8000)
+        audio = (rng.standard_normal(len(envelope)) * envelope + 0.05).astype(np.float32)
+
+        with patch.object(speech_checker, 'processor', processor), \
+             patch.object(speech_checker, 'model', model), \
+             patch.object(speech_checker, 'onnx_session', None), \
+             patch.object(speech_checker, '_computeLogits', wraps=speech_checker._computeLogits) as computeLogits:
+            recognizer = StreamingRecognizer(step_seconds=1.0, left_context_seconds=1.0, right_context_seconds=0.5)
+            for chunk in np.array_split(audio, 37):
+                recognizer.feed(chunk)
+            windows_before_end = computeLogits.call_count
+            streamed = recognizer.finish()
+            single_pass = speech_checker.audioToPhonemes(audio)
+
+        self.assertGreaterEqual(windows_before_end, 4)
+        # The transformer attends to the whole input, so windows can only approximate the single pass
+        self.assertGreater(difflib.SequenceMatcher(None, streamed, single_pass).ratio(), 0.99)
+
+    def test_bufferedWithoutLocalModel(self):
+        audio = np.zeros(8000, dtype=np.float32)
+        with patch.object(speech_checker, 'processor', None), \
+             patch.object(speech_checker, 'audioToPhonemes', return_value='ðə') as mock_audioToPhonemes:
+            recognizer = StreamingRecognizer()
+            recognizer.feed(audio[:3000])
+            recognizer.feed(audio[3000:])
+            self.assertEqual(recognizer.finish(), 'ðə')
+        np.testing.assert_array_equal(mock_audioToPhonemes.call_args[0][0], audio)
+
+
+if __name__ == '__main__':
+    unittest.main()
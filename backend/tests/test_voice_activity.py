@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from voice_activity import trimSilence
+
+
+class TestVoiceActivity(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.noise = lambda seconds: (1e-4 * rng.standard_normal(int(16000 * seconds))).astype(np.float32)
+        self.tone = lambda seconds, amplitude: (amplitude * np.sin(2 * np.pi * 220 * np.arange(int(16000 * seconds)) / 16000)).astype(np.float32)
+
+    def test_trimsLeadingAndTrailingSilence(self):
+        speech = self.tone(1.0, 0.3)
+        waveform = np.concatenate([self.noise(2.0), speech, self.noise(1.5)])
+
+        trimmed, dropped_seconds = trimSilence(waveform, padding_ms=200)
+
+        # The speech and 0.2 s of padding on either side are kept
+        self.assertAlmostEqual(len(trimmed) / 16000, 1.4, delta=0.05)
+        self.assertAlmostEqual(dropped_seconds, 3.1, delta=0.05)
+        self.assertIn(speech[:1000].tobytes(), trimmed.tobytes())
+
+    def test_quietRecordingIsKept(self):
+        waveform = np.concatenate([self.noise(0.5), self.tone(1.0, 0.01), self.noise(0.5)])
+        trimmed, _ = trimSilence(waveform)
+        self.assertIsNotNone(trimmed)
+        self.assertGreater(len(trimmed), 16000)
+
+    def test_allSilenceIsRejected(self):
+        trimmed, dropped_seconds = trimSilence(self.noise(3.0))
+        self.assertIsNone(trimmed)
+        self.assertEqual(dropped_seconds, 3.0)
+
+        self.assertIsNone(trimSilence(np.zeros(16000 * 2, dtype=np.float32))[0])
+        self.assertIsNone(trimSilence(np.zeros(10, dtype=np.float32))[0])
+
+    def test_clickIsNotSpeech(self):
+        waveform = np.concatenate([self.noise(1.0), self.tone(0.02, 0.5), self.noise(1.0)])
+        self.assertIsNone(trimSilence(waveform)[0])
+
+    def test_speechUntilTheEndIsKept(self):
+        waveform = np.concatenate([self.noise(1.0), self.tone(1.0 + 1 / 1600, 0.3)])
+        trimmed, _ = trimSilence(waveform)
+        self.assertEqual(trimmed[-1], waveform[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import torch
+from transformers import (
+    Wav2Vec2Config,
+    Wav2Vec2CTCTokenizer,
+    Wav2Vec2FeatureExtractor,
+    Wav2Vec2ForCTC,
+    Wav2Vec2Processor,
+)
+
+
+VOCAB = ['<pad>', '<s>', '</s>', '<unk>', '|', 'ð', 'ə', 'k', 'w', 'ɪ', 'b', 'ɹ', 'a', 'ʊ', 'n', 'f', 'ɒ', 's']
+
+
+def tinyProcessorAndModel(seed=0, num_hidden_layers=2):
+    """
+    Build a randomly initialised wav2vec2 CTC model and processor small enough for unit tests.
+
+    The layout mirrors the XLSR checkpoint (layer-norm feature extractor, stable layer norm,
+    attention masks) so padding, batching and export behave the same way.
+
+    Returns:
+    tuple: (processor, model) with the model in eval mode.
+    """
+    torch.manual_seed(seed)
+    vocab_path = os.path.join(tempfile.mkdtemp(), 'vocab.json')
+    with open(vocab_path, 'w', encoding='utf-8') as f:
+        json.dump({token: index for index, token in enumerate(VOCAB)}, f)
+
+    tokenizer = Wav2Vec2CTCTokenizer(vocab_path, unk_token='<unk>', pad_token='<pad>', word_delimiter_token='|')
+    feature_extractor = Wav2Vec2FeatureExtractor(
+        feature_size=1, sampling_rate=16000, padding_value=0.0, do_normalize=True, return_attention_mask=True
+    )
+    processor = Wav2Vec2Processor(feature_extractor=feature_extractor, tokenizer=tokenizer)
+
+    config = Wav2Vec2Config(
+        vocab_size=len(VOCAB),
+        hidden_size=32,
+        num_hidden_layers=num_hidden_layers,
+        num_attention_heads=2,
+        intermediate_size=64,
+        conv_dim=(16, 16, 16, 16, 16, 16, 16),
+        num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2,
+        feat_extract_norm='layer',
+        do_stable_layer_norm=True,
+        pad_token_id=0,
+    )
+    model = Wav2Vec2ForCTC(config)
+    model.eval()
+    return processor, model
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def trimSilence(waveform, sample_rate=16000, frame_ms=20, floor_db=-50.0, dynamic_range_db=35.0,
+                padding_ms=200, min_speech_ms=60):
+    """
+    Energy based voice activity detection: cut the leading and trailing silence of a
+    recording before it goes through the model, whose cost grows with the clip length.
+
+    A frame counts as speech when its RMS level is above floor_db (dBFS) and within
+    dynamic_range_db of the loudest frame, so quiet microphones still work. padding_ms of
+    audio is kept around the speech so soft word onsets and endings are not cut.
+
+    Args:
+    waveform (np.ndarray): Float samples in [-1, 1].
+    sample_rate (int): Sample rate of the waveform.
+    frame_ms (int): Length of the frames the level is measured on.
+    floor_db (float): Level below which a frame is always silence.
+    dynamic_range_db (float): How far below the loudest frame speech can be.
+    padding_ms (int): Audio kept before the first and after the last speech frame.
+    min_speech_ms (int): Less speech than this counts as an all-silent recording.
+
+    Returns:
+    tuple: (trimmed waveform, seconds of audio dropped). The waveform is None when the
+           recording contains no speech.
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    frame_count = len(waveform) // frame_length
+    if frame_count == 0:
+        return None, len(waveform) / sample_rate
+
+    frames = np.asarray(waveform[:frame_count * frame_length], dtype=np.float32).reshape(frame_count, frame_length)
+    levels = 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-12)
+    threshold = max(floor_db, float(levels.max()) - dynamic_range_db)
+    speech_frames = np.flatnonzero(levels > threshold)
+
+    if len(speech_frames) * frame_ms < min_speech_ms:
+        return None, len(waveform) / sample_rate
+
+    padding = padding_ms // frame_ms
+    start = max(0, speech_frames[0] - padding) * frame_length
+    end = speech_frames[-1] + 1 + padding
+    end = len(waveform) if end >= frame_count else end * frame_length
+
+    return waveform[start:end], (len(waveform) - (end - start)) / sample_rate
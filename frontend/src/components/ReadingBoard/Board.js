@@ -123,6 +123,8 @@ function Board(props) {
     const formData = new FormData();
     formData.append("audio", blob, "audio.wav");
     formData.append("currentSentence", currentSentence.trim());
+    formData.append("story_id", props.story_id);
+    formData.append("sentence_index", storyIndex);
 
     try {
       const response = await httpClient.post(
@@ -157,6 +159,11 @@ function Board(props) {
 
       setStopButtonClickable(false);
     } catch (error) {
+      // The recording contained no speech, let the learner read the sentence again
+      if (error.response && error.response.status === 422) {
+        showToast("silent");
+        setStopButtonClickable(false);
+      }
       console.error("Error sending audio file:", error);
     }
   };
@@ -272,6 +279,8 @@ function Board(props) {
     if (feedback === "good") {
       const messages = ["Well Done!", "Good Job!", "Way to go!"];
       message = messages[Math.floor(Math.random() * messages.length)];
+    } else if (feedback === "silent") {
+      message = "We couldn't hear you, please try again.";
     } else {
       message = "Incorrect Pronounciation, please try again.";
     }